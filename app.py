@@ -1,43 +1,124 @@
-from flask import Flask, render_template, jsonify, send_from_directory, request, redirect, url_for, session
+from flask import Flask, render_template, jsonify, send_from_directory, request, redirect, url_for, session, g, Response
 import requests
 import json
 from datetime import datetime
 import numpy as np
 import time
-from models.location_optimizer import LocationOptimizer
-from models.wait_time_predictor import WaitTimePredictor
 from models.cng_switch_calculator import CNGSwitchCalculator
 from models.user_analytics import UserAnalytics
+from models.fueling_history import FuelingHistory
+from models.queue_simulator import StationQueueSimulator
+from models.wait_time_table import WaitTimeTable
+from models.wait_time_online import ObservationBuffer, OnlineWaitTimeUpdater
+from models.event_ingest import EventIngestQueue, IngestQueueFull
+from models.lazy_resource import LazyResource, warm_up_all, resources_status
+from models.request_metrics import RequestMetrics
+from models.request_profiler import RequestProfiler
+from models.overpass_client import OverpassClient, OverpassError, DEFAULT_URL as OVERPASS_DEFAULT_URL
 from dataclasses import dataclass
 from typing import Dict, Any
 from models.station_calculating_model import ChargingStationCalculator
 import os
-import pandas as pd
 import math
 
 app = Flask(__name__, static_url_path='/static')
 
-# Initialize models
+
+def _load_wait_time_predictor():
+    """Import scikit-learn and train the wait time model from the first CSV found"""
+    from models.wait_time_predictor import WaitTimePredictor
+
+    predictor = WaitTimePredictor()
+    try:
+        wt_path_candidates = [
+            os.path.join(os.path.dirname(__file__), 'CNG_pumps_with_Erlang-C_waiting_times.csv'),
+            os.path.join(os.path.dirname(__file__), 'waiting_times.csv')
+        ]
+        for p in wt_path_candidates:
+            if os.path.exists(p):
+                predictor.train_from_csv(p)
+                print(f"Wait time model trained from {os.path.basename(p)}")
+                break
+    except Exception as e:
+        print(f"Wait time model training failed: {e}")
+    return predictor
+
+def _load_fuel_price_history():
+    """Optional dated fuel prices for CNG ROI backtests (None when no file exists)"""
+    from models.fuel_price_history import FuelPriceHistory
+
+    try:
+        price_path_candidates = [
+            os.environ.get('FUEL_PRICE_HISTORY_PATH', ''),
+            os.path.join(os.path.dirname(__file__), 'fuel_price_history.csv'),
+            os.path.join(os.path.dirname(__file__), 'fuel_price_history.parquet')
+        ]
+        for p in price_path_candidates:
+            if p and os.path.exists(p):
+                history = FuelPriceHistory.from_file(p)
+                print(f"Fuel price history loaded from {os.path.basename(p)}")
+                return history
+    except Exception as e:
+        print(f"Fuel price history loading failed: {e}")
+    return None
+
+def _load_location_optimizer():
+    """Import pandas/scipy/scikit-learn and load the station catalog"""
+    from models.location_optimizer import LocationOptimizer
+
+    data_file_path = os.environ.get('STATIONS_FILE_PATH') or \
+        os.path.join(os.path.dirname(__file__), 'CNG_pumps_with_Erlang-C_waiting_times_250.csv')
+    return LocationOptimizer(data_file_path)
+
+# Initialize models. Expensive ones are LazyResources: they are built on first
+# use (or by warm_up_all) so importing the app stays cheap, and a request only
+# waits for the resource it touches.
 station_calculator = ChargingStationCalculator()
-wait_time_predictor = WaitTimePredictor()
+wait_time_predictor = LazyResource('wait_time_predictor', _load_wait_time_predictor)
 cng_calculator = CNGSwitchCalculator()
-user_analytics = UserAnalytics()
-try:
-    wt_path_candidates = [
-        os.path.join(os.path.dirname(__file__), 'CNG_pumps_with_Erlang-C_waiting_times.csv'),
-        os.path.join(os.path.dirname(__file__), 'waiting_times.csv')
-    ]
-    for p in wt_path_candidates:
-        if os.path.exists(p):
-            wait_time_predictor.train_from_csv(p)
-            print(f"Wait time model trained from {os.path.basename(p)}")
-            break
-except Exception as e:
-    print(f"Wait time model training failed: {e}")
-
-# Initialize location optimizer with data
-data_file_path = os.path.join(os.path.dirname(__file__), 'CNG_pumps_with_Erlang-C_waiting_times_250.csv')
-location_optimizer_instance = LocationOptimizer(data_file_path)
+fueling_history = FuelingHistory(
+    os.environ.get('FUELING_DB_PATH', os.path.join(app.instance_path, 'fueling_history.db'))
+)
+# Generated demo events are only written to the persistent history when asked for
+user_analytics = UserAnalytics(
+    fueling_history,
+    seed_demo_data=os.environ.get('SEED_DEMO_DATA', '').lower() in ('1', 'true', 'yes')
+)
+event_ingest = EventIngestQueue(
+    fueling_history,
+    max_batches=int(os.environ.get('EVENT_INGEST_QUEUE_BATCHES', 256)),
+    commit_size=int(os.environ.get('EVENT_INGEST_COMMIT_SIZE', 5000))
+)
+queue_simulator = StationQueueSimulator(workers=int(os.environ.get('QUEUE_SIM_WORKERS', 1)))
+wait_time_table = WaitTimeTable(
+    wait_time_predictor,
+    refresh_interval=float(os.environ.get('WAIT_TABLE_REFRESH_SECONDS', 900))
+)
+wait_time_updater = OnlineWaitTimeUpdater(
+    wait_time_predictor,
+    buffer=ObservationBuffer(capacity=int(os.environ.get('WAIT_OBSERVATION_BUFFER', 5000))),
+    update_interval=float(os.environ.get('WAIT_ONLINE_UPDATE_SECONDS', 300)),
+    on_update=wait_time_table.request_refresh
+)
+fuel_price_history = LazyResource('fuel_price_history', _load_fuel_price_history)
+location_optimizer_instance = LazyResource('location_optimizer', _load_location_optimizer)
+request_metrics = RequestMetrics()
+request_profiler = RequestProfiler(
+    os.environ.get('PROFILE_DIR', os.path.join(app.instance_path, 'profiles')),
+    token=os.environ.get('PROFILE_TOKEN'),
+    sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', 0)),
+    max_profiles=int(os.environ.get('PROFILE_MAX_FILES', 200))
+)
+overpass_client = OverpassClient(
+    os.environ.get('OVERPASS_URL', OVERPASS_DEFAULT_URL),
+    cache_dir=os.environ.get('OVERPASS_CACHE_DIR', os.path.join(app.instance_path, 'overpass_cache')),
+    cache_ttl=float(os.environ.get('OVERPASS_CACHE_TTL', 86400)),
+    timeout=float(os.environ.get('OVERPASS_TIMEOUT', 30)),
+    retries=int(os.environ.get('OVERPASS_RETRIES', 3)),
+    max_workers=int(os.environ.get('OVERPASS_MAX_WORKERS', 4))
+)
+# Tiles per query grow with the square of the radius
+OVERPASS_MAX_RADIUS_M = float(os.environ.get('OVERPASS_MAX_RADIUS_M', 20000))
 
 # Define water bodies and restricted areas in NCR
 RESTRICTED_AREAS = [
@@ -112,67 +193,22 @@ cng_models = {
     }
 }
 
-def point_in_polygon(point, polygon):
-    """Ray casting algorithm to determine if point is in polygon"""
-    x, y = point['lng'], point['lat']
-    inside = False
-    j = len(polygon) - 1
-    
-    for i in range(len(polygon)):
-        if ((polygon[i]['lng'] > x) != (polygon[j]['lng'] > x) and
-            y < (polygon[j]['lat'] - polygon[i]['lat']) * 
-            (x - polygon[i]['lng']) / 
-            (polygon[j]['lng'] - polygon[i]['lng']) + 
-            polygon[i]['lat']):
-            inside = not inside
-        j = i
-    
-    return inside
+def _load_restricted_area_index():
+    """Import shapely and index the buffered restricted-area polygons"""
+    from models.restricted_areas import RestrictedAreaIndex
+
+    # Buffer zone around restricted areas (approximately 100 meters)
+    return RestrictedAreaIndex(RESTRICTED_AREAS, buffer_deg=0.001)
+
+restricted_area_index = LazyResource('restricted_area_index', _load_restricted_area_index)
+
+def valid_locations(lats, lngs):
+    """Boolean array: which points are outside every restricted area and its buffer zone"""
+    return restricted_area_index.valid_mask(lats, lngs)
 
 def is_valid_location(lat, lng):
     """Enhanced location validation with buffer zone"""
-    point = {'lat': lat, 'lng': lng}
-    
-    # Add a buffer zone around restricted areas (approximately 100 meters)
-    BUFFER = 0.001  # roughly 100 meters in degrees
-    
-    for area in RESTRICTED_AREAS:
-        # Check if point is in restricted area or buffer zone
-        for i in range(len(area['polygon'])):
-            p1 = area['polygon'][i]
-            p2 = area['polygon'][(i + 1) % len(area['polygon'])]
-            
-            # Calculate distance to line segment
-            if distance_to_line_segment(point, p1, p2) < BUFFER:
-                return False
-    
-    return True
-
-def distance_to_line_segment(p, p1, p2):
-    """Calculate distance from point to line segment"""
-    x, y = p['lng'], p['lat']
-    x1, y1 = p1['lng'], p1['lat']
-    x2, y2 = p2['lng'], p2['lat']
-    
-    A = x - x1
-    B = y - y1
-    C = x2 - x1
-    D = y2 - y1
-    
-    dot = A * C + B * D
-    len_sq = C * C + D * D
-    
-    if len_sq == 0:
-        return np.sqrt(A * A + B * B)
-        
-    param = dot / len_sq
-    
-    if param < 0:
-        return np.sqrt(A * A + B * B)
-    elif param > 1:
-        return np.sqrt((x - x2) * (x - x2) + (y - y2) * (y - y2))
-    
-    return abs(A * D - C * B) / np.sqrt(len_sq)
+    return bool(valid_locations([lat], [lng])[0])
 
 def get_time_info():
     """Get current time information"""
@@ -195,39 +231,20 @@ def get_time_info():
     }
 
 def fetch_gas_stations(lat, lng, radius=3000):
-    """Fetch gas stations and convert them to nodes for optimization"""
-    overpass_url = "http://overpass-api.de/api/interpreter"
-    
-    overpass_query = f"""
-    [out:json][timeout:25];
-    (
-        node["amenity"="fuel"](around:{radius},{lat},{lng});
-        way["amenity"="fuel"](around:{radius},{lat},{lng});
-    );
-    out body;
-    >;
-    out skel qt;
-    """
+    """Fetch gas stations and convert them to nodes for optimization (raises OverpassError)"""
+    # Tiled, cached and pooled; see models/overpass_client.py
+    elements = overpass_client.fetch_around(lat, lng, radius)
     
-    try:
-        response = requests.post(overpass_url, data=overpass_query)
-        data = response.json()
-        
-        nodes = []
-        for element in data.get('elements', []):
-            if element.get('type') == 'node':
-                node = {
-                    'lat': element.get('lat'),
-                    'lng': element.get('lon'),
-                    'type': determine_area_type(element),
-                    'name': element.get('tags', {}).get('name', 'Unnamed Station')
-                }
-                if is_valid_location(node['lat'], node['lng']):
-                    nodes.append(node)
-        return nodes
-    except Exception as e:
-        print(f"Error fetching gas stations: {e}")
+    nodes = [{
+        'lat': element.get('lat'),
+        'lng': element.get('lon'),
+        'type': determine_area_type(element),
+        'name': element.get('tags', {}).get('name', 'Unnamed Station')
+    } for element in elements if element.get('type') == 'node']
+    if not nodes:
         return []
+    valid = valid_locations([n['lat'] for n in nodes], [n['lng'] for n in nodes])
+    return [node for node, ok in zip(nodes, valid) if ok]
 
 def determine_area_type(element):
     """Determine area type based on surroundings"""
@@ -281,6 +298,106 @@ def analyze_location_suitability(gas_station, existing_stations):
 
 app.secret_key = 'your-secret-key-here'  # Replace with a secure secret key in production
 
+@app.before_request
+def begin_request_metrics():
+    g.request_started = time.perf_counter()
+    request_metrics.begin_request()
+
+@app.after_request
+def record_request_metrics(response):
+    """Record latency and payload sizes, and report stage timings in Server-Timing"""
+    started = g.get('request_started')
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    request_metrics.observe_request(endpoint, request.method, response.status_code, elapsed,
+                                    request.content_length or 0, response.content_length)
+    response.headers['Server-Timing'] = request_metrics.server_timing(elapsed)
+    return response
+
+@app.teardown_request
+def end_request_metrics(exc):
+    if g.pop('request_started', None) is not None:
+        request_metrics.end_request()
+
+def profiling_authorized():
+    """Only callers presenting PROFILE_TOKEN in X-Profile-Token (never without a configured token)"""
+    return request_profiler.authorize(request.headers.get('X-Profile-Token'))
+
+@app.before_request
+def begin_request_profile():
+    # ?profile=1 / X-Profile: 1 runs cProfile, 'sample' the stack sampler
+    requested = request.headers.get('X-Profile') or request.args.get('profile')
+    if not requested and not request_profiler.sample_rate:
+        return
+    authorized = bool(requested) and profiling_authorized()
+    try:
+        g.profile_session = request_profiler.start(requested, authorized)
+    except Exception as e:
+        print(f"Error starting request profile: {e}")
+
+@app.after_request
+def save_request_profile(response):
+    profile_session = g.pop('profile_session', None)
+    if profile_session is None:
+        return response
+    try:
+        profile_id = request_profiler.finish(profile_session, {
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.url_rule.rule if request.url_rule else 'unmatched',
+            'status': response.status_code
+        })
+        response.headers['X-Profile-Id'] = profile_id
+    except Exception as e:
+        print(f"Error saving request profile: {e}")
+    return response
+
+@app.teardown_request
+def discard_request_profile(exc):
+    # Only left over when after_request did not run; stop it without saving
+    profile_session = g.pop('profile_session', None)
+    if profile_session is not None:
+        request_profiler.discard(profile_session)
+
+@app.route('/api/profiles')
+def list_profiles():
+    """Saved request profiles, newest first"""
+    if not request_profiler.enabled:
+        return jsonify({'error': 'Profiling is disabled (set PROFILE_TOKEN)'}), 404
+    if not profiling_authorized():
+        return jsonify({'error': 'Not authorized'}), 403
+    try:
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    return jsonify({'profiles': request_profiler.list_profiles(limit)})
+
+@app.route('/api/profiles/<profile_id>')
+def get_profile(profile_id):
+    """Summary and hottest functions of one profile"""
+    if not request_profiler.enabled:
+        return jsonify({'error': 'Profiling is disabled (set PROFILE_TOKEN)'}), 404
+    if not profiling_authorized():
+        return jsonify({'error': 'Not authorized'}), 403
+    profile = request_profiler.get_profile(profile_id)
+    if profile is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return jsonify(profile)
+
+@app.route('/api/profiles/<profile_id>/download')
+def download_profile(profile_id):
+    """Raw profile: pstats .prof (snakeviz, pstats) or collapsed stacks .folded (flamegraph.pl, speedscope)"""
+    if not request_profiler.enabled:
+        return jsonify({'error': 'Profiling is disabled (set PROFILE_TOKEN)'}), 404
+    if not profiling_authorized():
+        return jsonify({'error': 'Not authorized'}), 403
+    profile = request_profiler.get_profile(profile_id)
+    if profile is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_from_directory(request_profiler.directory, profile['file'], as_attachment=True)
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
@@ -351,34 +468,88 @@ def get_nearby_stations(lat, lng):
                 'total_chargers': 2,
             })
 
-    # Predict wait times
+    # Predicted waits come from the precomputed hour-of-week table; the model
+    # only runs for stations the table does not cover yet (e.g. before the
+    # first background build has finished)
     timeinfo = get_time_info()
-    feature_recs = []
-    for st in result:
-        feature_recs.append({
-            'id': st['id'],
-            'active_chargers': st.get('active_chargers', 1),
-            'total_chargers': st.get('total_chargers', 2),
-            'current_queue_length': max(0, int(round(np.random.poisson(1)))),
-            'hour_of_day': timeinfo['hour'],
-            'day_of_week': timeinfo['day_of_week'],
-            'is_weekend': 1 if timeinfo['is_weekend'] else 0,
-            'traffic_density': 0.5,
-            'historical_avg_wait_time': 10.0
-        })
-    preds = wait_time_predictor.predict_wait_time(feature_recs)
-    pred_map = {p['station_id']: p for p in preds}
-
-    for st in result:
-        pm = pred_map.get(st['id'])
-        if pm:
-            st['predicted_wait'] = round(float(pm['predicted_wait']), 2)
-            st['prediction_confidence'] = round(float(pm['confidence']), 2)
+    misses = result
+    with request_metrics.stage('wait_table_lookup'):
+        table_hit = wait_time_table.lookup([st['id'] for st in result], timeinfo['day_of_week'], timeinfo['hour'])
+    if table_hit is not None:
+        misses = []
+        for st, values, confidence in zip(result, *table_hit):
+            if np.isnan(values[0]):
+                misses.append(st)
+                continue
+            for field, value in zip(WaitTimeTable.FIELDS, values):
+                if not np.isnan(value):
+                    st[field] = round(float(value), 2)
+            st['prediction_confidence'] = round(float(confidence), 2)
+
+    if misses:
+        feature_recs = [dict(rec, hour_of_day=timeinfo['hour'], day_of_week=timeinfo['day_of_week'],
+                             is_weekend=1 if timeinfo['is_weekend'] else 0)
+                        for rec in _wait_table_station_features(misses)]
+        with request_metrics.stage('prediction'):
+            preds = wait_time_predictor.predict_wait_time(feature_recs)
+        pred_map = {p['station_id']: p for p in preds}
+
+        for st in misses:
+            pm = pred_map.get(st['id'])
+            if pm:
+                st['predicted_wait'] = round(float(pm['predicted_wait']), 2)
+                if 'p50_wait' in pm:
+                    st['p50_wait'] = round(float(pm['p50_wait']), 2)
+                    st['p90_wait'] = round(float(pm['p90_wait']), 2)
+                st['prediction_confidence'] = round(float(pm['confidence']), 2)
 
     # Sort by predicted wait then distance
     result.sort(key=lambda x: (x.get('predicted_wait', 9999), x['distance_km']))
     return jsonify({'stations': result})
 
+def _wait_table_station_features(stations):
+    """Time-independent prediction features for stations keyed by their position id"""
+    return [{
+        'id': st['id'],
+        'active_chargers': st.get('active_chargers', 1),
+        'total_chargers': st.get('total_chargers', 2),
+        'current_queue_length': WaitTimeTable.EXPECTED_QUEUE_LENGTH,
+        'traffic_density': 0.5,
+        'historical_avg_wait_time': 10.0
+    } for st in stations]
+
+def _wait_table_stations():
+    """Station list used to (re)build the wait time table"""
+    stations = []
+    for s in _read_stations_file().get('stations', []):
+        pos = s.get('position') or {}
+        if pos.get('lat') is None or pos.get('lng') is None:
+            continue
+        stations.append({'id': f"{pos['lat']:.6f},{pos['lng']:.6f}", 'active_chargers': 1, 'total_chargers': 2})
+    return _wait_table_station_features(stations)
+
+@app.route('/api/wait-time-table/status')
+def wait_time_table_status():
+    """Report the state of the precomputed wait time table"""
+    return jsonify(wait_time_table.get_status())
+
+@app.route('/api/wait-times/observations', methods=['POST'])
+def ingest_wait_observations():
+    """Accept observed wait times and queue lengths for online model updates"""
+    try:
+        data = request.json
+        observations = data if isinstance(data, list) else data.get('observations', [data])
+        accepted = wait_time_updater.ingest(observations)
+        return jsonify({'accepted': accepted, **wait_time_updater.get_status()}), 202
+    except Exception as e:
+        print(f"Error ingesting wait observations: {e}")
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/wait-times/online-status')
+def wait_time_online_status():
+    """Report buffered observations and incremental update progress"""
+    return jsonify(wait_time_updater.get_status())
+
 @app.route('/api/stations-with-wait/<lat>/<lng>')
 def get_nearby_stations_with_wait(lat, lng):
     # Proxy to existing endpoint logic
@@ -405,13 +576,14 @@ def get_optimal_locations(lat, lng):
         time_info = get_time_info()
         
         # Get optimal locations
-        optimal_locations = location_optimizer_instance.optimize_station_locations(
-            center_lat=lat,
-            center_lng=lng,
-            radius_km=radius_km,
-            num_stations=num_stations,
-            time_info=time_info
-        )
+        with request_metrics.stage('scoring'):
+            optimal_locations = location_optimizer_instance.optimize_station_locations(
+                center_lat=lat,
+                center_lng=lng,
+                radius_km=radius_km,
+                num_stations=num_stations,
+                time_info=time_info
+            )
         
         # Format response
         candidates = []
@@ -547,6 +719,49 @@ def station_demand_analysis():
         print(f"Error in station_demand_analysis: {e}")
         return jsonify({'error': str(e)}), 400
 
+@app.route('/api/station-simulation', methods=['POST'])
+def simulate_station_queue():
+    """Run a Monte Carlo queue simulation for an existing or hypothetical station"""
+    try:
+        data = request.json or {}
+
+        # Start from a catalog station when one is named, then apply overrides
+        station = {}
+        station_name = data.get('station_name')
+        if station_name:
+            station = next((s for s in location_optimizer_instance.existing_stations
+                            if s['name'] == station_name), None)
+            if station is None:
+                return jsonify({'error': f'Unknown station: {station_name}'}), 404
+        station = {**station, **{k: data[k] for k in (
+            'servers', 'service_time', 'overall_arrivals', 'morning_arrivals',
+            'evening_arrivals', 'rush_pattern') if k in data}}
+
+        arrival_curve = data.get('arrival_curve') or queue_simulator.arrival_curve(station)
+        replications = int(data.get('replications', 500))
+        days = int(data.get('days', 1))
+        if replications <= 0 or days <= 0:
+            return jsonify({'error': 'replications and days must be positive'}), 400
+        replications = min(replications, 5000)
+        days = min(days, 7)
+
+        results = queue_simulator.simulate(
+            servers=max(1, int(station.get('servers', 1) or 1)),
+            service_time_min=float(station.get('service_time', 0) or 5.0),
+            arrival_curve=arrival_curve,
+            service_cv=float(data.get('service_cv', 1.0)),
+            service_distribution=data.get('service_distribution', 'exponential'),
+            burstiness=float(data.get('burstiness', 0.0)),
+            replications=replications,
+            days=days,
+            seed=data.get('seed')
+        )
+        return jsonify(results)
+
+    except Exception as e:
+        print(f"Error in station simulation: {e}")
+        return jsonify({'error': str(e)}), 400
+
 def _get_recommendation_reason(location):
     """Generate a human-readable recommendation reason"""
     scores = {
@@ -655,12 +870,14 @@ def plan_route():
             'range': float(cng_specs['range'])
         }
 
-        filling_stops = station_calculator.calculate_charging_stops(
-            route_data=route,
-            ev_specs=ev_specs_mapped,
-            current_charge=current_charge,
-            available_stations=fetch_stations_in_bbox(calculate_route_bbox(route['coordinates']))
-        )
+        available_stations = fetch_stations_in_bbox(calculate_route_bbox(route['coordinates']))
+        with request_metrics.stage('route_stops'):
+            filling_stops = station_calculator.calculate_charging_stops(
+                route_data=route,
+                ev_specs=ev_specs_mapped,
+                current_charge=current_charge,
+                available_stations=available_stations
+            )
         
         # Convert stops to JSON-serializable format
         stops_data = [
@@ -760,6 +977,11 @@ def fetch_stations_in_bbox(bbox):
         })
     return nearest
 
+# Parsed catalog per file path, reused until the file's mtime changes. Loaded
+# before forking by serve.py so preforked workers share one copy.
+_stations_cache = {}
+
+@request_metrics.timed_stage('catalog_read')
 def _read_stations_file():
     """Read stations from the provided Excel file and return as JSON.
     Attempts to infer latitude/longitude/name columns case-insensitively.
@@ -768,6 +990,7 @@ def _read_stations_file():
         # Resolve file path relative to app root
         # Try multiple known filenames in order
         candidates = [
+            os.environ.get('STATIONS_FILE_PATH', ''),
             'CNG_pumps_with_Erlang-C_waiting_times_250.csv',
             'Trimmed_CNG_Pump_Data (1).csv',
             'Trimmed_CNG_Pump_Data (1).xlsx',
@@ -777,14 +1000,22 @@ def _read_stations_file():
         base_dir = os.path.dirname(__file__)
         use_path = None
         for name in candidates:
+            if not name:
+                continue
             p = os.path.join(base_dir, name)
             if os.path.exists(p):
                 use_path = p
                 break
         if not use_path:
-            return { 'error': 'File not found: ' + ', '.join(candidates), 'stations': [] }
+            return { 'error': 'File not found: ' + ', '.join(c for c in candidates if c), 'stations': [] }
         filename = os.path.basename(use_path)
         file_path = use_path
+        mtime = os.path.getmtime(file_path)
+        cached = _stations_cache.get(file_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        import pandas as pd  # deferred: only needed once the catalog is read
 
         if file_path.endswith('.csv'):
             df = pd.read_csv(file_path)
@@ -825,7 +1056,9 @@ def _read_stations_file():
             name = str(row.get(name_col)).strip() if name_col and pd.notnull(row.get(name_col)) else 'CNG Station'
             stations.append({ 'name': name, 'position': { 'lat': lat, 'lng': lng } })
 
-        return { 'stations': stations }
+        result = { 'stations': stations }
+        _stations_cache[file_path] = (mtime, result)
+        return result
     except Exception as e:
         return { 'error': str(e), 'stations': [] }
 
@@ -863,6 +1096,89 @@ def calculate_cng_savings():
         print(f"Error in CNG calculator: {e}")
         return jsonify({'error': str(e)}), 400
 
+@app.route('/api/cng-calculator/fleet', methods=['POST'])
+def calculate_fleet_cng_savings():
+    """Calculate CNG switch savings for a fleet given columnar vehicle data"""
+    try:
+        data = request.json
+        results = cng_calculator.calculate_fleet(
+            vehicle_types=data['vehicle_type'],
+            current_fuels=data['fuel'],
+            daily_km=data['daily_km'],
+            current_mileage=data.get('mileage'),
+            include_vehicles=bool(data.get('include_vehicles', False)),
+            include_monthly=bool(data.get('include_monthly', False)),
+            months=int(data.get('months', 60))
+        )
+        return jsonify(results)
+    except Exception as e:
+        print(f"Error in fleet CNG calculator: {e}")
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/cng-calculator/sensitivity', methods=['POST'])
+def calculate_cng_sensitivity():
+    """Monte Carlo payback sensitivity to fuel prices and daily distance"""
+    try:
+        data = request.json
+        samples = int(data.get('samples', 20000))
+        months = int(data.get('months', 60))
+        if samples <= 0 or months <= 0:
+            return jsonify({'error': 'samples and months must be positive'}), 400
+        # Oversized requests are scaled down to the engine's memory limits
+        months = min(months, cng_calculator.MAX_SENSITIVITY_MONTHS)
+        samples = min(samples, cng_calculator.MAX_SENSITIVITY_SAMPLES,
+                      cng_calculator.MAX_SENSITIVITY_CELLS // months)
+        breakeven_months = data.get('breakevenMonths', [12, 24, 36, 60])
+        if not isinstance(breakeven_months, list) or len(breakeven_months) > cng_calculator.MAX_BREAKEVEN_HORIZONS:
+            return jsonify({'error': f'breakevenMonths must be a list of at most '
+                                     f'{cng_calculator.MAX_BREAKEVEN_HORIZONS} horizons'}), 400
+        results = cng_calculator.simulate_sensitivity(
+            vehicle_type=data.get('vehicleType'),
+            current_fuel=data.get('currentFuel'),
+            daily_km=float(data.get('dailyKm')),
+            current_mileage=float(data.get('currentMileage')) if data.get('currentMileage') else None,
+            samples=samples,
+            months=months,
+            price_drift=float(data.get('priceDrift', 0.05)),
+            price_volatility=float(data.get('priceVolatility', 0.10)),
+            price_correlation=float(data.get('priceCorrelation', 0.7)),
+            km_cv=float(data.get('kmCv', 0.2)),
+            breakeven_months=[int(m) for m in breakeven_months],
+            seed=data.get('seed')
+        )
+        return jsonify(results)
+    except Exception as e:
+        print(f"Error in CNG sensitivity: {e}")
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/cng-calculator/backtest', methods=['POST'])
+def backtest_cng_savings():
+    """Replay historical fuel prices for one conversion date, or for every month when none is given"""
+    try:
+        price_history = fuel_price_history.get()
+        if price_history is None:
+            return jsonify({'error': 'No fuel price history configured (set FUEL_PRICE_HISTORY_PATH)'}), 404
+        data = request.json
+        params = {
+            'vehicle_type': data.get('vehicleType'),
+            'current_fuel': data.get('currentFuel'),
+            'daily_km': float(data.get('dailyKm')),
+            'current_mileage': float(data.get('currentMileage')) if data.get('currentMileage') else None
+        }
+        if data.get('conversionDate'):
+            results = cng_calculator.backtest(
+                price_history, **params,
+                conversion_date=data['conversionDate'],
+                horizon_months=int(data['horizonMonths']) if data.get('horizonMonths') else None
+            )
+        else:
+            results = cng_calculator.backtest_all_dates(price_history, **params)
+        results['price_history'] = price_history.get_summary()
+        return jsonify(results)
+    except Exception as e:
+        print(f"Error in CNG backtest: {e}")
+        return jsonify({'error': str(e)}), 400
+
 @app.route('/api/cng-calculator/vehicle-types')
 def get_vehicle_types():
     """Get available vehicle types"""
@@ -895,7 +1211,7 @@ def get_analytics_overview():
 def get_usage_patterns():
     """Get usage patterns"""
     try:
-        patterns = user_analytics.get_usage_patterns()
+        patterns = user_analytics.get_usage_patterns(session.get('username', 'User'))
         return jsonify(patterns)
     except Exception as e:
         print(f"Error in usage patterns: {e}")
@@ -905,7 +1221,7 @@ def get_usage_patterns():
 def get_efficiency_analysis():
     """Get efficiency analysis"""
     try:
-        efficiency = user_analytics.get_efficiency_analysis()
+        efficiency = user_analytics.get_efficiency_analysis(session.get('username', 'User'))
         return jsonify(efficiency)
     except Exception as e:
         print(f"Error in efficiency analysis: {e}")
@@ -915,7 +1231,7 @@ def get_efficiency_analysis():
 def get_cost_analysis():
     """Get cost analysis"""
     try:
-        cost_analysis = user_analytics.get_cost_analysis()
+        cost_analysis = user_analytics.get_cost_analysis(session.get('username', 'User'))
         return jsonify(cost_analysis)
     except Exception as e:
         print(f"Error in cost analysis: {e}")
@@ -925,7 +1241,7 @@ def get_cost_analysis():
 def get_wait_time_analysis_api():
     """Get wait time analysis"""
     try:
-        wait_analysis = user_analytics.get_wait_time_analysis()
+        wait_analysis = user_analytics.get_wait_time_analysis(session.get('username', 'User'))
         return jsonify(wait_analysis)
     except Exception as e:
         print(f"Error in wait time analysis: {e}")
@@ -935,7 +1251,7 @@ def get_wait_time_analysis_api():
 def get_analytics_recommendations():
     """Get personalized recommendations"""
     try:
-        recommendations = user_analytics.get_recommendations()
+        recommendations = user_analytics.get_recommendations(session.get('username', 'User'))
         return jsonify({'recommendations': recommendations})
     except Exception as e:
         print(f"Error in recommendations: {e}")
@@ -945,12 +1261,129 @@ def get_analytics_recommendations():
 def get_recent_activity():
     """Get recent charging activity"""
     try:
-        limit = int(request.args.get('limit', 10))
-        activity = user_analytics.get_recent_activity(limit)
-        return jsonify({'activity': activity})
+        page = user_analytics.get_activity_page(
+            session.get('username', 'User'),
+            limit=int(request.args.get('limit', 10)),
+            before=request.args.get('before'),
+            after=request.args.get('after'),
+            cursor=request.args.get('cursor')
+        )
+        return jsonify(page)
     except Exception as e:
         print(f"Error in recent activity: {e}")
         return jsonify({'error': str(e)}), 400
 
+@app.route('/api/analytics/rollups')
+def get_analytics_rollups():
+    """Get day, week or month totals, e.g. ?period=month&periods=12"""
+    try:
+        period = request.args.get('period', 'month')
+        periods = int(request.args.get('periods', 12))
+        rollup = user_analytics.get_period_rollup(session.get('username', 'User'), period, periods)
+        return jsonify({'period': period, 'rollup': rollup})
+    except Exception as e:
+        print(f"Error in analytics rollups: {e}")
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/analytics/percentiles')
+def get_analytics_percentiles():
+    """Get approximate wait or efficiency percentiles, e.g. ?metric=wait&scope=fleet&hour=8"""
+    try:
+        scope = request.args.get('scope', 'user')
+        username = None if scope == 'fleet' else session.get('username', 'User')
+        hour = request.args.get('hour')
+        percentiles = user_analytics.get_percentiles(
+            request.args.get('metric', 'wait'),
+            username,
+            hour=int(hour) if hour is not None else None,
+            station_type=request.args.get('station_type')
+        )
+        return jsonify(percentiles)
+    except Exception as e:
+        print(f"Error in analytics percentiles: {e}")
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/analytics/events', methods=['POST'])
+def ingest_analytics_events():
+    """Queue fueling events (NDJSON or JSON array) for the background writer"""
+    try:
+        events = event_ingest.decode(request.get_data(), request.content_type)
+        accepted = event_ingest.submit(events, session.get('username', 'User'))
+        return jsonify({'accepted': accepted, **event_ingest.get_status()}), 202
+    except IngestQueueFull as e:
+        response = jsonify({'error': str(e), **event_ingest.get_status()})
+        response.headers['Retry-After'] = '1'
+        return response, 429
+    except Exception as e:
+        print(f"Error ingesting analytics events: {e}")
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/analytics/events/status')
+def analytics_events_status():
+    """Report ingest queue depth, write progress and whether the writer is running"""
+    return jsonify(event_ingest.get_status())
+
+@app.route('/api/analytics/bundle')
+def get_analytics_bundle():
+    """Get every analytics panel in one response"""
+    try:
+        limit = int(request.args.get('limit', 10))
+        with request_metrics.stage('analytics'):
+            bundle = user_analytics.get_analytics_bundle(session.get('username', 'User'), limit)
+        return jsonify(bundle)
+    except Exception as e:
+        print(f"Error in analytics bundle: {e}")
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/startup-status')
+def startup_status():
+    """Report which lazily built resources are ready and how long they took"""
+    return jsonify({'resources': resources_status()})
+
+@app.route('/api/gas-stations/<lat>/<lng>')
+def get_osm_gas_stations(lat, lng):
+    """OpenStreetMap fuel stations around a point, radius in metres"""
+    try:
+        lat, lng = float(lat), float(lng)
+        radius = float(request.args.get('radius', 3000))
+        if not 0 < radius <= OVERPASS_MAX_RADIUS_M:
+            return jsonify({'error': f'radius must be in (0, {OVERPASS_MAX_RADIUS_M:g}] metres'}), 400
+        stations = fetch_gas_stations(lat, lng, radius)
+        return jsonify({'stations': stations, 'count': len(stations)})
+    except OverpassError as e:
+        print(f"Error fetching gas stations: {e}")
+        return jsonify({'error': str(e)}), 502
+    except Exception as e:
+        print(f"Error in gas stations: {e}")
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/overpass/status')
+def overpass_status():
+    """Overpass endpoint, tile cache settings and request counters"""
+    return jsonify(overpass_client.get_status())
+
+@app.route('/metrics')
+def metrics():
+    """Request metrics in the Prometheus text exposition format"""
+    return Response(request_metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def start_background_workers():
+    """Start the table refresher, online updater and ingest writer threads"""
+    wait_time_table.start(_wait_table_stations)
+    wait_time_updater.start()
+    event_ingest.start()
+
+if os.environ.get('WARM_UP_ON_START', '').lower() in ('1', 'true', 'yes'):
+    warm_up_all(background=True)
+
+# Importing the app starts no threads and builds no models: entry points
+# (python app.py, serve.py) call start_background_workers() themselves. Other
+# WSGI servers importing app:app can set START_BACKGROUND_WORKERS=1 instead.
+if os.environ.get('START_BACKGROUND_WORKERS', '').lower() in ('1', 'true', 'yes'):
+    start_background_workers()
+
 if __name__ == '__main__':
+    # With the debug reloader, only the serving child process runs the workers
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_workers()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,5 @@
+"""
+Benchmarks
+Synthetic station catalogs, routes and fueling histories at several scales,
+and a runner that times the app's hot paths and stores the results as JSON
+"""
@@ -0,0 +1,288 @@
+"""
+Load-test the app over HTTP with a weighted mix of map traffic.
+
+Starts the app in a separate process on a free local port (or targets --url),
+backed by a synthetic station catalog and a seeded fueling history, then runs
+--concurrency closed-loop clients for --duration seconds. Each client picks the
+next request from the weighted mix: nearby stations, optimize-locations,
+route-plan or the analytics bundle. Reports throughput and p50/p95/p99 latency
+per endpoint and overall. Nothing outside this machine is contacted.
+
+Usage: python benchmarks/load_test.py [--concurrency 8] [--duration 30]
+       [--mix nearby=50,optimize=10,route=15,analytics=25] [--stations 10k] [--output load.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import requests
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks import synthetic  # noqa: E402
+from benchmarks.run import SCALES  # noqa: E402
+
+DEFAULT_MIX = 'nearby=50,optimize=10,route=15,analytics=25'
+ANALYTICS_USER = 'User'  # the session-less default user of the analytics routes
+
+SERVER_CODE = """
+import sys
+from werkzeug.serving import run_simple
+import app
+app.start_background_workers()
+run_simple('127.0.0.1', int(sys.argv[1]), app.app, threaded=True)
+"""
+
+
+def parse_mix(text: str):
+    """{'nearby': 50, ...} from 'nearby=50,optimize=10'"""
+    mix = {}
+    for part in text.split(','):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in REQUEST_BUILDERS:
+            raise ValueError(f"unknown endpoint {name!r} (choose from {', '.join(REQUEST_BUILDERS)})")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("the mix needs at least one endpoint with a positive weight")
+    return mix
+
+
+class Workload:
+    """Request inputs drawn from the synthetic data the server was started with"""
+
+    def __init__(self, catalog, route_set, seed: int = 0):
+        self.points = list(zip(catalog['@lat'].tolist(), catalog['@lon'].tolist()))
+        self.routes = route_set
+        self.seed = seed
+
+    def point(self, rng: random.Random):
+        return rng.choice(self.points)
+
+
+def nearby_request(workload: Workload, rng: random.Random):
+    lat, lng = workload.point(rng)
+    return 'GET', f'/api/stations/{lat}/{lng}', {'params': {'radius': 5}}
+
+
+def optimize_request(workload: Workload, rng: random.Random):
+    lat, lng = workload.point(rng)
+    return 'GET', f'/api/optimize-locations/{lat}/{lng}', {'params': {'radius': 10, 'num_stations': 3}}
+
+
+def route_request(workload: Workload, rng: random.Random):
+    payload = {
+        'route': rng.choice(workload.routes),
+        'currentFuel': rng.uniform(25, 90),
+        'cngModel': {'name': 'Load Test CNG', 'tankCapacity': 12, 'range': 320, 'fillingSpeed': 10, 'consumption': 0.2}
+    }
+    return 'POST', '/api/route-plan', {'json': payload}
+
+
+def analytics_request(workload: Workload, rng: random.Random):
+    return 'GET', '/api/analytics/bundle', {'params': {'limit': 10}}
+
+
+REQUEST_BUILDERS = {
+    'nearby': nearby_request,
+    'optimize': optimize_request,
+    'route': route_request,
+    'analytics': analytics_request
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(work_dir: str, catalog_path: str, history_path: str, timeout: float = 180.0):
+    """Run the app in its own process and wait until every lazy resource is built"""
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        'STATIONS_FILE_PATH': catalog_path,
+        'FUELING_DB_PATH': history_path,
+        'WARM_UP_ON_START': '1'
+    })
+    log = open(os.path.join(work_dir, 'server.log'), 'w')
+    process = subprocess.Popen([sys.executable, '-c', SERVER_CODE, str(port)],
+                               cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}, see {log.name}")
+        try:
+            status = requests.get(url + '/api/startup-status', timeout=2).json()
+            if all(r['ready'] or r['error'] for r in status['resources']):
+                return process, url
+        except (requests.RequestException, ValueError):
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError(f"server not ready after {timeout:.0f} s")
+
+
+def run_clients(url: str, workload: Workload, mix, concurrency: int, duration: float,
+                warmup: float, seed: int):
+    """Closed-loop clients; returns (endpoint, latency seconds, ok) samples after warm-up"""
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    samples = []
+    lock = threading.Lock()
+    start = time.monotonic()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+
+    def client(index: int):
+        rng = random.Random(seed * 1000 + index)
+        session = requests.Session()
+        local = []
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                break
+            name = rng.choices(names, weights)[0]
+            method, path, kwargs = REQUEST_BUILDERS[name](workload, rng)
+            sent = time.perf_counter()
+            try:
+                response = session.request(method, url + path, timeout=60, **kwargs)
+                response.content
+                ok = response.status_code < 400
+            except requests.RequestException:
+                ok = False
+            latency = time.perf_counter() - sent
+            if now >= measure_from:
+                local.append((name, latency, ok))
+        session.close()
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples
+
+
+def summarize(samples, duration: float):
+    """Throughput and latency percentiles per endpoint plus an 'all' row"""
+    def stats(rows):
+        latencies = np.array([r[1] for r in rows]) * 1000
+        errors = sum(1 for r in rows if not r[2])
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (None,) * 3
+        return {
+            'requests': len(rows),
+            'errors': errors,
+            'throughput_rps': round(len(rows) / duration, 2),
+            'mean_ms': round(float(latencies.mean()), 2) if len(rows) else None,
+            'p50_ms': round(float(p50), 2) if p50 is not None else None,
+            'p95_ms': round(float(p95), 2) if p95 is not None else None,
+            'p99_ms': round(float(p99), 2) if p99 is not None else None,
+            'max_ms': round(float(latencies.max()), 2) if len(rows) else None
+        }
+
+    by_endpoint = {}
+    for row in samples:
+        by_endpoint.setdefault(row[0], []).append(row)
+    summary = {name: stats(rows) for name, rows in sorted(by_endpoint.items())}
+    summary['all'] = stats(samples)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='HTTP load test with a weighted request mix')
+    parser.add_argument('--url', help='Target an already running app instead of starting one '
+                                      '(its catalog should match --stations/--seed)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=30.0, help='Measured seconds')
+    parser.add_argument('--warmup', type=float, default=3.0, help='Unmeasured seconds before measuring')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Endpoint weights (default {DEFAULT_MIX})')
+    parser.add_argument('--stations', default='250', help=f"Catalog scale: {', '.join(SCALES)}")
+    parser.add_argument('--history', type=int, default=10_000, help='Fueling events seeded for the analytics user')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for data and request choice')
+    parser.add_argument('--output', help='Write results as JSON')
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        print(f"Invalid --mix: {e}")
+        return 1
+    if args.stations not in SCALES:
+        print(f"Unknown --stations scale: {args.stations}")
+        return 1
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        catalog_path = os.path.join(work_dir, 'stations.csv')
+        catalog = synthetic.write_station_catalog(catalog_path, SCALES[args.stations], args.seed)
+        workload = Workload(catalog, synthetic.routes(20, seed=args.seed), args.seed)
+
+        process = None
+        url = args.url
+        if not url:
+            from models.fueling_history import FuelingHistory
+            history_path = os.path.join(work_dir, 'history.db')
+            history = FuelingHistory(history_path)
+            for i in range(0, args.history, 10_000):
+                history.insert_events(ANALYTICS_USER,
+                                      synthetic.fueling_records(min(10_000, args.history - i), seed=args.seed + i))
+            print(f"Starting app with {len(catalog)} stations and {args.history} fueling events...")
+            process, url = start_server(work_dir, catalog_path, history_path)
+
+        try:
+            print(f"Running {args.concurrency} clients for {args.duration:.0f} s "
+                  f"(+{args.warmup:.0f} s warm-up) against {url}")
+            samples = run_clients(url, workload, mix, args.concurrency, args.duration, args.warmup, args.seed)
+        finally:
+            if process:
+                process.terminate()
+                process.wait(timeout=10)
+
+    summary = summarize(samples, args.duration)
+    print(f"{'endpoint':<12}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, row in summary.items():
+        if not row['requests']:
+            continue
+        print(f"{name:<12}{row['requests']:>10}{row['errors']:>8}{row['throughput_rps']:>9.1f}"
+              f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+
+    if args.output:
+        report = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'url': args.url or 'local',
+                'concurrency': args.concurrency,
+                'duration_seconds': args.duration,
+                'warmup_seconds': args.warmup,
+                'mix': mix,
+                'stations': SCALES[args.stations],
+                'history_events': args.history,
+                'seed': args.seed
+            },
+            'endpoints': summary
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""
+Benchmark the app's hot paths on synthetic data.
+
+For each scale a station catalog (in the shipped CSV schema), a set of routes
+and a fueling history of that many rows are generated into a temporary
+directory, then the catalog reader, the /api/stations radius query, the
+location optimizer, route planning, wait time prediction, event ingest and the
+analytics getters are timed. Results are written as JSON; pass --compare with
+an earlier result file to print the change per benchmark.
+
+A benchmark is skipped at a scale when extrapolating its time from the
+previous scale would blow the per-benchmark --budget, so 1m runs finish even
+where a code path is still quadratic.
+
+Usage: python benchmarks/run.py [--scales 250,10k,1m] [--output bench.json] [--compare old.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+SCALES = {'250': 250, '10k': 10_000, '1m': 1_000_000}
+DEFAULT_SCALES = '250,10k'
+ROUTES = 5
+QUERY_POINTS = 10
+BENCH_USER = 'bench'
+
+
+class Runner:
+    """Times callables and skips those whose extrapolated cost exceeds the budget"""
+
+    def __init__(self, repeat: int, budget: float):
+        self.repeat = repeat
+        self.budget = budget
+        self._previous = {}  # benchmark -> (scale size, mean seconds per call)
+
+    def measure(self, name, size, fn):
+        """First-call and steady-state timings of fn() in milliseconds"""
+        previous = self._previous.get(name)
+        if previous is not None:
+            estimate = previous[1] * size / previous[0]
+            if estimate > self.budget:
+                return {'skipped': f'estimated {estimate:.0f} s per call exceeds budget of {self.budget:.0f} s'}
+
+        times = []
+        spent = 0.0
+        while len(times) < self.repeat + 1 and (not times or spent < self.budget):
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+            times.append(elapsed)
+            spent += elapsed
+
+        steady = times[1:] or times
+        self._previous[name] = (size, statistics.fmean(steady))
+        return {
+            'first_ms': round(times[0] * 1000, 3),
+            'runs': len(steady),
+            'min_ms': round(min(steady) * 1000, 3),
+            'median_ms': round(statistics.median(steady) * 1000, 3),
+            'mean_ms': round(statistics.fmean(steady) * 1000, 3),
+            'max_ms': round(max(steady) * 1000, 3)
+        }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def cycle(items):
+    """Endless iterator over items so repeated calls vary their input"""
+    while True:
+        yield from items
+
+
+def run_scale(app_module, runner: Runner, label: str, size: int, work_dir: str, seed: int):
+    """Generate data for one scale and time every benchmark against it"""
+    import numpy as np
+    from benchmarks import synthetic
+    from models.fueling_history import FuelingHistory
+    from models.location_optimizer import LocationOptimizer
+    from models.user_analytics import UserAnalytics
+    from models.wait_time_predictor import WaitTimePredictor
+
+    results = {}
+
+    def timed(name, fn):
+        results[name] = runner.measure(name, size, fn)
+        entry = results[name]
+        detail = entry['skipped'] if 'skipped' in entry else \
+            f"median {entry['median_ms']:.2f} ms (first {entry['first_ms']:.2f} ms, {entry['runs']} runs)"
+        print(f"  {name:<32}{detail}")
+        return 'skipped' not in entry
+
+    start = time.perf_counter()
+    catalog_path = os.path.join(work_dir, f'stations_{label}.csv')
+    catalog = synthetic.write_station_catalog(catalog_path, size, seed)
+    route_set = synthetic.routes(ROUTES, seed=seed)
+    print(f"[{label}] generated {size} stations and {ROUTES} routes in {time.perf_counter() - start:.1f} s")
+    os.environ['STATIONS_FILE_PATH'] = catalog_path
+
+    # Catalog reading and the radius query, through the real route
+    timed('read_stations_file', app_module._read_stations_file)
+    client = app_module.app.test_client()
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, size, size=QUERY_POINTS)
+    points = cycle(list(zip(catalog['@lat'].to_numpy()[picks], catalog['@lon'].to_numpy()[picks])))
+
+    def nearby():
+        lat, lng = next(points)
+        response = client.get(f'/api/stations/{lat}/{lng}?radius=5')
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/stations returned {response.status_code}")
+    timed('api_stations_radius_5km', nearby)
+
+    # Location optimizer: catalog load and one optimization around a station
+    if timed('location_optimizer_load', lambda: LocationOptimizer(catalog_path)):
+        optimizer = LocationOptimizer(catalog_path)
+        timed('optimize_station_locations',
+              lambda: optimizer.optimize_station_locations(*next(points), radius_km=10.0, num_stations=3))
+    else:
+        results['optimize_station_locations'] = {'skipped': 'location optimizer load was skipped'}
+
+    # Route planning: station lookup in the route bbox plus the stop calculation
+    plans = cycle(route_set)
+    ev_specs = {'batteryCapacity': 12.0, 'chargingSpeed': 10.0, 'consumption': 0.2, 'range': 320.0}
+
+    def bbox_stations():
+        route = next(plans)
+        return app_module.fetch_stations_in_bbox(app_module.calculate_route_bbox(route['coordinates']))
+    timed('fetch_stations_in_bbox', bbox_stations)
+
+    # Stop calculation gets the same bbox stations, selected straight from the
+    # generated catalog so it does not depend on the lookup being fast
+    prepared = []
+    for route in route_set:
+        bbox = app_module.calculate_route_bbox(route['coordinates'])
+        inside = catalog[catalog['@lat'].between(bbox['min_lat'], bbox['max_lat']) &
+                         catalog['@lon'].between(bbox['min_lng'], bbox['max_lng'])]
+        stations = [{'name': name, 'lat': lat, 'lng': lng, 'type': 'CNG Pump'}
+                    for name, lat, lng in zip(inside['name'], inside['@lat'], inside['@lon'])]
+        prepared.append((route, stations or app_module.fetch_stations_in_bbox(bbox)))
+    prepared_cycle = cycle(prepared)
+
+    def charging_stops():
+        route, stations = next(prepared_cycle)
+        app_module.station_calculator.calculate_charging_stops(
+            route_data=route, ev_specs=ev_specs, current_charge=60.0, available_stations=stations)
+    timed('calculate_charging_stops', charging_stops)
+
+    # Wait time prediction for every station in the catalog
+    predictor = WaitTimePredictor()
+    predictor.train(*synthetic.wait_training_set(5000, seed))
+    features = [{
+        'id': f"{lat:.6f},{lng:.6f}", 'active_chargers': 1, 'total_chargers': 2,
+        'current_queue_length': 3, 'hour_of_day': 18, 'day_of_week': 4, 'is_weekend': 0,
+        'traffic_density': 0.5, 'historical_avg_wait_time': 10.0
+    } for lat, lng in zip(catalog['@lat'].tolist(), catalog['@lon'].tolist())]
+    timed('predict_wait_time', lambda: predictor.predict_wait_time(features))
+
+    # Fueling history ingest and the analytics getters
+    # (generated batch by batch so a 1m history never sits in memory as dicts)
+    history = FuelingHistory(os.path.join(work_dir, f'history_{label}.db'))
+    batch = 10_000
+    ingest = 0.0
+    for i in range(0, size, batch):
+        records = synthetic.fueling_records(min(batch, size - i), seed=seed + i)
+        ingest_start = time.perf_counter()
+        history.insert_events(BENCH_USER, records)
+        ingest += time.perf_counter() - ingest_start
+    results['insert_events'] = {'rows': size, 'total_ms': round(ingest * 1000, 3),
+                                'rows_per_second': round(size / ingest) if ingest else None}
+    print(f"  {'insert_events':<32}{size} rows in {ingest * 1000:.1f} ms")
+
+    analytics = UserAnalytics(history)
+    for getter in ('get_overview_stats', 'get_usage_patterns', 'get_efficiency_analysis',
+                   'get_cost_analysis', 'get_wait_time_analysis', 'get_recommendations',
+                   'get_recent_activity', 'get_analytics_bundle'):
+        method = getattr(analytics, getter)
+        timed(getter, (lambda m: lambda: m(username=BENCH_USER))(method))
+
+    return results
+
+
+def print_comparison(current, baseline):
+    """Median-time ratio (current / baseline) per scale and benchmark"""
+    print(f"\n{'scale':<8}{'benchmark':<34}{'baseline ms':>14}{'current ms':>14}{'ratio':>8}")
+    for label, benches in current['results'].items():
+        old = baseline.get('results', {}).get(label, {})
+        for name, entry in benches.items():
+            before = old.get(name, {}).get('median_ms')
+            after = entry.get('median_ms')
+            if before is None or after is None:
+                continue
+            ratio = after / before if before else float('inf')
+            print(f"{label:<8}{name:<34}{before:>14.2f}{after:>14.2f}{ratio:>8.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark hot paths on synthetic data')
+    parser.add_argument('--scales', default=DEFAULT_SCALES,
+                        help=f"Comma-separated scales from {', '.join(SCALES)} (default {DEFAULT_SCALES})")
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per benchmark after the first call')
+    parser.add_argument('--budget', type=float, default=60.0, help='Seconds one benchmark may spend per scale')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic data')
+    parser.add_argument('--output', help='Write results as JSON')
+    parser.add_argument('--compare', help='Earlier result JSON to compare against')
+    args = parser.parse_args(argv)
+
+    labels = [s.strip().lower() for s in args.scales.split(',') if s.strip()]
+    unknown = [s for s in labels if s not in SCALES]
+    if unknown:
+        print(f"Unknown scales: {', '.join(unknown)}")
+        return 1
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # The app must not start its background workers or touch the real database
+        os.environ.pop('START_BACKGROUND_WORKERS', None)
+        os.environ['FUELING_DB_PATH'] = os.path.join(work_dir, 'app_history.db')
+        os.environ.pop('WARM_UP_ON_START', None)
+        import app as app_module
+        import numpy as np
+
+        report = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'git_revision': git_revision(),
+                'python': sys.version.split()[0],
+                'numpy': np.__version__,
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+                'repeat': args.repeat,
+                'budget_seconds': args.budget,
+                'seed': args.seed
+            },
+            'results': {}
+        }
+        runner = Runner(args.repeat, args.budget)
+        for label in labels:
+            report['results'][label] = run_scale(app_module, runner, label, SCALES[label], work_dir, args.seed)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(report, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Synthetic Benchmark Data
+Station catalogs in the CNG_pumps_with_Erlang-C_waiting_times_250.csv schema,
+route polylines and fueling histories, generated reproducibly from a seed
+"""
+
+import math
+from datetime import datetime, timedelta
+from typing import Dict, Any, List
+
+import numpy as np
+import pandas as pd
+
+from models.fueling_history import STATION_TYPES
+
+
+# Column order of the shipped station catalog
+CATALOG_COLUMNS = [
+    'name', '@lat', '@lon',
+    'demo_arrivals_per_hr_morning', 'demo_arrivals_per_hr_evening', 'demo_overall_arrivals_per_hr',
+    'demo_avg_service_time_min', 'demo_servers_disp', 'demo_rush_pattern',
+    'Wq_morning_min', 'Wq_evening_min', 'Wq_overall_min', 'Expected_total_station_time_min'
+]
+
+RUSH_PATTERNS = ['Morning peak', 'Evening peak', 'Both peaks', 'Steady']
+
+# Delhi NCR, where the real catalog and the restricted-area polygons are
+CENTER = (28.6139, 77.2090)
+SPAN_DEG = 0.45
+
+NAME_PREFIXES = ['IGL', 'Adani', 'Indraprastha', 'Haryana City Gas', 'Green Gas']
+
+
+def erlang_c_wait(arrivals_per_hr: np.ndarray, service_min: np.ndarray, servers: np.ndarray) -> np.ndarray:
+    """M/M/c mean queueing delay in minutes (inf where the station is overloaded)"""
+    lam = arrivals_per_hr / 60.0
+    mu = 1.0 / service_min
+    load = lam / mu                       # offered load in Erlangs
+    rho = load / servers
+
+    # sum_{k<c} load^k / k!, accumulated term by term up to the largest c
+    term = np.ones_like(load)
+    partial = np.zeros_like(load)
+    for k in range(int(servers.max())):
+        partial += np.where(k < servers, term, 0.0)
+        term = term * load / (k + 1)
+    tail = np.zeros_like(load)
+    for c in np.unique(servers):
+        mask = servers == c
+        tail[mask] = load[mask] ** c / math.factorial(int(c))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stable = rho < 1
+        tail_weight = tail / np.where(stable, 1 - rho, 1)
+        p_wait = tail_weight / (partial + tail_weight)
+        wait = p_wait / (servers * mu - lam)
+    return np.where(stable, wait, np.inf)
+
+
+def station_catalog(n: int, seed: int = 0) -> pd.DataFrame:
+    """n stations scattered around NCR with Erlang-C waits derived from their demand"""
+    rng = np.random.default_rng(seed)
+
+    # Clustered like real pumps: most sit near a handful of hubs
+    hubs = rng.uniform(-SPAN_DEG, SPAN_DEG, size=(12, 2))
+    hub = rng.integers(0, len(hubs), size=n)
+    spread = np.where(rng.random(n) < 0.8, 0.05, SPAN_DEG / 2)
+    lat = CENTER[0] + hubs[hub, 0] + rng.normal(0, 1, n) * spread
+    lon = CENTER[1] + hubs[hub, 1] + rng.normal(0, 1, n) * spread
+
+    servers = rng.integers(1, 7, size=n)
+    service = np.round(rng.uniform(3.0, 8.0, size=n), 1)
+    capacity = servers * 60.0 / service
+    overall = np.round(capacity * rng.uniform(0.3, 1.02, size=n), 2)
+    morning = np.round(overall * rng.uniform(1.0, 1.4, size=n), 2)
+    evening = np.round(overall * rng.uniform(1.0, 1.4, size=n), 2)
+
+    wq_morning = erlang_c_wait(morning, service, servers)
+    wq_evening = erlang_c_wait(evening, service, servers)
+    wq_overall = erlang_c_wait(overall, service, servers)
+
+    prefixes = np.array(NAME_PREFIXES)[rng.integers(0, len(NAME_PREFIXES), size=n)]
+    names = np.char.add(np.char.add(prefixes.astype(str), ' CNG Station '), np.arange(1, n + 1).astype(str))
+
+    return pd.DataFrame({
+        'name': names,
+        '@lat': np.round(lat, 7),
+        '@lon': np.round(lon, 7),
+        'demo_arrivals_per_hr_morning': morning,
+        'demo_arrivals_per_hr_evening': evening,
+        'demo_overall_arrivals_per_hr': overall,
+        'demo_avg_service_time_min': service,
+        'demo_servers_disp': servers,
+        'demo_rush_pattern': np.array(RUSH_PATTERNS)[rng.integers(0, len(RUSH_PATTERNS), size=n)],
+        'Wq_morning_min': np.round(wq_morning, 3),
+        'Wq_evening_min': np.round(wq_evening, 3),
+        'Wq_overall_min': np.round(wq_overall, 3),
+        'Expected_total_station_time_min': np.round(wq_overall + service, 3)
+    }, columns=CATALOG_COLUMNS)
+
+
+def write_station_catalog(path: str, n: int, seed: int = 0) -> pd.DataFrame:
+    """Write a synthetic catalog CSV (overloaded stations keep the catalog's 'inf' waits)"""
+    catalog = station_catalog(n, seed)
+    catalog.to_csv(path, index=False)
+    return catalog
+
+
+def routes(count: int, points: int = 200, seed: int = 0) -> List[Dict[str, Any]]:
+    """Random-walk route polylines across NCR as route-plan payload 'route' objects"""
+    rng = np.random.default_rng(seed)
+    result = []
+    for _ in range(count):
+        start = np.array(CENTER) + rng.uniform(-SPAN_DEG, SPAN_DEG, size=2)
+        heading = rng.uniform(0, 2 * np.pi)
+        headings = heading + np.cumsum(rng.normal(0, 0.15, size=points - 1))
+        steps = rng.uniform(0.002, 0.01, size=points - 1)[:, None] * np.column_stack([np.sin(headings), np.cos(headings)])
+        coords = np.vstack([start, start + np.cumsum(steps, axis=0)])
+
+        lat1, lon1 = np.radians(coords[:-1, 0]), np.radians(coords[:-1, 1])
+        lat2, lon2 = np.radians(coords[1:, 0]), np.radians(coords[1:, 1])
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        distance = float((6371.0 * 2 * np.arcsin(np.sqrt(a))).sum())
+
+        result.append({'distance': round(distance, 3), 'coordinates': coords.round(6).tolist()})
+    return result
+
+
+def fueling_records(n: int, days: int = 365, seed: int = 0,
+                    end: datetime = datetime(2026, 1, 1)) -> List[Dict[str, Any]]:
+    """n fueling events over the last `days` days in the format FuelingHistory.insert_events takes"""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64(end - timedelta(days=days), 's')
+    offsets = np.sort(rng.integers(0, days * 86400, size=n))
+    stamps = (start + offsets.astype('timedelta64[s]')).astype(str)
+
+    amount = np.round(rng.uniform(3.0, 12.0, size=n), 2)
+    efficiency = np.round(rng.normal(22.0, 3.0, size=n).clip(8.0, 35.0), 2)
+    distance = np.round(amount * efficiency, 1)
+    cost = np.round(amount * rng.uniform(74.0, 80.0, size=n), 2)
+    wait = np.round(rng.gamma(2.0, 4.0, size=n), 1)
+    station_type = np.array(STATION_TYPES)[rng.integers(0, len(STATION_TYPES), size=n)]
+
+    return [{
+        'timestamp': ts,
+        'charge_amount_kg': float(a),
+        'cost': float(c),
+        'wait_time_minutes': float(w),
+        'distance_km': float(d),
+        'efficiency_km_per_kg': float(e),
+        'station_type': str(s)
+    } for ts, a, c, w, d, e, s in zip(stamps.tolist(), amount, cost, wait, distance, efficiency, station_type)]
+
+
+def wait_training_set(n: int, seed: int = 0):
+    """Feature rows and wait targets for training a WaitTimePredictor"""
+    rng = np.random.default_rng(seed)
+    total = rng.integers(1, 7, size=n)
+    active = np.minimum(total, rng.integers(1, 7, size=n))
+    queue_length = rng.poisson(3, size=n)
+    hour = rng.integers(0, 24, size=n)
+    day = rng.integers(0, 7, size=n)
+    traffic = rng.random(n)
+    historical = rng.uniform(2, 25, size=n)
+    wait = np.maximum(0, queue_length * 4.0 / active + traffic * 5 + historical * 0.3 + rng.normal(0, 2, n))
+
+    rows = [{
+        'active_chargers': int(a), 'total_chargers': int(t), 'current_queue_length': int(q),
+        'hour_of_day': int(h), 'day_of_week': int(d), 'is_weekend': int(d >= 5),
+        'traffic_density': float(tr), 'historical_avg_wait_time': float(hi)
+    } for a, t, q, h, d, tr, hi in zip(active, total, queue_length, hour, day, traffic, historical)]
+    return rows, wait
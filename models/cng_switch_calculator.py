@@ -4,7 +4,7 @@ Calculates the financial and environmental benefits of switching from petrol/die
 """
 
 import numpy as np
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Sequence
 from datetime import datetime, timedelta
 
 
@@ -43,6 +43,19 @@ class CNGSwitchCalculator:
         'cng': 1.86      # kg CO2 per kg
     }
     
+    # Fleet request limits: per-vehicle arrays scale with the fleet, and the
+    # monthly series is a (vehicles x months) matrix serialized to JSON
+    MAX_FLEET_VEHICLES = 100_000
+    MAX_FLEET_MONTHS = 240
+    MAX_FLEET_MONTHLY_CELLS = 1_000_000
+    
+    # Monte Carlo size limits: each (samples x months) intermediate is
+    # float32, so 2M cells keep one run to a few tens of MB
+    MAX_SENSITIVITY_SAMPLES = 50000
+    MAX_SENSITIVITY_MONTHS = 240
+    MAX_SENSITIVITY_CELLS = 2_000_000
+    MAX_BREAKEVEN_HORIZONS = 12
+    
     def __init__(self):
         """Initialize the CNG switch calculator"""
         pass
@@ -232,6 +245,392 @@ class CNGSwitchCalculator:
         
         return breakdown
     
+    def fleet_arrays(self,
+                     vehicle_types: Sequence[str],
+                     current_fuels: Sequence[str],
+                     daily_km: Sequence[float],
+                     current_mileage: Optional[Sequence[Optional[float]]] = None) -> Dict[str, np.ndarray]:
+        """
+        Per-vehicle cost, payback, ROI and emission arrays for a whole fleet
+        
+        Inputs are columns of equal length; a missing or non-positive mileage
+        falls back to the fuel's default, exactly as calculate_savings does.
+        Vehicles that never pay back have payback_months = inf.
+        """
+        vehicle_types = np.asarray(vehicle_types, dtype=str)
+        fuels = np.asarray(current_fuels, dtype=str)
+        daily_km = np.asarray(daily_km, dtype=np.float64)
+        n = len(daily_km)
+        if len(vehicle_types) != n or len(fuels) != n:
+            raise ValueError("vehicle_type, fuel and daily_km must have the same length")
+        
+        is_petrol = fuels == 'petrol'
+        default_mileage = np.where(is_petrol, self.PETROL_MILEAGE, self.DIESEL_MILEAGE)
+        if current_mileage is None:
+            mileage = default_mileage
+        else:
+            mileage = np.asarray(current_mileage, dtype=np.float64)  # None becomes NaN
+            if len(mileage) != n:
+                raise ValueError("mileage must have the same length as daily_km")
+            mileage = np.where(np.isfinite(mileage) & (mileage > 0), mileage, default_mileage)
+        
+        def lookup(values, table, default):
+            keys, inverse = np.unique(values, return_inverse=True)
+            return np.array([table.get(k, default) for k in keys.tolist()], dtype=np.float64)[inverse]
+        
+        annual_km = daily_km * 365
+        fuel_price = np.where(is_petrol, self.PETROL_PRICE, self.DIESEL_PRICE)
+        current_fuel_cost = annual_km / mileage * fuel_price
+        cng_fuel_cost = annual_km / self.CNG_MILEAGE * self.CNG_PRICE
+        current_maintenance = lookup(fuels, self.MAINTENANCE_COSTS, 15000)
+        cng_maintenance = self.MAINTENANCE_COSTS['cng']
+        
+        annual_savings = (current_fuel_cost - cng_fuel_cost) + (current_maintenance - cng_maintenance)
+        conversion_cost = lookup(vehicle_types, self.CONVERSION_COSTS, 50000)
+        with np.errstate(divide='ignore'):
+            payback_months = np.where(annual_savings > 0, conversion_cost / annual_savings * 12, np.inf)
+        five_year_savings = annual_savings * 5 - conversion_cost
+        
+        current_emissions = annual_km / mileage * lookup(fuels, self.EMISSION_FACTORS, 2.0)
+        cng_emissions = annual_km / self.CNG_MILEAGE * self.EMISSION_FACTORS['cng']
+        
+        return {
+            'vehicle_type': vehicle_types,
+            'current_annual_cost': current_fuel_cost + current_maintenance,
+            'cng_annual_cost': cng_fuel_cost + cng_maintenance,
+            'annual_savings': annual_savings,
+            'conversion_cost': conversion_cost,
+            'payback_months': payback_months,
+            'five_year_savings': five_year_savings,
+            'roi_percentage': np.where(conversion_cost > 0, five_year_savings / conversion_cost * 100, 0.0),
+            'emissions_reduction_kg': current_emissions - cng_emissions
+        }
+    
+    def calculate_fleet(self,
+                        vehicle_types: Sequence[str],
+                        current_fuels: Sequence[str],
+                        daily_km: Sequence[float],
+                        current_mileage: Optional[Sequence[Optional[float]]] = None,
+                        include_vehicles: bool = False,
+                        include_monthly: bool = False,
+                        months: int = 60,
+                        enforce_limits: bool = True) -> Dict[str, Any]:
+        """
+        Fleet-wide savings analysis from columnar vehicle inputs
+        
+        Returns fleet totals, percentile distributions, a payback histogram and
+        a per-vehicle-type summary. Per-vehicle columns and the (vehicles x
+        months) cumulative savings matrix are only built when asked for.
+        
+        With enforce_limits (the default, used for web requests) the fleet
+        size, months and monthly matrix size are capped by the MAX_FLEET_*
+        constants; offline tools may turn the caps off.
+        """
+        if months <= 0:
+            raise ValueError("months must be positive")
+        if enforce_limits:
+            if len(daily_km) > self.MAX_FLEET_VEHICLES:
+                raise ValueError(f"at most {self.MAX_FLEET_VEHICLES} vehicles per request")
+            if months > self.MAX_FLEET_MONTHS:
+                raise ValueError(f"at most {self.MAX_FLEET_MONTHS} months")
+            if include_monthly and len(daily_km) * months > self.MAX_FLEET_MONTHLY_CELLS:
+                raise ValueError(f"monthly series limited to {self.MAX_FLEET_MONTHLY_CELLS} vehicles x months")
+        arrays = self.fleet_arrays(vehicle_types, current_fuels, daily_km, current_mileage)
+        n = len(arrays['annual_savings'])
+        payback = arrays['payback_months']
+        pays_back = np.isfinite(payback)
+        
+        def distribution(values):
+            values = values[np.isfinite(values)]
+            if not values.size:
+                return None
+            p10, p25, p50, p75, p90 = np.percentile(values, [10, 25, 50, 75, 90])
+            return {
+                'mean': round(float(values.mean()), 2),
+                'p10': round(float(p10), 2), 'p25': round(float(p25), 2), 'p50': round(float(p50), 2),
+                'p75': round(float(p75), 2), 'p90': round(float(p90), 2)
+            }
+        
+        edges = [0, 12, 24, 36, 60]
+        counts = np.histogram(payback[pays_back], bins=edges + [np.inf])[0]
+        labels = ['0-12', '12-24', '24-36', '36-60', '60+']
+        
+        types, inverse = np.unique(arrays['vehicle_type'], return_inverse=True)
+        type_counts = np.bincount(inverse, minlength=len(types))
+        type_savings = np.bincount(inverse, weights=arrays['annual_savings'], minlength=len(types))
+        type_conversion = np.bincount(inverse, weights=arrays['conversion_cost'], minlength=len(types))
+        
+        result = {
+            'vehicles': n,
+            'totals': {
+                'current_annual_cost': round(float(arrays['current_annual_cost'].sum()), 2),
+                'cng_annual_cost': round(float(arrays['cng_annual_cost'].sum()), 2),
+                'annual_savings': round(float(arrays['annual_savings'].sum()), 2),
+                'conversion_cost': round(float(arrays['conversion_cost'].sum()), 2),
+                'five_year_savings': round(float(arrays['five_year_savings'].sum()), 2),
+                'annual_emissions_reduction_kg': round(float(arrays['emissions_reduction_kg'].sum()), 2),
+                'vehicles_paying_back': int(pays_back.sum())
+            },
+            'distributions': {
+                'annual_savings': distribution(arrays['annual_savings']),
+                'payback_months': distribution(payback),
+                'roi_percentage': distribution(arrays['roi_percentage']),
+                'emissions_reduction_kg': distribution(arrays['emissions_reduction_kg'])
+            },
+            'payback_histogram': dict(zip(labels + ['never'], counts.tolist() + [int(n - pays_back.sum())])),
+            'by_vehicle_type': {
+                vtype: {
+                    'vehicles': int(count),
+                    'annual_savings': round(float(savings), 2),
+                    'conversion_cost': round(float(conversion), 2)
+                }
+                for vtype, count, savings, conversion in zip(types.tolist(), type_counts, type_savings, type_conversion)
+            }
+        }
+        
+        if include_vehicles:
+            result['per_vehicle'] = {
+                name: np.round(values, 2).tolist() if values.dtype.kind == 'f' else values.tolist()
+                for name, values in arrays.items()
+            }
+            # JSON has no infinity; vehicles that never pay back get null
+            result['per_vehicle']['payback_months'] = [
+                round(float(p), 2) if np.isfinite(p) else None for p in payback
+            ]
+        if include_monthly:
+            month_index = np.arange(1, months + 1)
+            cumulative = arrays['annual_savings'][:, None] / 12 * month_index - arrays['conversion_cost'][:, None]
+            result['monthly_cumulative_savings'] = np.round(cumulative, 2).tolist()
+        
+        return result
+    
+    def simulate_sensitivity(self,
+                             vehicle_type: str,
+                             current_fuel: str,
+                             daily_km: float,
+                             current_mileage: float = None,
+                             samples: int = 20000,
+                             months: int = 60,
+                             price_drift: float = 0.05,
+                             price_volatility: float = 0.10,
+                             price_correlation: float = 0.7,
+                             km_cv: float = 0.2,
+                             breakeven_months: Sequence[int] = (12, 24, 36, 60),
+                             seed: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Monte Carlo sensitivity of payback to fuel prices and usage
+        
+        Each sample draws correlated monthly log-normal price paths for the
+        current fuel and CNG (annual drift and volatility, starting from the
+        current prices) and a log-normal daily distance around daily_km. Monthly
+        savings for all samples are evaluated as one (samples x months) array
+        and accumulated with cumsum to find the payback month.
+        
+        Args:
+            vehicle_type: Type of vehicle (hatchback, sedan, suv, commercial)
+            current_fuel: Current fuel type (petrol, diesel)
+            daily_km: Expected daily kilometers driven
+            current_mileage: Current vehicle mileage (optional)
+            samples: Number of joint samples (at most MAX_SENSITIVITY_SAMPLES)
+            months: Simulated horizon (at most MAX_SENSITIVITY_MONTHS, and
+                samples x months at most MAX_SENSITIVITY_CELLS)
+            price_drift: Expected annual price growth (shared by all fuels)
+            price_volatility: Annual volatility of each fuel price
+            price_correlation: Correlation between the fuels' monthly price shocks
+            km_cv: Coefficient of variation of daily distance across samples
+            breakeven_months: Horizons to report break-even probabilities for (at
+                most MAX_BREAKEVEN_HORIZONS, each clamped to 1..MAX_SENSITIVITY_MONTHS)
+            seed: Random seed for reproducible runs
+        
+        Returns:
+            Payback percentiles, break-even probabilities and savings percentiles
+        """
+        if samples <= 0 or months <= 0:
+            raise ValueError("samples and months must be positive")
+        if (samples > self.MAX_SENSITIVITY_SAMPLES or months > self.MAX_SENSITIVITY_MONTHS
+                or samples * months > self.MAX_SENSITIVITY_CELLS):
+            raise ValueError(f"at most {self.MAX_SENSITIVITY_SAMPLES} samples, {self.MAX_SENSITIVITY_MONTHS} "
+                             f"months and {self.MAX_SENSITIVITY_CELLS} samples x months per run")
+        if len(breakeven_months) > self.MAX_BREAKEVEN_HORIZONS:
+            raise ValueError(f"at most {self.MAX_BREAKEVEN_HORIZONS} break-even horizons per run")
+        breakeven_months = sorted({min(max(int(n), 1), self.MAX_SENSITIVITY_MONTHS) for n in breakeven_months})
+        if current_mileage is None:
+            current_mileage = self.PETROL_MILEAGE if current_fuel == 'petrol' else self.DIESEL_MILEAGE
+        rng = np.random.default_rng(seed)
+        
+        # Correlated monthly log-price increments for (current fuel, cng); the
+        # other conventional fuel does not affect this vehicle, so it is not drawn
+        rho = float(np.clip(price_correlation, -0.999, 0.999))  # keep the matrix positive definite
+        chol = np.linalg.cholesky(np.array([[1.0, rho], [rho, 1.0]]))
+        monthly_sigma = price_volatility / np.sqrt(12)
+        monthly_mu = np.log1p(price_drift) / 12 - 0.5 * monthly_sigma ** 2
+        # float32 halves memory traffic; cumulative savings are summed in float64
+        shocks = rng.standard_normal((samples, months, 2), dtype=np.float32) @ chol.T.astype(np.float32)
+        log_paths = np.cumsum(np.float32(monthly_mu) + np.float32(monthly_sigma) * shocks, axis=1)
+        current_fuel_price = self.PETROL_PRICE if current_fuel == 'petrol' else self.DIESEL_PRICE
+        prices = np.array([current_fuel_price, self.CNG_PRICE], dtype=np.float32) * np.exp(log_paths)
+        
+        # Log-normal daily distance with mean daily_km and the requested spread
+        km_sigma = np.sqrt(np.log1p(km_cv ** 2))
+        sample_km = daily_km * np.exp(rng.normal(-0.5 * km_sigma ** 2, km_sigma, samples))
+        monthly_km = sample_km[:, None] * 365 / 12
+        
+        maintenance_saving = (self.MAINTENANCE_COSTS.get(current_fuel, 15000) - self.MAINTENANCE_COSTS['cng']) / 12
+        monthly_savings = (monthly_km / current_mileage * prices[:, :, 0]
+                           - monthly_km / self.CNG_MILEAGE * prices[:, :, 1]
+                           + maintenance_saving)
+        
+        conversion_cost = self.CONVERSION_COSTS.get(vehicle_type, 50000)
+        cumulative = np.cumsum(monthly_savings, axis=1, dtype=np.float64) - conversion_cost
+        reached = cumulative >= 0
+        paid_back = reached.any(axis=1)
+        payback = np.where(paid_back, reached.argmax(axis=1) + 1, np.inf)
+        
+        def percentiles(values):
+            qs = np.quantile(values, [0.1, 0.25, 0.5, 0.75, 0.9], method='inverted_cdf')
+            return {
+                label: round(float(q), 2) if np.isfinite(q) else None
+                for label, q in zip(['p10', 'p25', 'p50', 'p75', 'p90'], qs)
+            }
+        
+        return {
+            'samples': samples,
+            'months': months,
+            'deterministic': self.calculate_savings(vehicle_type, current_fuel, daily_km, current_mileage)['roi'],
+            'payback_months': percentiles(payback),
+            'probability_never_within_horizon': round(float(1 - paid_back.mean()), 4),
+            'breakeven_probability': {
+                str(n): round(float((payback <= n).mean()), 4) for n in breakeven_months
+            },
+            'final_cumulative_savings': percentiles(cumulative[:, -1]),
+            'assumptions': {
+                'price_drift': price_drift,
+                'price_volatility': price_volatility,
+                'price_correlation': price_correlation,
+                'km_cv': km_cv
+            }
+        }
+    
+    def _historical_monthly_savings(self, price_history, current_fuel: str, daily_km: float,
+                                    current_mileage: float = None) -> np.ndarray:
+        """Realized saving in every month of a FuelPriceHistory for one usage profile"""
+        if current_mileage is None:
+            current_mileage = self.PETROL_MILEAGE if current_fuel == 'petrol' else self.DIESEL_MILEAGE
+        monthly_km = daily_km * 365 / 12
+        fuel_price = price_history.price('petrol' if current_fuel == 'petrol' else 'diesel')
+        maintenance_saving = (self.MAINTENANCE_COSTS.get(current_fuel, 15000) - self.MAINTENANCE_COSTS['cng']) / 12
+        return (monthly_km / current_mileage * fuel_price
+                - monthly_km / self.CNG_MILEAGE * price_history.price('cng')
+                + maintenance_saving)
+    
+    def backtest(self,
+                 price_history,
+                 vehicle_type: str,
+                 current_fuel: str,
+                 daily_km: float,
+                 current_mileage: float = None,
+                 conversion_date: str = None,
+                 horizon_months: int = None) -> Dict[str, Any]:
+        """
+        Realized month-by-month savings had the vehicle converted on a past date
+        
+        Args:
+            price_history: FuelPriceHistory with the monthly prices to replay
+            vehicle_type: Type of vehicle (hatchback, sedan, suv, commercial)
+            current_fuel: Fuel before conversion (petrol, diesel)
+            daily_km: Average daily kilometers driven
+            current_mileage: Current vehicle mileage (optional)
+            conversion_date: Month of conversion (defaults to the first month of history)
+            horizon_months: Months to replay (defaults to the rest of the history)
+        
+        Returns:
+            Payback month, realized savings and the monthly cumulative series
+        """
+        savings = self._historical_monthly_savings(price_history, current_fuel, daily_km, current_mileage)
+        start = price_history.month_index(conversion_date) if conversion_date else 0
+        end = len(savings) if horizon_months is None else min(len(savings), start + int(horizon_months))
+        conversion_cost = self.CONVERSION_COSTS.get(vehicle_type, 50000)
+        
+        window = savings[start:end]
+        cumulative = np.cumsum(window) - conversion_cost
+        reached = cumulative >= 0
+        fuel = 'petrol' if current_fuel == 'petrol' else 'diesel'
+        
+        return {
+            'conversion_month': str(price_history.months[start]),
+            'months_observed': int(len(window)),
+            'conversion_cost': conversion_cost,
+            'payback_months': int(reached.argmax()) + 1 if reached.any() else None,
+            'realized_savings': round(float(cumulative[-1]), 2) if len(window) else -conversion_cost,
+            'monthly_breakdown': [{
+                'month': str(month),
+                f'{fuel}_price': round(float(fuel_price), 2),
+                'cng_price': round(float(cng_price), 2),
+                'monthly_saving': round(float(saving), 2),
+                'cumulative_saving': round(float(total), 2),
+                'breakeven': bool(total >= 0)
+            } for month, fuel_price, cng_price, saving, total in zip(
+                price_history.months[start:end], price_history.price(fuel)[start:end],
+                price_history.price('cng')[start:end], window, cumulative
+            )]
+        }
+    
+    def backtest_all_dates(self,
+                           price_history,
+                           vehicle_type: str,
+                           current_fuel: str,
+                           daily_km: float,
+                           current_mileage: float = None,
+                           horizons: Sequence[int] = (12, 24, 36, 60)) -> Dict[str, Any]:
+        """
+        Backtest a conversion in every month of the price history at once
+        
+        With prefix sums P of the monthly savings, the cumulative saving k
+        months after converting in month c is P[c + k] - P[c], so the full
+        (conversion month x months since conversion) matrix is one gather.
+        Entries past the end of the history are NaN and never count as paid back.
+        """
+        savings = self._historical_monthly_savings(price_history, current_fuel, daily_km, current_mileage)
+        conversion_cost = self.CONVERSION_COSTS.get(vehicle_type, 50000)
+        n = len(savings)
+        
+        prefix = np.concatenate([[0.0], np.cumsum(savings)])
+        starts = np.arange(n)
+        ends = starts[:, None] + np.arange(1, n + 1)[None, :]
+        observed = ends <= n
+        cumulative = np.where(observed, prefix[np.minimum(ends, n)] - prefix[starts][:, None], np.nan) - conversion_cost
+        
+        reached = cumulative >= 0
+        paid_back = reached.any(axis=1)
+        payback = np.where(paid_back, reached.argmax(axis=1) + 1, -1)
+        
+        after = {}
+        for h in horizons:
+            column = cumulative[:, h - 1] if h <= n else np.full(n, np.nan)
+            after[str(h)] = [round(float(v), 2) if np.isfinite(v) else None for v in column]
+        
+        paid = payback[paid_back]
+        return {
+            'vehicle_type': vehicle_type,
+            'current_fuel': current_fuel,
+            'daily_km': daily_km,
+            'conversion_cost': conversion_cost,
+            'summary': {
+                'conversion_months': n,
+                'paid_back': int(paid_back.sum()),
+                'payback_months_min': int(paid.min()) if paid.size else None,
+                'payback_months_median': float(np.median(paid)) if paid.size else None,
+                'payback_months_max': int(paid.max()) if paid.size else None,
+                'best_conversion_month': str(price_history.months[int(np.argmin(np.where(paid_back, payback, n + 1)))]) if paid.size else None
+            },
+            'by_conversion_month': {
+                'month': [str(m) for m in price_history.months],
+                'payback_months': [int(p) if p > 0 else None for p in payback],
+                'months_observed': (n - starts).tolist(),
+                'savings_after_months': after
+            }
+        }
+    
     def compare_scenarios(self, base_params: Dict[str, Any]) -> Dict[str, Any]:
         """Compare different usage scenarios"""
         scenarios = {
@@ -0,0 +1,201 @@
+"""
+Fueling Event Ingest
+Validates bulk fueling event uploads and hands them to a background writer
+that commits them to the FuelingHistory store in large batches
+"""
+
+import json
+import math
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from models.fueling_history import STATION_TYPES, epoch_seconds
+
+
+class IngestQueueFull(Exception):
+    """Raised when the write queue cannot take another batch"""
+
+
+class EventIngestQueue:
+    """Bounded queue of validated event rows drained by one writer thread"""
+
+    NUMERIC_FIELDS = ('charge_amount_kg', 'cost', 'wait_time_minutes', 'distance_km', 'efficiency_km_per_kg')
+
+    def __init__(self, history, max_batches: int = 256, max_events_per_request: int = 50000,
+                 commit_size: int = 5000, flush_interval: float = 1.0):
+        """
+        Args:
+            history: FuelingHistory the writer commits to
+            max_batches: Accepted requests that may wait in the queue before
+                further uploads are refused
+            max_events_per_request: Upper bound on one upload
+            commit_size: Rows the writer gathers before committing
+            flush_interval: Seconds the writer waits for more rows before
+                committing a partial batch
+        """
+        self.history = history
+        self.max_events_per_request = max_events_per_request
+        self.commit_size = commit_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_batches)
+        self._lock = threading.Lock()  # guards the counters below
+        self._start_lock = threading.Lock()
+
+        self.accepted = 0
+        self.rejected_batches = 0
+        self.written = 0
+        self.failed = 0
+        self.commits = 0
+        self.last_commit = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @staticmethod
+    def decode(body: bytes, content_type: str = '') -> List[Dict[str, Any]]:
+        """Events from an NDJSON body, a JSON array, or {"events": [...]}"""
+        text = body.decode('utf-8')
+        if 'ndjson' in (content_type or '') or 'jsonlines' in (content_type or ''):
+            return [json.loads(line) for line in text.splitlines() if line.strip()]
+        data = json.loads(text) if text.strip() else []
+        if isinstance(data, dict):
+            data = data.get('events', [data])
+        if not isinstance(data, list):
+            raise ValueError("expected a JSON array of events")
+        return data
+
+    @classmethod
+    def validate(cls, events: List[Dict[str, Any]], default_user: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Check required fields and value ranges; returns events grouped by user.
+
+        Timestamps are converted to epoch seconds here with the same parser
+        the store uses, so whatever passes validation is stored as validated.
+        """
+        by_user = {}
+        for i, event in enumerate(events):
+            if not isinstance(event, dict):
+                raise ValueError(f"event {i}: expected an object")
+            for name in ('timestamp', 'charge_amount_kg', 'cost'):
+                if name not in event:
+                    raise ValueError(f"event {i}: missing field '{name}'")
+            values = {}
+            for name in cls.NUMERIC_FIELDS:
+                if name not in event:
+                    continue
+                value = event[name]
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    raise ValueError(f"event {i}: {name} must be a number, got {value!r}")
+                values[name] = float(value)
+            if any(not math.isfinite(v) or v < 0 for v in values.values()):
+                raise ValueError(f"event {i}: numeric fields must be finite and non-negative")
+            if not isinstance(event['timestamp'], str):
+                raise ValueError(f"event {i}: timestamp must be an ISO 8601 string")
+            try:
+                values['timestamp'] = epoch_seconds(event['timestamp'])
+            except ValueError as e:
+                raise ValueError(f"event {i}: {e}")
+            if event.get('station_type', 'Market') not in STATION_TYPES:
+                raise ValueError(f"event {i}: unknown station_type {event['station_type']!r}")
+
+            user = str(event.get('user') or default_user)
+            by_user.setdefault(user, []).append({**event, **values})
+        return by_user
+
+    def submit(self, events: List[Dict[str, Any]], default_user: str = "User") -> int:
+        """Validate events and enqueue them; raises IngestQueueFull under backpressure"""
+        if len(events) > self.max_events_per_request:
+            raise ValueError(f"at most {self.max_events_per_request} events per request")
+        rows = []
+        for user, records in self.validate(events, default_user).items():
+            rows.extend(self.history.event_rows(user, records))
+        if not rows:
+            return 0
+        # The writer starts with the first upload, so events are written under
+        # any WSGI host, not only when an entry point started the workers
+        self.start()
+        try:
+            self._queue.put_nowait(rows)
+        except queue.Full:
+            with self._lock:
+                self.rejected_batches += 1
+            raise IngestQueueFull("ingest queue is full, retry later")
+        with self._lock:
+            self.accepted += len(rows)
+        return len(rows)
+
+    def _commit(self, rows: List[tuple]) -> None:
+        try:
+            self.history.insert_rows(rows)
+        except Exception as e:
+            with self._lock:
+                self.failed += len(rows)
+            print(f"Event ingest commit failed: {e}")
+            return
+        with self._lock:
+            self.written += len(rows)
+            self.commits += 1
+            self.last_commit = time.time()
+
+    def drain(self, block: bool = True) -> int:
+        """Gather queued rows up to commit_size and commit them; returns rows written"""
+        rows = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(rows) < self.commit_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if block and timeout > 0:
+                    rows.extend(self._queue.get(timeout=timeout))
+                else:
+                    rows.extend(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            self._queue.task_done()
+        if rows:
+            self._commit(rows)
+        return len(rows)
+
+    @property
+    def writer_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Run the writer on a daemon thread (no-op while it is running)"""
+        def run():
+            while not self._stop.is_set():
+                self.drain()
+            while self.drain(block=False):
+                pass
+
+        with self._start_lock:
+            if self.writer_running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=run, name='event-ingest-writer', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the writer after flushing what is already queued"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Describe queue depth and write progress"""
+        with self._lock:
+            counters = {
+                'accepted': self.accepted,
+                'written': self.written,
+                'failed': self.failed,
+                'rejected_batches': self.rejected_batches,
+                'commits': self.commits
+            }
+            last_commit = self.last_commit
+        return {
+            'queued_batches': self._queue.qsize(),
+            'max_batches': self._queue.maxsize,
+            'writer_running': self.writer_running,
+            **counters,
+            'last_commit': datetime.fromtimestamp(last_commit).isoformat() if last_commit else None
+        }
@@ -0,0 +1,100 @@
+"""
+Fuel Price History
+Loads dated petrol, diesel and CNG prices from a local CSV or Parquet file
+into a monthly price matrix for ROI backtesting
+"""
+
+import os
+from typing import Dict, Any
+
+import numpy as np
+import pandas as pd
+
+
+class FuelPriceHistory:
+    """Monthly average fuel prices, one row per calendar month"""
+
+    FUELS = ('petrol', 'diesel', 'cng')
+
+    # Accepted column names (lower-cased) for each field
+    COLUMN_ALIASES = {
+        'date': ['date', 'month', 'timestamp', 'day'],
+        'petrol': ['petrol', 'petrol_price', 'gasoline'],
+        'diesel': ['diesel', 'diesel_price'],
+        'cng': ['cng', 'cng_price']
+    }
+
+    def __init__(self, months: np.ndarray, prices: np.ndarray, source: str = None):
+        """
+        Args:
+            months: Consecutive datetime64[M] months
+            prices: (len(months), 3) prices in FUELS order
+            source: File the history was loaded from
+        """
+        self.months = np.asarray(months, dtype='datetime64[M]')
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.source = source
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, source: str = None) -> 'FuelPriceHistory':
+        """Average dated prices per month and forward-fill months without quotes"""
+        cols = {str(c).strip().lower(): c for c in df.columns}
+        resolved = {}
+        for field, aliases in cls.COLUMN_ALIASES.items():
+            match = next((cols[a] for a in aliases if a in cols), None)
+            if match is None:
+                raise ValueError(f"Price history is missing a '{field}' column")
+            resolved[field] = match
+
+        dates = pd.to_datetime(df[resolved['date']], errors='coerce')
+        frame = pd.DataFrame({
+            fuel: pd.to_numeric(df[resolved[fuel]], errors='coerce') for fuel in cls.FUELS
+        })
+        frame['month'] = dates.dt.to_period('M')
+        frame = frame[dates.notna()]
+        if frame.empty:
+            raise ValueError("Price history has no dated rows")
+
+        monthly = frame.groupby('month')[list(cls.FUELS)].mean()
+        full_range = pd.period_range(monthly.index.min(), monthly.index.max(), freq='M')
+        monthly = monthly.reindex(full_range).ffill().bfill()
+
+        months = np.array([str(p) for p in monthly.index], dtype='datetime64[M]')
+        return cls(months, monthly.to_numpy(dtype=np.float64), source)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'FuelPriceHistory':
+        """Load a CSV or Parquet price file (Parquet needs pyarrow or fastparquet)"""
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Price history not found: {path}")
+        if path.lower().endswith(('.parquet', '.pq')):
+            df = pd.read_parquet(path)
+        else:
+            df = pd.read_csv(path)
+        return cls.from_frame(df, source=path)
+
+    def __len__(self) -> int:
+        return len(self.months)
+
+    def month_index(self, date: str) -> int:
+        """Row of the month containing date ('YYYY-MM' or any ISO date)"""
+        month = np.datetime64(str(date)[:7], 'M')
+        index = int((month - self.months[0]).astype(int))
+        if index < 0 or index >= len(self.months):
+            raise ValueError(f"{date} is outside the price history "
+                             f"({self.months[0]} to {self.months[-1]})")
+        return index
+
+    def price(self, fuel: str) -> np.ndarray:
+        """Monthly price series of one fuel"""
+        return self.prices[:, self.FUELS.index(fuel)]
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Describe the loaded range and latest prices"""
+        return {
+            'source': self.source,
+            'start': str(self.months[0]),
+            'end': str(self.months[-1]),
+            'months': len(self.months),
+            'latest': {fuel: round(float(p), 2) for fuel, p in zip(self.FUELS, self.prices[-1])}
+        }
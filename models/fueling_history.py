@@ -0,0 +1,638 @@
+"""
+Fueling History Store
+Persistent SQLite storage of fueling events with aggregations pushed down into SQL
+"""
+
+import base64
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from models.quantile_sketch import QuantileSketch
+
+
+EPOCH = datetime(1970, 1, 1)
+
+STATION_TYPES = ['Market', 'Highway', 'Office', 'Residential']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fueling_events (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    ts INTEGER NOT NULL,              -- naive local wall-clock seconds since 1970-01-01
+    hour INTEGER NOT NULL,
+    day_of_week INTEGER NOT NULL,
+    is_weekend INTEGER NOT NULL,
+    charge_amount_kg REAL NOT NULL,
+    cost REAL NOT NULL,
+    wait_time_minutes REAL NOT NULL,
+    distance_km REAL NOT NULL,
+    efficiency_km_per_kg REAL NOT NULL,
+    station_type TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fueling_events_user_ts ON fueling_events (user, ts);
+CREATE INDEX IF NOT EXISTS idx_fueling_events_ts ON fueling_events (ts);
+
+-- Running per-user aggregates, maintained in the same transaction as each insert
+CREATE TABLE IF NOT EXISTS user_aggregates (
+    user TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    amount REAL NOT NULL,
+    cost REAL NOT NULL,
+    distance REAL NOT NULL,
+    wait REAL NOT NULL,
+    min_wait REAL,
+    max_wait REAL,
+    first_ts INTEGER,
+    last_ts INTEGER,
+    eff_count INTEGER NOT NULL,       -- Welford state over positive efficiencies
+    eff_mean REAL NOT NULL,
+    eff_m2 REAL NOT NULL,
+    eff_min REAL,
+    eff_max REAL
+);
+CREATE TABLE IF NOT EXISTS user_bucket_aggregates (
+    user TEXT NOT NULL,
+    dimension TEXT NOT NULL,          -- hour, day_of_week, is_weekend, station_type
+    key NOT NULL,                     -- untyped so integer and text keys keep their type
+    count INTEGER NOT NULL,
+    amount REAL NOT NULL,
+    cost REAL NOT NULL,
+    wait REAL NOT NULL,
+    PRIMARY KEY (user, dimension, key)
+) WITHOUT ROWID;
+
+-- Calendar rollups keyed by the start of each day, week (Monday) or month
+CREATE TABLE IF NOT EXISTS user_rollups (
+    user TEXT NOT NULL,
+    period TEXT NOT NULL,             -- day, week, month
+    start INTEGER NOT NULL,           -- period start in the same epoch as fueling_events.ts
+    count INTEGER NOT NULL,
+    amount REAL NOT NULL,
+    cost REAL NOT NULL,
+    distance REAL NOT NULL,
+    wait REAL NOT NULL,
+    eff_count INTEGER NOT NULL,       -- positive efficiencies only
+    eff_sum REAL NOT NULL,
+    PRIMARY KEY (user, period, start)
+) WITHOUT ROWID;
+
+-- Quantile sketch bucket counts per (user or fleet, metric, hour, station type);
+-- summing counts over any subset of rows merges their sketches
+CREATE TABLE IF NOT EXISTS quantile_sketches (
+    scope TEXT NOT NULL,              -- user or fleet
+    user TEXT NOT NULL,               -- '' for the fleet scope
+    metric TEXT NOT NULL,             -- wait, efficiency
+    hour INTEGER NOT NULL,
+    station_type TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (scope, user, metric, hour, station_type, bucket)
+) WITHOUT ROWID;
+"""
+
+SUMMARY_COLUMNS = (
+    'user', 'count', 'amount', 'cost', 'distance', 'wait', 'min_wait', 'max_wait',
+    'first_ts', 'last_ts', 'eff_count', 'eff_mean', 'eff_m2', 'eff_min', 'eff_max'
+)
+
+# Dimensions kept as all-time histograms in user_bucket_aggregates
+BUCKET_DIMENSIONS = ('hour', 'day_of_week', 'is_weekend', 'station_type')
+
+# Rollup periods, mapped to the SQL expression for the period start of ts
+ROLLUP_PERIODS = {
+    'day': 'ts - ts % 86400',
+    'week': '(ts / 86400 - (ts / 86400 + 3) % 7) * 86400',  # 1970-01-01 was a Thursday
+    'month': "CAST(strftime('%s', ts, 'unixepoch', 'start of month') AS INTEGER)"
+}
+
+# Sketched metrics, mapped to their event column (efficiency only counts positive values)
+SKETCH_METRICS = {
+    'wait': 'wait_time_minutes',
+    'efficiency': 'efficiency_km_per_kg'
+}
+
+# All stored sketches share this accuracy so they can be merged
+SKETCH = QuantileSketch(alpha=0.01)
+
+INSERT_COLUMNS = (
+    'user', 'ts', 'hour', 'day_of_week', 'is_weekend', 'charge_amount_kg', 'cost',
+    'wait_time_minutes', 'distance_km', 'efficiency_km_per_kg', 'station_type'
+)
+
+
+def epoch_seconds(timestamp) -> int:
+    """ISO timestamp (or epoch seconds) as naive wall-clock seconds since 1970-01-01.
+
+    A UTC offset is dropped rather than applied: events keep the local hour
+    they were recorded at, which is what hour and weekday analytics group by.
+    """
+    if isinstance(timestamp, (int, np.integer)) and not isinstance(timestamp, bool):
+        return int(timestamp)
+    moment = datetime.fromisoformat(timestamp).replace(tzinfo=None)
+    return (moment - EPOCH) // timedelta(seconds=1)
+
+
+class FuelingHistory:
+    """SQLite-backed fueling event store (WAL mode, indexed by user and time)"""
+
+    def __init__(self, path: str = ':memory:'):
+        """
+        Args:
+            path: Database file, or ':memory:' for a process-local store
+        """
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shared = None
+
+        if path == ':memory:':
+            # An in-memory database only exists on its connection, so every
+            # thread shares one connection and takes turns on it
+            self._shared = self._open()
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+            has_events = conn.execute('SELECT 1 FROM fueling_events LIMIT 1').fetchone()
+            has_aggregates = (conn.execute('SELECT 1 FROM user_rollups LIMIT 1').fetchone()
+                              and conn.execute('SELECT 1 FROM quantile_sketches LIMIT 1').fetchone())
+        if has_events and not has_aggregates:
+            # Databases written before aggregates (or rollups) existed
+            self.rebuild_aggregates()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        if self.path != ':memory:':
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def reset_after_fork(self) -> None:
+        """Forget connections inherited from the parent process.
+
+        SQLite connections must not be used across fork(); a forked worker
+        calls this so each of its threads opens a fresh one. In-memory stores
+        cannot be shared between processes and keep the forked copy.
+        """
+        if self._shared is None:
+            self._local = threading.local()
+
+    @contextmanager
+    def _connection(self):
+        """Per-thread connection for file databases (WAL lets readers run beside the writer)"""
+        if self._shared is not None:
+            with self._lock:
+                yield self._shared
+            return
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+        yield conn
+
+    @staticmethod
+    def _range_clause(start: Optional[int], end: Optional[int]):
+        """SQL fragment and parameters restricting ts to [start, end)"""
+        clause, params = '', []
+        if start is not None:
+            clause += ' AND ts >= ?'
+            params.append(int(start))
+        if end is not None:
+            clause += ' AND ts < ?'
+            params.append(int(end))
+        return clause, params
+
+    @staticmethod
+    def event_rows(user: str, records: List[Dict[str, Any]]) -> List[tuple]:
+        """Convert event dictionaries into INSERT_COLUMNS rows.
+
+        Timestamps are ISO strings or epoch seconds (see epoch_seconds), and
+        hour, day of week and weekend flag are derived from them in one
+        vectorized pass so stored calendar fields always agree.
+        """
+        stamps = np.array([epoch_seconds(r['timestamp']) for r in records], dtype=np.int64)
+        days = stamps // 86400
+        hours = ((stamps // 3600) % 24).tolist()
+        day_of_week = ((days + 3) % 7).tolist()  # 1970-01-01 was a Thursday
+
+        rows = []
+        for r, ts, hour, dow in zip(records, stamps.tolist(), hours, day_of_week):
+            amount = float(r['charge_amount_kg'])
+            distance = float(r.get('distance_km', 0.0))
+            efficiency = r.get('efficiency_km_per_kg')
+            if efficiency is None:
+                efficiency = round(distance / amount, 2) if amount > 0 else 0.0
+            rows.append((
+                user, ts, hour, dow, 1 if dow >= 5 else 0, amount, float(r['cost']),
+                float(r.get('wait_time_minutes', 0.0)), distance, float(efficiency),
+                r.get('station_type', 'Market')
+            ))
+        return rows
+
+    def insert_events(self, user: str, records: List[Dict[str, Any]]) -> int:
+        """Bulk insert event dictionaries (ISO 'timestamp' strings) for one user"""
+        if not records:
+            return 0
+        return self.insert_rows(self.event_rows(user, records))
+
+    def insert_rows(self, rows: List[tuple]) -> int:
+        """Insert rows produced by event_rows() (any mix of users) and fold them into the aggregates"""
+        if not rows:
+            return 0
+        with self._connection() as conn:
+            with conn:
+                # The INSERT takes the write lock, so reading and merging the
+                # aggregates below cannot interleave with another writer
+                self._write_rows(conn, rows)
+        return len(rows)
+
+    def insert_events_if_empty(self, user: str, records: List[Dict[str, Any]]) -> int:
+        """Insert records only if the user has no events yet; returns the rows written.
+
+        The emptiness check and the insert share one write transaction, so
+        concurrent callers (threads or worker processes) seed a user at most once.
+        """
+        if not records:
+            return 0
+        rows = self.event_rows(user, records)
+        with self._connection() as conn:
+            with conn:
+                # BEGIN IMMEDIATE takes the write lock before the check
+                conn.execute('BEGIN IMMEDIATE')
+                if conn.execute('SELECT 1 FROM fueling_events WHERE user = ? LIMIT 1', (user,)).fetchone():
+                    return 0
+                self._write_rows(conn, rows)
+        return len(rows)
+
+    def _write_rows(self, conn: sqlite3.Connection, rows: List[tuple]) -> None:
+        """Insert rows and merge their aggregates inside the caller's transaction"""
+        conn.executemany(
+            f"INSERT INTO fueling_events ({', '.join(INSERT_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(INSERT_COLUMNS))})",
+            rows
+        )
+        self._apply_aggregates(conn, rows)
+
+    @staticmethod
+    def _batch_aggregates(columns: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        """Summary and bucket deltas for one user's slice of a batch"""
+        wait = columns['wait_time_minutes']
+        efficiency = columns['efficiency_km_per_kg']
+        efficiency = efficiency[efficiency > 0]
+        eff_mean = float(efficiency.mean()) if efficiency.size else 0.0
+
+        summary = {
+            'count': int(wait.size),
+            'amount': float(columns['charge_amount_kg'].sum()),
+            'cost': float(columns['cost'].sum()),
+            'distance': float(columns['distance_km'].sum()),
+            'wait': float(wait.sum()),
+            'min_wait': float(wait.min()),
+            'max_wait': float(wait.max()),
+            'first_ts': int(columns['ts'].min()),
+            'last_ts': int(columns['ts'].max()),
+            'eff_count': int(efficiency.size),
+            'eff_mean': eff_mean,
+            'eff_m2': float(((efficiency - eff_mean) ** 2).sum()),
+            'eff_min': float(efficiency.min()) if efficiency.size else None,
+            'eff_max': float(efficiency.max()) if efficiency.size else None
+        }
+
+        buckets = []
+        for dimension in BUCKET_DIMENSIONS:
+            keys, inverse = np.unique(columns[dimension], return_inverse=True)
+            counts = np.bincount(inverse)
+            sums = [np.bincount(inverse, weights=columns[c]) for c in ('charge_amount_kg', 'cost', 'wait_time_minutes')]
+            for key, count, amount, cost, wait_sum in zip(keys.tolist(), counts.tolist(), *(x.tolist() for x in sums)):
+                buckets.append((dimension, key, count, amount, cost, wait_sum))
+
+        positive = columns['efficiency_km_per_kg'] > 0
+        rollups = []
+        for period in ROLLUP_PERIODS:
+            starts, inverse = np.unique(columns[f'{period}_start'], return_inverse=True)
+            counts = np.bincount(inverse)
+            sums = [np.bincount(inverse, weights=columns[c])
+                    for c in ('charge_amount_kg', 'cost', 'distance_km', 'wait_time_minutes')]
+            eff_counts = np.bincount(inverse, weights=positive)
+            eff_sums = np.bincount(inverse, weights=np.where(positive, columns['efficiency_km_per_kg'], 0.0))
+            for start, count, *rest in zip(starts.tolist(), counts.tolist(), *(x.tolist() for x in sums),
+                                           eff_counts.tolist(), eff_sums.tolist()):
+                amount, cost, distance, wait_sum, eff_count, eff_sum = rest
+                rollups.append((period, start, count, amount, cost, distance, wait_sum, int(eff_count), eff_sum))
+
+        return {'summary': summary, 'buckets': buckets, 'rollups': rollups}
+
+    @staticmethod
+    def _merge_summary(current: Optional[Dict[str, Any]], delta: Dict[str, Any]) -> Dict[str, Any]:
+        """Combine stored and batch summaries; efficiency variance uses the parallel Welford update"""
+        if current is None:
+            return dict(delta)
+
+        def pick(fn, a, b):
+            return b if a is None else a if b is None else fn(a, b)
+
+        merged = {key: current[key] + delta[key] for key in ('count', 'amount', 'cost', 'distance', 'wait')}
+        merged.update({
+            'min_wait': pick(min, current['min_wait'], delta['min_wait']),
+            'max_wait': pick(max, current['max_wait'], delta['max_wait']),
+            'first_ts': pick(min, current['first_ts'], delta['first_ts']),
+            'last_ts': pick(max, current['last_ts'], delta['last_ts']),
+            'eff_min': pick(min, current['eff_min'], delta['eff_min']),
+            'eff_max': pick(max, current['eff_max'], delta['eff_max'])
+        })
+
+        n_a, n_b = current['eff_count'], delta['eff_count']
+        n = n_a + n_b
+        if n == 0:
+            merged.update({'eff_count': 0, 'eff_mean': 0.0, 'eff_m2': 0.0})
+        else:
+            diff = delta['eff_mean'] - current['eff_mean']
+            merged.update({
+                'eff_count': n,
+                'eff_mean': current['eff_mean'] + diff * n_b / n,
+                'eff_m2': current['eff_m2'] + delta['eff_m2'] + diff * diff * n_a * n_b / n
+            })
+        return merged
+
+    def _apply_aggregates(self, conn: sqlite3.Connection, rows: List[tuple]) -> None:
+        """Fold a batch of event rows into the summary, bucket and rollup tables"""
+        values = list(zip(*rows))
+        columns = {name: np.array(values[i]) for i, name in enumerate(INSERT_COLUMNS)}
+        ts = columns['ts'] = columns['ts'].astype(np.int64)
+        days = ts // 86400
+        columns['day_start'] = days * 86400
+        columns['week_start'] = (days - (days + 3) % 7) * 86400
+        columns['month_start'] = ts.astype('datetime64[s]').astype('datetime64[M]').astype('datetime64[s]').astype(np.int64)
+
+        users, inverse = np.unique(columns['user'], return_inverse=True)
+        for i, user in enumerate(users.tolist()):
+            mask = inverse == i
+            delta = self._batch_aggregates({name: col[mask] for name, col in columns.items()})
+
+            current = conn.execute('SELECT * FROM user_aggregates WHERE user = ?', (user,)).fetchone()
+            merged = self._merge_summary(dict(current) if current else None, delta['summary'])
+            merged['user'] = user
+            conn.execute(
+                f"INSERT OR REPLACE INTO user_aggregates ({', '.join(SUMMARY_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(SUMMARY_COLUMNS))})",
+                [merged[c] for c in SUMMARY_COLUMNS]
+            )
+            conn.executemany("""
+                INSERT INTO user_bucket_aggregates (user, dimension, key, count, amount, cost, wait)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (user, dimension, key) DO UPDATE SET
+                    count = count + excluded.count,
+                    amount = amount + excluded.amount,
+                    cost = cost + excluded.cost,
+                    wait = wait + excluded.wait
+            """, [(user, *bucket) for bucket in delta['buckets']])
+            conn.executemany("""
+                INSERT INTO user_rollups (user, period, start, count, amount, cost, distance, wait, eff_count, eff_sum)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (user, period, start) DO UPDATE SET
+                    count = count + excluded.count,
+                    amount = amount + excluded.amount,
+                    cost = cost + excluded.cost,
+                    distance = distance + excluded.distance,
+                    wait = wait + excluded.wait,
+                    eff_count = eff_count + excluded.eff_count,
+                    eff_sum = eff_sum + excluded.eff_sum
+            """, [(user, *rollup) for rollup in delta['rollups']])
+
+        self._apply_sketches(conn, columns)
+
+    @staticmethod
+    def _sketch_rows(columns: Dict[str, np.ndarray]) -> List[tuple]:
+        """(scope, user, metric, hour, station_type, bucket, count) deltas for a batch"""
+        users, user_codes = np.unique(columns['user'], return_inverse=True)
+        stations, station_codes = np.unique(columns['station_type'], return_inverse=True)
+        hours = columns['hour'].astype(np.int64)
+
+        rows = []
+        for metric, column in SKETCH_METRICS.items():
+            values = columns[column].astype(np.float64)
+            keep = values > 0 if metric == 'efficiency' else np.ones(len(values), dtype=bool)
+            buckets = SKETCH.bucket_indices(values[keep])
+            keys = np.column_stack([user_codes[keep], hours[keep], station_codes[keep], buckets])
+
+            # Per-user sketches, then the fleet sketch with the user dropped
+            for scope, group in (('user', keys), ('fleet', keys[:, 1:])):
+                if not len(group):
+                    continue
+                unique, counts = np.unique(group, axis=0, return_counts=True)
+                for key, count in zip(unique.tolist(), counts.tolist()):
+                    if scope == 'user':
+                        user, hour, station, bucket = key
+                        rows.append(('user', users[user], metric, hour, stations[station], bucket, count))
+                    else:
+                        hour, station, bucket = key
+                        rows.append(('fleet', '', metric, hour, stations[station], bucket, count))
+        return rows
+
+    def _apply_sketches(self, conn: sqlite3.Connection, columns: Dict[str, np.ndarray]) -> None:
+        """Add a batch's bucket counts to the stored quantile sketches"""
+        conn.executemany("""
+            INSERT INTO quantile_sketches (scope, user, metric, hour, station_type, bucket, count)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (scope, user, metric, hour, station_type, bucket) DO UPDATE SET
+                count = count + excluded.count
+        """, self._sketch_rows(columns))
+
+    def rebuild_aggregates(self) -> None:
+        """Recompute every materialized aggregate from the raw events"""
+        with self._connection() as conn:
+            with conn:
+                conn.execute('DELETE FROM user_aggregates')
+                conn.execute('DELETE FROM user_bucket_aggregates')
+                conn.execute('DELETE FROM user_rollups')
+                conn.execute('DELETE FROM quantile_sketches')
+                conn.execute(f"""
+                    INSERT INTO user_aggregates ({', '.join(SUMMARY_COLUMNS)})
+                    SELECT e.user, COUNT(*), SUM(charge_amount_kg), SUM(cost), SUM(distance_km),
+                           SUM(wait_time_minutes), MIN(wait_time_minutes), MAX(wait_time_minutes),
+                           MIN(ts), MAX(ts),
+                           COALESCE(f.n, 0), COALESCE(f.mean, 0), COALESCE(f.m2, 0), f.min, f.max
+                    FROM fueling_events e
+                    LEFT JOIN (
+                        SELECT user, COUNT(*) AS n, AVG(efficiency_km_per_kg) AS mean,
+                               MAX(SUM(efficiency_km_per_kg * efficiency_km_per_kg)
+                                   - SUM(efficiency_km_per_kg) * AVG(efficiency_km_per_kg), 0) AS m2,
+                               MIN(efficiency_km_per_kg) AS min, MAX(efficiency_km_per_kg) AS max
+                        FROM fueling_events WHERE efficiency_km_per_kg > 0 GROUP BY user
+                    ) f ON f.user = e.user
+                    GROUP BY e.user
+                """)
+                for dimension in BUCKET_DIMENSIONS:
+                    # Every dimension is an event column of the same name
+                    conn.execute(f"""
+                        INSERT INTO user_bucket_aggregates (user, dimension, key, count, amount, cost, wait)
+                        SELECT user, ?, {dimension}, COUNT(*), SUM(charge_amount_kg), SUM(cost), SUM(wait_time_minutes)
+                        FROM fueling_events GROUP BY user, {dimension}
+                    """, (dimension,))
+                for period, expr in ROLLUP_PERIODS.items():
+                    conn.execute(f"""
+                        INSERT INTO user_rollups (user, period, start, count, amount, cost, distance, wait, eff_count, eff_sum)
+                        SELECT user, ?, {expr}, COUNT(*), SUM(charge_amount_kg), SUM(cost), SUM(distance_km),
+                               SUM(wait_time_minutes),
+                               SUM(efficiency_km_per_kg > 0),
+                               SUM(CASE WHEN efficiency_km_per_kg > 0 THEN efficiency_km_per_kg ELSE 0 END)
+                        FROM fueling_events GROUP BY user, {expr}
+                    """, (period,))
+
+                # Sketch buckets need log(), so they are rebuilt in streamed chunks
+                cursor = conn.execute(
+                    'SELECT user, hour, station_type, wait_time_minutes, efficiency_km_per_kg FROM fueling_events'
+                )
+                names = ('user', 'hour', 'station_type', 'wait_time_minutes', 'efficiency_km_per_kg')
+                while True:
+                    chunk = cursor.fetchmany(100000)
+                    if not chunk:
+                        break
+                    values = list(zip(*chunk))
+                    self._apply_sketches(conn, {name: np.array(values[i]) for i, name in enumerate(names)})
+
+    def summary(self, user: str) -> Optional[Dict[str, Any]]:
+        """Materialized all-time totals for a user (single primary-key lookup)"""
+        with self._connection() as conn:
+            row = conn.execute('SELECT * FROM user_aggregates WHERE user = ?', (user,)).fetchone()
+        return dict(row) if row else None
+
+    def all_buckets(self, user: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Materialized bucket totals for every dimension in one query, keyed by dimension"""
+        with self._connection() as conn:
+            rows = conn.execute("""
+                SELECT dimension, key, count, amount, cost, wait FROM user_bucket_aggregates
+                WHERE user = ? ORDER BY dimension, key
+            """, (user,)).fetchall()
+        grouped = {dimension: [] for dimension in BUCKET_DIMENSIONS}
+        for r in rows:
+            grouped.setdefault(r['dimension'], []).append(
+                {'key': r['key'], 'count': r['count'], 'amount': r['amount'], 'cost': r['cost'], 'wait': r['wait']}
+            )
+        return grouped
+
+    def sketch(self, metric: str, user: Optional[str] = None, hour: Optional[int] = None,
+               station_type: Optional[str] = None, group_by: Optional[str] = None):
+        """
+        Merged quantile sketch for a user (or the fleet when user is None)
+
+        hour and station_type narrow the partitions that are merged. With
+        group_by='hour' or 'station_type' a dict of sketches keyed by that
+        field is returned instead of one sketch.
+        """
+        if metric not in SKETCH_METRICS:
+            raise ValueError(f"Unsupported metric: {metric}")
+        if group_by not in (None, 'hour', 'station_type'):
+            raise ValueError(f"Unsupported group_by: {group_by}")
+
+        clause = ' AND scope = ? AND user = ?'
+        params = [metric, 'fleet' if user is None else 'user', user or '']
+        if hour is not None:
+            clause += ' AND hour = ?'
+            params.append(int(hour))
+        if station_type is not None:
+            clause += ' AND station_type = ?'
+            params.append(station_type)
+        group = f'{group_by}, ' if group_by else "'', "
+        with self._connection() as conn:
+            rows = conn.execute(f"""
+                SELECT {group}bucket, SUM(count) FROM quantile_sketches
+                WHERE metric = ?{clause} GROUP BY {group}bucket
+            """, params).fetchall()
+
+        sketches = {}
+        for key, bucket, count in rows:
+            sketches.setdefault(key, {})[bucket] = count
+        sketches = {key: QuantileSketch(SKETCH.alpha, SKETCH.min_value, counts) for key, counts in sketches.items()}
+        if group_by:
+            return dict(sorted(sketches.items()))
+        return sketches.get('', QuantileSketch(SKETCH.alpha, SKETCH.min_value))
+
+    def rollups(self, user: str, period: str = 'month', start: Optional[int] = None,
+                end: Optional[int] = None, last: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Day, week or month rollup rows for a user, oldest first
+
+        start/end bound the period start timestamps ([start, end)); last keeps
+        only the newest N periods that have events. Each row carries a 'key'
+        label (YYYY-MM-DD, or YYYY-MM for months) and average efficiency.
+        """
+        if period not in ROLLUP_PERIODS:
+            raise ValueError(f"Unsupported period: {period}")
+        clause, params = '', []
+        if start is not None:
+            clause += ' AND start >= ?'
+            params.append(int(start))
+        if end is not None:
+            clause += ' AND start < ?'
+            params.append(int(end))
+        order, limit = ('DESC', ' LIMIT ?') if last else ('ASC', '')
+        if last:
+            params.append(int(last))
+        with self._connection() as conn:
+            rows = conn.execute(f"""
+                SELECT start, count, amount, cost, distance, wait, eff_count, eff_sum FROM user_rollups
+                WHERE user = ? AND period = ?{clause} ORDER BY start {order}{limit}
+            """, [user, period, *params]).fetchall()
+        rows = [dict(r) for r in rows]
+        if last:
+            rows.reverse()
+
+        unit = 'M' if period == 'month' else 'D'
+        labels = np.datetime_as_string(np.array([r['start'] for r in rows], dtype='datetime64[s]'), unit=unit)
+        for row, label in zip(rows, labels):
+            row['key'] = str(label)
+            row['avg_efficiency'] = row['eff_sum'] / row['eff_count'] if row['eff_count'] else None
+        return rows
+
+    @staticmethod
+    def encode_cursor(ts: int, event_id: int) -> str:
+        """Opaque pagination cursor for the position just after (ts, id)"""
+        return base64.urlsafe_b64encode(f"{ts}:{event_id}".encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor: str):
+        """(ts, id) from a cursor produced by encode_cursor"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            ts, event_id = base64.urlsafe_b64decode(padded.encode()).decode().split(':')
+            return int(ts), int(event_id)
+        except Exception:
+            raise ValueError("Invalid cursor")
+
+    def page(self, user: str, limit: int = 10, before: Optional[int] = None, after: Optional[int] = None,
+             cursor: Optional[str] = None):
+        """
+        One page of a user's events, newest first, plus the cursor for the next page
+
+        before/after bound ts ([after, before)). Pages are keyed on (ts, id), so
+        each one is a bounded walk of the (user, ts) index (which carries the
+        rowid) regardless of how deep the caller has scrolled. The returned
+        cursor is None on the last page.
+        """
+        clause, params = self._range_clause(after, before)
+        if cursor:
+            clause += ' AND (ts, id) < (?, ?)'
+            params.extend(self.decode_cursor(cursor))
+        with self._connection() as conn:
+            rows = conn.execute(f"""
+                SELECT id, ts, strftime('%Y-%m-%dT%H:%M:%S', ts, 'unixepoch') AS timestamp,
+                       charge_amount_kg, cost, station_type, wait_time_minutes, efficiency_km_per_kg
+                FROM fueling_events WHERE user = ?{clause}
+                ORDER BY ts DESC, id DESC LIMIT ?
+            """, [user, *params, int(limit) + 1]).fetchall()
+
+        rows = [dict(r) for r in rows]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self.encode_cursor(rows[-1]['ts'], rows[-1]['id'])
+        return rows, next_cursor
@@ -0,0 +1,106 @@
+"""
+Lazy Resources
+Defers expensive model construction (heavy imports, training, data loading)
+until first use, with optional background warm-up
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class LazyResource:
+    """
+    Builds a resource on first access and then stands in for it
+
+    Attribute access is forwarded to the built object, so a LazyResource can
+    be passed wherever the real object is expected. Each resource has its own
+    lock: a request that needs one resource only ever waits for that one.
+    """
+
+    _registry: List['LazyResource'] = []
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        """
+        Args:
+            name: Label used in status reports
+            factory: Zero-argument callable that builds the resource
+        """
+        self.name = name
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._value = None
+        self._ready = False
+        self._error = None
+        self._load_seconds = None
+        self._thread = None
+        LazyResource._registry.append(self)
+
+    def get(self) -> Any:
+        """Build the resource if needed (once, even under concurrent callers) and return it"""
+        if self._ready:
+            return self._value
+        with self._lock:
+            if not self._ready:
+                start = time.perf_counter()
+                try:
+                    self._value = self._factory()
+                except Exception as e:
+                    self._error = str(e)
+                    raise
+                finally:
+                    self._load_seconds = time.perf_counter() - start
+                self._error = None
+                self._ready = True
+        return self._value
+
+    def warm_up(self, background: bool = True) -> None:
+        """Start building now, on a daemon thread unless background is False"""
+        if self._ready or (self._thread and self._thread.is_alive()):
+            return
+        if not background:
+            self.get()
+            return
+
+        def run():
+            try:
+                self.get()
+            except Exception as e:
+                print(f"Warm-up of {self.name} failed: {e}")
+
+        self._thread = threading.Thread(target=run, name=f'warm-{self.name}', daemon=True)
+        self._thread.start()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def __getattr__(self, attr: str) -> Any:
+        # Only called for attributes not found on the proxy itself
+        return getattr(self.get(), attr)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Whether the resource is built and how long building took"""
+        return {
+            'name': self.name,
+            'ready': self._ready,
+            'loading': bool(self._lock.locked()),
+            'load_seconds': round(self._load_seconds, 4) if self._load_seconds is not None else None,
+            'error': self._error
+        }
+
+    @classmethod
+    def all_resources(cls) -> List['LazyResource']:
+        return list(cls._registry)
+
+
+def warm_up_all(background: bool = True, names: Optional[List[str]] = None) -> None:
+    """Warm every registered resource (or just the named ones)"""
+    for resource in LazyResource.all_resources():
+        if names is None or resource.name in names:
+            resource.warm_up(background)
+
+
+def resources_status() -> List[Dict[str, Any]]:
+    """Status of every registered resource"""
+    return [resource.get_status() for resource in LazyResource.all_resources()]
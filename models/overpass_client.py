@@ -0,0 +1,214 @@
+"""
+Overpass Client
+Fetches OpenStreetMap fuel stations from an Overpass API server over a pooled
+session, one grid tile per query, with bounded retries, an on-disk response
+cache per tile and concurrent fetches of uncached tiles
+"""
+
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+DEFAULT_URL = "https://overpass-api.de/api/interpreter"
+
+# Overpass QL for one tile; {bbox} is "south,west,north,east"
+FUEL_QUERY = """
+[out:json][timeout:{timeout}];
+(
+    node["amenity"="fuel"]({bbox});
+    way["amenity"="fuel"]({bbox});
+);
+out body;
+>;
+out skel qt;
+"""
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class OverpassError(Exception):
+    """Raised when a tile could not be fetched after all retries"""
+
+
+class OverpassClient:
+    """Tile-based Overpass fetcher shared by all request threads"""
+
+    def __init__(self, url: str = DEFAULT_URL, cache_dir: Optional[str] = None, cache_ttl: float = 86400.0,
+                 timeout: float = 30.0, retries: int = 3, backoff: float = 1.0,
+                 tile_deg: float = 0.05, max_workers: int = 4, query: str = FUEL_QUERY):
+        """
+        Args:
+            url: Overpass interpreter endpoint (point it at a local stand-in for tests)
+            cache_dir: Directory for cached tile responses; None disables the cache
+            cache_ttl: Seconds a cached tile stays valid
+            timeout: Seconds to wait for one tile response
+            retries: Extra attempts after a failed request
+            backoff: Base delay in seconds, doubled on every retry
+            tile_deg: Tile edge in degrees; tiles sit on a fixed grid so nearby
+                queries reuse each other's cached tiles
+            max_workers: Tiles fetched in parallel
+            query: Overpass QL template with {bbox} and {timeout}
+        """
+        self.url = url
+        self.cache_dir = cache_dir
+        self.cache_ttl = cache_ttl
+        self.timeout = timeout
+        self.retries = max(0, int(retries))
+        self.backoff = backoff
+        self.tile_deg = tile_deg
+        self.max_workers = max(1, int(max_workers))
+        self.query = query
+        self._query_key = hashlib.sha1(query.encode('utf-8')).hexdigest()[:10]
+
+        # One pooled session: keep-alive connections are reused across tiles
+        # and requests instead of a new TCP/TLS handshake per call
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='overpass')
+
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.requests_sent = 0
+        self.retried = 0
+        self.failures = 0
+
+    def tiles_for_radius(self, lat: float, lng: float, radius_m: float) -> List[Tuple[int, int]]:
+        """Grid tiles (row, col) covering the circle's bounding box"""
+        dlat = radius_m / 111_320.0
+        dlng = radius_m / (111_320.0 * max(math.cos(math.radians(lat)), 1e-6))
+        rows = range(math.floor((lat - dlat) / self.tile_deg), math.floor((lat + dlat) / self.tile_deg) + 1)
+        cols = range(math.floor((lng - dlng) / self.tile_deg), math.floor((lng + dlng) / self.tile_deg) + 1)
+        return [(r, c) for r in rows for c in cols]
+
+    def _tile_bbox(self, tile: Tuple[int, int]) -> str:
+        row, col = tile
+        south, west = row * self.tile_deg, col * self.tile_deg
+        return f"{south:.6f},{west:.6f},{south + self.tile_deg:.6f},{west + self.tile_deg:.6f}"
+
+    def _cache_path(self, tile: Tuple[int, int]) -> str:
+        return os.path.join(self.cache_dir, f"{self._query_key}_{self.tile_deg:g}_{tile[0]}_{tile[1]}.json")
+
+    def _read_cache(self, tile: Tuple[int, int]) -> Optional[List[Dict[str, Any]]]:
+        if not self.cache_dir:
+            return None
+        path = self._cache_path(tile)
+        try:
+            if time.time() - os.path.getmtime(path) > self.cache_ttl:
+                return None
+            with open(path) as f:
+                return json.load(f)['elements']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_cache(self, tile: Tuple[int, int], elements: List[Dict[str, Any]]) -> None:
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._cache_path(tile)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'fetched': time.time(), 'bbox': self._tile_bbox(tile), 'elements': elements}, f)
+        os.replace(tmp, path)  # atomic, so concurrent readers never see half a file
+
+    def _count(self, field: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def _fetch_tile(self, tile: Tuple[int, int]) -> List[Dict[str, Any]]:
+        """POST one tile query, retrying timeouts, connection errors and 429/5xx"""
+        query = self.query.format(bbox=self._tile_bbox(tile), timeout=int(self.timeout))
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._count('retried')
+            self._count('requests_sent')
+            try:
+                response = self.session.post(self.url, data={'data': query}, timeout=self.timeout)
+                if response.status_code in RETRY_STATUSES:
+                    last_error = f"HTTP {response.status_code}"
+                    retry_after = response.headers.get('Retry-After', '')
+                    delay = float(retry_after) if retry_after.isdigit() else self.backoff * 2 ** attempt
+                else:
+                    response.raise_for_status()
+                    elements = response.json().get('elements', [])
+                    self._write_cache(tile, elements)
+                    return elements
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = str(e)
+                delay = self.backoff * 2 ** attempt
+            except (requests.RequestException, ValueError) as e:
+                # Other HTTP errors and malformed JSON will not fix themselves
+                last_error = str(e)
+                break
+            if attempt < self.retries:
+                time.sleep(min(delay, 30.0))
+        self._count('failures')
+        raise OverpassError(f"tile {self._tile_bbox(tile)}: {last_error}")
+
+    def fetch_tiles(self, tiles: List[Tuple[int, int]]) -> List[Dict[str, Any]]:
+        """Elements of all tiles (cached ones read from disk, the rest fetched in parallel), deduplicated"""
+        elements, missing = [], []
+        for tile in tiles:
+            cached = self._read_cache(tile)
+            if cached is None:
+                missing.append(tile)
+            else:
+                elements.extend(cached)
+        self._count('cache_hits', len(tiles) - len(missing))
+        self._count('cache_misses', len(missing))
+
+        if len(missing) == 1:
+            elements.extend(self._fetch_tile(missing[0]))
+        elif missing:
+            for result in self._executor.map(self._fetch_tile, missing):
+                elements.extend(result)
+
+        # Ways and their nodes can straddle tile edges
+        unique = {}
+        for element in elements:
+            unique.setdefault((element.get('type'), element.get('id')), element)
+        return list(unique.values())
+
+    def fetch_around(self, lat: float, lng: float, radius_m: float) -> List[Dict[str, Any]]:
+        """Elements within radius_m metres of (lat, lng); elements without coordinates are kept"""
+        elements = self.fetch_tiles(self.tiles_for_radius(lat, lng, radius_m))
+        result = []
+        for element in elements:
+            elat, elng = element.get('lat'), element.get('lon')
+            if elat is None or elng is None or _haversine_m(lat, lng, elat, elng) <= radius_m:
+                result.append(element)
+        return result
+
+    def get_status(self) -> Dict[str, Any]:
+        """Endpoint, cache settings and request counters"""
+        return {
+            'url': self.url,
+            'cache_dir': self.cache_dir,
+            'cache_ttl_seconds': self.cache_ttl,
+            'tile_deg': self.tile_deg,
+            'max_workers': self.max_workers,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'requests_sent': self.requests_sent,
+            'retried': self.retried,
+            'failures': self.failures
+        }
+
+
+def _haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    dlat = math.radians(lat2 - lat1)
+    dlng = math.radians(lng2 - lng1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2
+    return 6_371_000.0 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
@@ -0,0 +1,86 @@
+"""
+Quantile Sketch
+Mergeable log-bucketed histogram (DDSketch style) for approximate percentiles
+of non-negative values in bounded memory
+"""
+
+import math
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+
+class QuantileSketch:
+    """
+    Counts per logarithmic bucket with a fixed relative accuracy
+
+    Bucket i covers (gamma^(i-1), gamma^i] with gamma = (1 + alpha) / (1 - alpha),
+    so any quantile is returned within alpha relative error of a true sample
+    value. Values at or below min_value share one zero bucket. Because a sketch
+    is just bucket counts, merging partitions (users, hours, stations) is an
+    addition of counts, which also lets SQLite merge them with SUM.
+    """
+
+    ZERO_BUCKET = -(2 ** 31)
+
+    def __init__(self, alpha: float = 0.01, min_value: float = 1e-3,
+                 counts: Optional[Dict[int, int]] = None):
+        """
+        Args:
+            alpha: Relative accuracy of returned quantiles
+            min_value: Values at or below this are counted as zero
+            counts: Initial bucket -> count mapping (e.g. loaded from storage)
+        """
+        self.alpha = alpha
+        self.min_value = min_value
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.counts = dict(counts or {})
+
+    def bucket_indices(self, values: Iterable[float]) -> np.ndarray:
+        """Bucket index of each value"""
+        values = np.asarray(values, dtype=np.float64)
+        safe = np.maximum(values, self.min_value)
+        indices = np.ceil(np.log(safe) / self._log_gamma).astype(np.int64)
+        return np.where(values > self.min_value, indices, self.ZERO_BUCKET)
+
+    def add(self, values: Iterable[float]) -> 'QuantileSketch':
+        """Count a batch of values"""
+        keys, counts = np.unique(self.bucket_indices(values), return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            self.counts[key] = self.counts.get(key, 0) + count
+        return self
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        """Add another sketch's counts (both must share alpha)"""
+        if other.alpha != self.alpha:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        return self
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts.values())
+
+    def _bucket_value(self, key: int) -> float:
+        if key == self.ZERO_BUCKET:
+            return 0.0
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantiles(self, qs: Sequence[float] = (50, 90, 99)) -> Dict[str, Optional[float]]:
+        """Approximate percentiles keyed 'p50', 'p90', ...; None when empty"""
+        total = self.count
+        labels = [f"p{q:g}" for q in qs]
+        if total == 0:
+            return {label: None for label in labels}
+
+        keys = sorted(self.counts)
+        cumulative = np.cumsum([self.counts[k] for k in keys])
+        # Rank of each quantile among 0..total-1, matching the lower-rank convention
+        ranks = np.floor(np.asarray(qs, dtype=np.float64) / 100 * (total - 1))
+        positions = np.searchsorted(cumulative, ranks, side='right')
+        return {
+            label: self._bucket_value(keys[min(pos, len(keys) - 1)])
+            for label, pos in zip(labels, positions.tolist())
+        }
@@ -0,0 +1,306 @@
+"""
+Station Queue Simulator
+Discrete-event simulation of multi-server CNG station queues for what-if analysis
+"""
+
+import heapq
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+
+# Hours treated as rush windows when a station only reports a rush pattern
+MORNING_RUSH_HOURS = range(7, 11)
+EVENING_RUSH_HOURS = range(17, 21)
+NIGHT_HOURS = range(0, 6)
+
+SERVICE_DISTRIBUTIONS = ('exponential', 'lognormal', 'gamma', 'deterministic')
+
+# Expected arrivals (sum of the curve x days x replications) one run may
+# simulate; every arrival is a step of the Python event loop and a few
+# array entries, so this bounds both run time and memory
+MAX_EXPECTED_ARRIVALS = 2_000_000
+
+
+def erlang_c_wait_time(arrivals_per_hr: float, service_time_min: float, servers: int) -> float:
+    """Mean queueing delay (minutes) of an M/M/c queue using the Erlang-C formula"""
+    if arrivals_per_hr <= 0 or service_time_min <= 0 or servers <= 0:
+        return 0.0
+
+    service_rate = 60.0 / service_time_min  # customers per hour per server
+    offered_load = arrivals_per_hr / service_rate
+    rho = offered_load / servers
+    if rho >= 1:
+        return float('inf')
+
+    # Sum of a^k / k! for k < c, built iteratively to avoid large factorials
+    term = 1.0
+    partial_sum = 1.0
+    for k in range(1, servers):
+        term *= offered_load / k
+        partial_sum += term
+    last_term = term * offered_load / servers
+    tail = last_term / (1 - rho)
+    prob_wait = tail / (partial_sum + tail)
+
+    return prob_wait / (servers * service_rate - arrivals_per_hr) * 60.0
+
+
+def _draw_service_times(rng, size, mean: float, cv: float, distribution: str) -> np.ndarray:
+    """Draw service times (minutes) with the given mean and coefficient of variation"""
+    if distribution == 'deterministic' or cv <= 0:
+        return np.full(size, mean)
+    if distribution == 'exponential':
+        return rng.exponential(mean, size)
+    if distribution == 'gamma':
+        shape = 1.0 / (cv * cv)
+        return rng.gamma(shape, mean / shape, size)
+    if distribution == 'lognormal':
+        sigma2 = math.log(1 + cv * cv)
+        mu = math.log(mean) - sigma2 / 2
+        return rng.lognormal(mu, math.sqrt(sigma2), size)
+    raise ValueError(f"Unknown service distribution: {distribution}")
+
+
+def _fcfs_start_times(arrivals: List[float], services: List[float], servers: int) -> List[float]:
+    """Event loop for a first-come-first-served queue with identical servers"""
+    free_at = [0.0] * servers  # min-heap of the times each server becomes idle
+    starts = []
+    for arrival, service in zip(arrivals, services):
+        earliest = free_at[0]
+        start = arrival if arrival > earliest else earliest
+        heapq.heapreplace(free_at, start + service)
+        starts.append(start)
+    return starts
+
+
+def _simulate_batch(params: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Run a batch of replications; module level so it can be sent to worker processes"""
+    rng = np.random.default_rng(params['seed'])
+    replications = params['replications']
+    days = params['days']
+    servers = params['servers']
+    curve = np.tile(np.asarray(params['arrival_curve'], dtype=float), days)
+    slots = curve.size
+
+    # Vectorized arrival generation for the whole batch. A gamma-distributed
+    # multiplier per hour turns the Poisson process into a bursty Cox process.
+    rates = np.broadcast_to(curve, (replications, slots))
+    burstiness = params['burstiness']
+    if burstiness > 0:
+        shape = 1.0 / (burstiness * burstiness)
+        rates = rates * rng.gamma(shape, 1.0 / shape, (replications, slots))
+    counts = rng.poisson(rates)
+    total = int(counts.sum())
+
+    slot_index = np.repeat(np.tile(np.arange(slots), replications), counts.ravel())
+    replication_index = np.repeat(np.arange(replications), counts.sum(axis=1))
+    arrivals = (slot_index + rng.random(total)) * 60.0
+    order = np.lexsort((arrivals, replication_index))
+    arrivals = arrivals[order]
+    slot_index = slot_index[order]
+    services = _draw_service_times(
+        rng, total, params['service_time_min'], params['service_cv'], params['service_distribution']
+    )
+
+    starts = np.empty(total)
+    queue_ahead = np.empty(total, dtype=np.int32)
+    bounds = np.concatenate(([0], np.cumsum(counts.sum(axis=1))))
+    for r in range(replications):
+        lo, hi = bounds[r], bounds[r + 1]
+        if lo == hi:
+            continue
+        rep_starts = np.asarray(_fcfs_start_times(
+            arrivals[lo:hi].tolist(), services[lo:hi].tolist(), servers
+        ))
+        starts[lo:hi] = rep_starts
+        # FCFS start times are non-decreasing, so the customers still waiting
+        # when someone arrives are found with a single binary search
+        position = np.arange(hi - lo)
+        started = np.searchsorted(rep_starts, arrivals[lo:hi], side='right')
+        queue_ahead[lo:hi] = position - np.minimum(position, started)
+
+    return {
+        'waits': (starts - arrivals).astype(np.float32),
+        'hours': (slot_index % 24).astype(np.int8),
+        'days': (slot_index // 24).astype(np.int16),
+        'queue_ahead': queue_ahead
+    }
+
+
+class StationQueueSimulator:
+    """Monte Carlo discrete-event simulation of station wait times"""
+
+    def __init__(self, workers: int = 1, seed: Optional[int] = None):
+        """
+        Args:
+            workers: Worker processes for replications (1 runs inline, larger
+                values are capped at the CPU count)
+            seed: Base seed so repeated what-if runs are reproducible
+        """
+        self.workers = max(1, min(int(workers), os.cpu_count() or 1))
+        self.seed = seed
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Long-lived worker pool of this process, created on first use.
+
+        Workers are spawned rather than forked, since the caller is usually a
+        multithreaded server; a forked server process gets its own pool.
+        """
+        with self._pool_lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def close(self) -> None:
+        """Shut the worker pool down (it is recreated if the simulator is used again)"""
+        with self._pool_lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown()
+            self._pool = None
+
+    def arrival_curve(self, station: Dict[str, Any]) -> np.ndarray:
+        """Build a 24-hour arrival rate curve (arrivals/hr) from station catalog fields"""
+        overall = float(station.get('overall_arrivals', 0) or 0)
+        morning = float(station.get('morning_arrivals', 0) or 0)
+        evening = float(station.get('evening_arrivals', 0) or 0)
+        pattern = str(station.get('rush_pattern', 'Steady') or 'Steady').lower()
+
+        curve = np.full(24, overall, dtype=float)
+        curve[list(NIGHT_HOURS)] *= 0.3
+
+        # Fall back to the rush pattern when peak rates are not reported
+        if not morning and ('morning' in pattern or 'both' in pattern or 'bimodal' in pattern):
+            morning = overall * 1.5
+        if not evening and ('evening' in pattern or 'both' in pattern or 'bimodal' in pattern):
+            evening = overall * 1.5
+        if morning:
+            curve[list(MORNING_RUSH_HOURS)] = morning
+        if evening:
+            curve[list(EVENING_RUSH_HOURS)] = evening
+
+        return curve
+
+    def _run(self, servers: int, service_time_min: float, arrival_curve,
+             service_cv: float, service_distribution: str, burstiness: float,
+             replications: int, days: int, seed: Optional[int]) -> Dict[str, np.ndarray]:
+        """Fan replications out over the process pool and pool the samples"""
+        if servers < 1:
+            raise ValueError("servers must be at least 1")
+        if service_time_min <= 0:
+            raise ValueError("service_time_min must be positive")
+        if service_distribution not in SERVICE_DISTRIBUTIONS:
+            raise ValueError(f"service_distribution must be one of {', '.join(SERVICE_DISTRIBUTIONS)}")
+        curve = np.asarray(arrival_curve, dtype=float)
+        if curve.shape != (24,) or not np.isfinite(curve).all() or (curve < 0).any():
+            raise ValueError("arrival_curve must contain 24 non-negative hourly rates")
+        if replications < 1 or days < 1:
+            raise ValueError("replications and days must be at least 1")
+        expected = float(curve.sum()) * days * replications
+        if expected > MAX_EXPECTED_ARRIVALS:
+            raise ValueError(f"run would simulate about {expected:.0f} arrivals, "
+                             f"at most {MAX_EXPECTED_ARRIVALS} are allowed")
+
+        workers = max(1, min(self.workers, replications))
+        per_batch = np.full(workers, replications // workers)
+        per_batch[:replications % workers] += 1
+        seeds = np.random.SeedSequence(seed if seed is not None else self.seed).spawn(workers)
+        batches = [{
+            'seed': batch_seed,
+            'replications': int(n),
+            'days': days,
+            'servers': int(servers),
+            'service_time_min': float(service_time_min),
+            'service_cv': float(service_cv),
+            'service_distribution': service_distribution,
+            'burstiness': float(burstiness),
+            'arrival_curve': curve
+        } for batch_seed, n in zip(seeds, per_batch)]
+
+        if workers == 1:
+            results = [_simulate_batch(batches[0])]
+        else:
+            results = list(self._get_pool().map(_simulate_batch, batches))
+
+        return {key: np.concatenate([r[key] for r in results]) for key in results[0]}
+
+    def simulate(self, servers: int, service_time_min: float, arrival_curve,
+                 service_cv: float = 1.0, service_distribution: str = 'exponential',
+                 burstiness: float = 0.0, replications: int = 500, days: int = 1,
+                 seed: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Simulate a station and summarize the wait-time distribution
+
+        Args:
+            servers: Number of dispensers serving the queue
+            service_time_min: Mean service time per vehicle (minutes)
+            arrival_curve: 24 hourly arrival rates (arrivals/hr)
+            service_cv: Coefficient of variation of service times
+            service_distribution: exponential, lognormal, gamma or deterministic
+            burstiness: Coefficient of variation of the hourly arrival rate (0 = Poisson)
+            replications: Number of Monte Carlo replications
+            days: Days simulated per replication
+            seed: Overrides the simulator seed for this run
+
+        Returns:
+            Dictionary with wait percentiles, hourly breakdown and Erlang-C baseline
+        """
+        samples = self._run(servers, service_time_min, arrival_curve, service_cv,
+                            service_distribution, burstiness, replications, days, seed)
+        waits = samples['waits']
+        hours = samples['hours']
+        curve = np.asarray(arrival_curve, dtype=float)
+        mean_rate = float(curve.mean())
+
+        erlang_c = erlang_c_wait_time(mean_rate, service_time_min, servers)
+
+        summary = {
+            'replications': replications,
+            'days': days,
+            'customers': int(waits.size),
+            'utilization': round(mean_rate * service_time_min / (60 * servers), 3),
+            # None when the mean load saturates the station (no steady state)
+            'erlang_c_wait_min': round(erlang_c, 2) if math.isfinite(erlang_c) else None,
+            'hourly': []
+        }
+        if waits.size == 0:
+            summary.update({'mean_wait': 0.0, 'prob_wait': 0.0,
+                            'wait_percentiles': {'p50': 0.0, 'p90': 0.0, 'p95': 0.0, 'p99': 0.0}})
+            return summary
+
+        p50, p90, p95, p99 = np.percentile(waits, [50, 90, 95, 99])
+        summary.update({
+            'mean_wait': round(float(waits.mean()), 2),
+            'prob_wait': round(float((waits > 1e-9).mean()), 3),
+            'wait_percentiles': {
+                'p50': round(float(p50), 2),
+                'p90': round(float(p90), 2),
+                'p95': round(float(p95), 2),
+                'p99': round(float(p99), 2)
+            }
+        })
+
+        # Hourly breakdown from one sort instead of 24 boolean scans
+        order = np.argsort(hours, kind='stable')
+        sorted_waits = waits[order]
+        bounds = np.searchsorted(hours[order], np.arange(25))
+        for hour in range(24):
+            hour_waits = sorted_waits[bounds[hour]:bounds[hour + 1]]
+            summary['hourly'].append({
+                'hour': hour,
+                'arrivals_per_hr': round(float(curve[hour]), 2),
+                'mean_wait': round(float(hour_waits.mean()), 2) if hour_waits.size else 0.0,
+                'p90_wait': round(float(np.percentile(hour_waits, 90)), 2) if hour_waits.size else 0.0
+            })
+
+        return summary
@@ -0,0 +1,176 @@
+"""
+Request Metrics
+Per-endpoint latency and payload size histograms, in-flight request count and
+model stage timings, rendered in the Prometheus text exposition format
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+INF_BUCKET = 'le="+Inf"'
+
+# Stage timings of the request being handled on this thread/context
+_current_stages: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = \
+    contextvars.ContextVar('request_stages', default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set (callers hold the lock)"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = tuple(buckets)
+        self.series: Dict[Tuple[str, ...], List] = {}  # labels -> [bucket counts, sum, count]
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        entry = self.series.get(labels)
+        if entry is None:
+            entry = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class RequestMetrics:
+    """Thread-safe request instrumentation shared by every handler thread"""
+
+    def __init__(self, latency_buckets=LATENCY_BUCKETS, size_buckets=SIZE_BUCKETS):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.requests: Dict[Tuple[str, str, str], int] = {}
+        self.latency = Histogram(latency_buckets)
+        self.request_size = Histogram(size_buckets)
+        self.response_size = Histogram(size_buckets)
+        self.stages = Histogram(latency_buckets)
+        self.started = time.time()
+
+    def begin_request(self) -> None:
+        """Count a request as in flight and start collecting its stage timings"""
+        with self._lock:
+            self.in_flight += 1
+        _current_stages.set([])
+
+    def end_request(self) -> None:
+        """Release the in-flight slot taken by begin_request"""
+        with self._lock:
+            self.in_flight -= 1
+        _current_stages.set(None)
+
+    def observe_request(self, endpoint: str, method: str, status: int, seconds: float,
+                        request_bytes: Optional[int] = None, response_bytes: Optional[int] = None) -> None:
+        """Record one finished request"""
+        with self._lock:
+            key = (endpoint, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.observe((endpoint, method), seconds)
+            if request_bytes is not None:
+                self.request_size.observe((endpoint,), request_bytes)
+            if response_bytes is not None:
+                self.response_size.observe((endpoint,), response_bytes)
+
+    def observe_stage(self, name: str, seconds: float) -> None:
+        """Record a model stage; it also joins the current request's Server-Timing"""
+        with self._lock:
+            self.stages.observe((name,), seconds)
+        stages = _current_stages.get()
+        if stages is not None:
+            stages.append((name, seconds))
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as a named stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(name, time.perf_counter() - start)
+
+    def timed_stage(self, name: str):
+        """Decorator form of stage()"""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def server_timing(total_seconds: Optional[float] = None) -> str:
+        """Server-Timing header value for the stages of the current request"""
+        totals: Dict[str, List[float]] = {}
+        for name, seconds in _current_stages.get() or []:
+            entry = totals.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+        parts = [f'{name};dur={seconds * 1000:.2f}' + (f';desc="x{count}"' if count > 1 else '')
+                 for name, (seconds, count) in totals.items()]
+        if total_seconds is not None:
+            parts.append(f'total;dur={total_seconds * 1000:.2f}')
+        return ', '.join(parts)
+
+    def _render_histogram(self, lines: List[str], name: str, help_text: str,
+                          label_names: Tuple[str, ...], histogram: Histogram) -> None:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for labels, (counts, total, count) in sorted(histogram.series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f'{name}_bucket{_labels(label_names, labels, le)} {cumulative}')
+            lines.append(f'{name}_bucket{_labels(label_names, labels, INF_BUCKET)} {count}')
+            lines.append(f'{name}_sum{_labels(label_names, labels)} {_number(total)}')
+            lines.append(f'{name}_count{_labels(label_names, labels)} {count}')
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            lines = [
+                '# HELP http_requests_total Finished requests by endpoint, method and status',
+                '# TYPE http_requests_total counter'
+            ]
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{_labels(("endpoint", "method", "status"), (endpoint, method, status))} {count}')
+            lines += [
+                '# HELP http_requests_in_flight Requests currently being handled',
+                '# TYPE http_requests_in_flight gauge',
+                f'http_requests_in_flight {self.in_flight}'
+            ]
+            self._render_histogram(lines, 'http_request_duration_seconds', 'Request latency by endpoint',
+                                   ('endpoint', 'method'), self.latency)
+            self._render_histogram(lines, 'http_request_size_bytes', 'Request body size by endpoint',
+                                   ('endpoint',), self.request_size)
+            self._render_histogram(lines, 'http_response_size_bytes', 'Response body size by endpoint',
+                                   ('endpoint',), self.response_size)
+            self._render_histogram(lines, 'app_stage_duration_seconds',
+                                   'Model stage time (catalog read, prediction, scoring, ...)',
+                                   ('stage',), self.stages)
+            lines += [
+                '# HELP process_start_time_seconds Start time of the process since the epoch',
+                '# TYPE process_start_time_seconds gauge',
+                f'process_start_time_seconds {_number(self.started)}'
+            ]
+        return '\n'.join(lines) + '\n'
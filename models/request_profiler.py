@@ -0,0 +1,263 @@
+"""
+Request Profiler
+Opt-in per-request profiling (cProfile or a stack sampler) plus a low-rate
+sampled mode, with profiles saved to a local directory under a retrievable ID
+"""
+
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+
+PROFILE_MODES = ('cprofile', 'sample')
+
+
+class StackSampler:
+    """Samples one thread's Python stack from a background thread.
+
+    Only the sampler thread does work between samples, so the profiled
+    request runs at close to full speed; the result is a count per call
+    stack in the collapsed ("folded") format flame graph tools read.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}"
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='request-stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+
+class ProfileSession:
+    """Profiler attached to one request"""
+
+    def __init__(self, mode: str, trigger: str, sample_interval: float):
+        self.mode = mode
+        self.trigger = trigger
+        self.started = time.perf_counter()
+        self.profile = None
+        self.sampler = None
+        if mode == 'cprofile':
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            self.sampler = StackSampler(threading.get_ident(), sample_interval)
+            self.sampler.start()
+
+    def stop(self) -> float:
+        if self.profile is not None:
+            self.profile.disable()
+        if self.sampler is not None:
+            self.sampler.stop()
+        return time.perf_counter() - self.started
+
+
+class RequestProfiler:
+    """Decides which requests to profile and stores the resulting profiles"""
+
+    MAX_LIST_LIMIT = 500
+
+    def __init__(self, directory: str, token: Optional[str] = None, sample_rate: float = 0.0,
+                 sample_interval: float = 0.005, max_profiles: int = 200, top: int = 30):
+        """
+        Args:
+            directory: Where profiles are written
+            token: Shared secret required in the X-Profile-Token header to
+                request or read profiles; without one, on-demand profiling is off
+            sample_rate: Fraction of all requests profiled with the stack sampler
+                (only while a token is configured)
+            sample_interval: Seconds between stack samples
+            max_profiles: Profiles kept on disk before the oldest are removed
+            top: Functions listed in each profile's summary
+        """
+        self.directory = directory
+        self.token = token or None
+        self.sample_rate = max(0.0, min(1.0, float(sample_rate)))
+        self.sample_interval = sample_interval
+        self.max_profiles = max_profiles
+        self.top = top
+        # cProfile hooks into the interpreter; on newer Pythons only one
+        # instance may be active, so concurrent requests fall back to sampling
+        self._cprofile_lock = threading.Lock()
+        self._files_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether on-demand profiling and profile retrieval are available"""
+        return self.token is not None
+
+    def authorize(self, token: Optional[str]) -> bool:
+        """Constant-time check of a presented token against the configured one"""
+        return bool(self.enabled and token and hmac.compare_digest(token.encode(), self.token.encode()))
+
+    def start(self, requested: Optional[str], authorized: bool) -> Optional[ProfileSession]:
+        """Profile session for this request, or None.
+
+        requested is the value of the profile flag ('1', 'cprofile' or
+        'sample'); it only counts for authorized callers. Otherwise the
+        request may still be picked by the sampled mode. Nothing is profiled
+        while profiling is disabled, since no one could read the profiles.
+        """
+        if not self.enabled:
+            return None
+        if requested and authorized:
+            mode = requested.lower() if requested.lower() in PROFILE_MODES else 'cprofile'
+            trigger = 'requested'
+        elif self.sample_rate and random.random() < self.sample_rate:
+            mode, trigger = 'sample', 'sampled'
+        else:
+            return None
+
+        if mode == 'cprofile' and not self._cprofile_lock.acquire(blocking=False):
+            mode = 'sample'
+        try:
+            return ProfileSession(mode, trigger, self.sample_interval)
+        except Exception:
+            if mode == 'cprofile':
+                self._cprofile_lock.release()
+            raise
+
+    def _stop(self, session: ProfileSession) -> float:
+        try:
+            return session.stop()
+        finally:
+            if session.mode == 'cprofile':
+                self._cprofile_lock.release()
+
+    def discard(self, session: ProfileSession) -> None:
+        """Stop a session without saving it"""
+        self._stop(session)
+
+    def finish(self, session: ProfileSession, info: Dict[str, Any]) -> str:
+        """Stop the session, write the profile and its summary; returns the profile ID"""
+        elapsed = self._stop(session)
+
+        # Microsecond timestamp first so IDs sort chronologically for pruning
+        profile_id = datetime.now().strftime('%Y%m%d-%H%M%S%f-') + uuid.uuid4().hex[:6]
+        os.makedirs(self.directory, exist_ok=True)
+        if session.profile is not None:
+            data_file = f'{profile_id}.prof'
+            session.profile.dump_stats(os.path.join(self.directory, data_file))
+            top = self._cprofile_top(session.profile)
+        else:
+            data_file = f'{profile_id}.folded'
+            with open(os.path.join(self.directory, data_file), 'w') as f:
+                for stack, count in session.sampler.stacks.most_common():
+                    f.write(f'{stack} {count}\n')
+            top = self._sampler_top(session.sampler)
+
+        summary = {
+            'id': profile_id,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'mode': session.mode,
+            'trigger': session.trigger,
+            'duration_ms': round(elapsed * 1000, 2),
+            'file': data_file,
+            **info,
+            'top': top
+        }
+        with open(os.path.join(self.directory, f'{profile_id}.json'), 'w') as f:
+            json.dump(summary, f, indent=2)
+        self._prune()
+        return profile_id
+
+    def _cprofile_top(self, profile: cProfile.Profile) -> List[Dict[str, Any]]:
+        """Functions with the largest cumulative time"""
+        stats = pstats.Stats(profile).stats
+        rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top]
+        return [{
+            'function': f"{os.path.basename(filename)}:{line}({name})",
+            'calls': calls,
+            'self_ms': round(self_time * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3)
+        } for (filename, line, name), (_, calls, self_time, cumulative, _) in rows]
+
+    def _sampler_top(self, sampler: StackSampler) -> List[Dict[str, Any]]:
+        """Frames present in the most samples (inclusive) with their self share"""
+        inclusive, own = Counter(), Counter()
+        for stack, count in sampler.stacks.items():
+            frames = stack.split(';')
+            for frame in set(frames):
+                inclusive[frame] += count
+            own[frames[-1]] += count
+        total = sampler.samples or 1
+        return [{
+            'function': frame,
+            'samples': count,
+            'inclusive_pct': round(100.0 * count / total, 1),
+            'self_pct': round(100.0 * own[frame] / total, 1)
+        } for frame, count in inclusive.most_common(self.top)]
+
+    def _prune(self) -> None:
+        """Remove the oldest profiles beyond max_profiles"""
+        with self._files_lock:
+            summaries = sorted(n for n in os.listdir(self.directory) if n.endswith('.json'))
+            for name in summaries[:max(0, len(summaries) - self.max_profiles)]:
+                profile_id = name[:-len('.json')]
+                for suffix in ('.json', '.prof', '.folded'):
+                    path = os.path.join(self.directory, profile_id + suffix)
+                    if os.path.exists(path):
+                        os.remove(path)
+
+    def list_profiles(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Newest profiles first (1..MAX_LIST_LIMIT of them), without their function tables"""
+        limit = max(1, min(int(limit), self.MAX_LIST_LIMIT))
+        if not os.path.isdir(self.directory):
+            return []
+        names = sorted((n for n in os.listdir(self.directory) if n.endswith('.json')), reverse=True)[:limit]
+        result = []
+        for name in names:
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    summary = json.load(f)
+            except (OSError, ValueError):
+                continue
+            summary.pop('top', None)
+            result.append(summary)
+        return result
+
+    def get_profile(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        """Summary of one profile, or None for unknown (or malformed) IDs"""
+        if not profile_id or os.path.basename(profile_id) != profile_id or profile_id.startswith('.'):
+            return None
+        path = os.path.join(self.directory, f'{profile_id}.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
@@ -0,0 +1,68 @@
+"""
+Restricted Area Index
+Buffered, prepared shapely polygons for water bodies and other no-build areas
+in an STRtree, so whole arrays of candidate points are validated in one call
+"""
+
+from typing import Dict, Any, List
+
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry import Polygon
+
+
+class RestrictedAreaIndex:
+    """Answers "is this point inside or within buffer of a restricted area" for many points at once"""
+
+    def __init__(self, areas: List[Dict[str, Any]], buffer_deg: float = 0.001):
+        """
+        Args:
+            areas: Dicts with 'name' and 'polygon' (a list of {'lat', 'lng'} vertices)
+            buffer_deg: Clearance kept around every area, in degrees
+                (0.001 is roughly 100 metres)
+        """
+        self.names = [area.get('name', f'Area {i + 1}') for i, area in enumerate(areas)]
+        self.buffer_deg = buffer_deg
+        geometries = []
+        for area in areas:
+            polygon = Polygon([(p['lng'], p['lat']) for p in area['polygon']])
+            if not polygon.is_valid:
+                polygon = shapely.make_valid(polygon)
+            geometries.append(polygon.buffer(buffer_deg))
+        self.geometries = np.array(geometries, dtype=object)
+        # The tree narrows each point to the few areas whose bounds contain it;
+        # prepared polygons then answer the exact point test for those pairs
+        shapely.prepare(self.geometries)
+        self.tree = STRtree(self.geometries)
+
+    def __len__(self) -> int:
+        return len(self.geometries)
+
+    def _hits(self, lats, lngs):
+        """(point index, area index) pairs for points inside or on a buffered area"""
+        lats = np.asarray(lats, dtype=np.float64).ravel()
+        lngs = np.asarray(lngs, dtype=np.float64).ravel()
+        if lats.shape != lngs.shape:
+            raise ValueError("lats and lngs must have the same length")
+        # Bounding box candidates only; a query predicate would prepare the
+        # points rather than the polygons
+        point_idx, area_idx = self.tree.query(shapely.points(lngs, lats))
+        inside = shapely.intersects_xy(self.geometries[area_idx], lngs[point_idx], lats[point_idx])
+        return len(lats), (point_idx[inside], area_idx[inside])
+
+    def restricted_mask(self, lats, lngs) -> np.ndarray:
+        """Boolean array, True where a point is in (or too close to) a restricted area"""
+        n, (point_idx, _) = self._hits(lats, lngs)
+        mask = np.zeros(n, dtype=bool)
+        mask[point_idx] = True
+        return mask
+
+    def valid_mask(self, lats, lngs) -> np.ndarray:
+        """Boolean array, True where a point is clear of every restricted area"""
+        return ~self.restricted_mask(lats, lngs)
+
+    def blocking_areas(self, lat: float, lng: float) -> List[str]:
+        """Names of the areas a single point falls in"""
+        _, (_, area_idx) = self._hits([lat], [lng])
+        return [self.names[i] for i in sorted(set(area_idx.tolist()))]
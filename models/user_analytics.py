@@ -5,16 +5,43 @@ Tracks and analyzes user behavior, charging patterns, and environmental impact
 
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import random
 
+from models.fueling_history import FuelingHistory, SKETCH, epoch_seconds
+from models.quantile_sketch import QuantileSketch
+
 
 class UserAnalytics:
     """Analyze user charging patterns and provide insights"""
     
-    def __init__(self):
-        """Initialize analytics with sample data"""
-        self.sample_data = self._generate_sample_data()
+    # Largest activity page a single request may ask for
+    MAX_PAGE_SIZE = 500
+    
+    def __init__(self, history: Optional[FuelingHistory] = None, seed_demo_data: Optional[bool] = None):
+        """
+        Initialize analytics on a fueling history store
+        
+        Args:
+            history: Event store to read from (defaults to an in-memory store)
+            seed_demo_data: Give users without any history generated sample data.
+                Defaults to on only for in-memory stores, so generated events
+                never end up in a persistent history next to real ones.
+        """
+        self.history = history or FuelingHistory()
+        if seed_demo_data is None:
+            seed_demo_data = self.history.path == ':memory:'
+        self.seed_demo_data = seed_demo_data
+        self._seeded_users = set()
+    
+    def _ensure_user_data(self, username: str) -> None:
+        """Seed sample events for a user with no history when demo data is enabled"""
+        if not self.seed_demo_data or username in self._seeded_users:
+            return
+        # The store checks for existing events and inserts in one transaction,
+        # so threads and worker processes racing here seed a user only once
+        self.history.insert_events_if_empty(username, self._generate_sample_data())
+        self._seeded_users.add(username)
     
     def _generate_sample_data(self, days: int = 90) -> List[Dict[str, Any]]:
         """Generate realistic sample charging data for demonstration"""
@@ -71,14 +98,19 @@ class UserAnalytics:
     
     def get_overview_stats(self, username: str = "User") -> Dict[str, Any]:
         """Get comprehensive overview statistics"""
-        if not self.sample_data:
+        self._ensure_user_data(username)
+        return self._overview_panel(username, self.history.summary(username))
+    
+    def _overview_panel(self, username: str, totals: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Overview figures from the user's materialized summary row"""
+        if not totals:
             return self._empty_stats()
         
-        total_charges = len(self.sample_data)
-        total_amount = sum(d['charge_amount_kg'] for d in self.sample_data)
-        total_cost = sum(d['cost'] for d in self.sample_data)
-        total_distance = sum(d['distance_km'] for d in self.sample_data)
-        avg_wait_time = np.mean([d['wait_time_minutes'] for d in self.sample_data])
+        total_charges = totals['count']
+        total_amount = totals['amount']
+        total_cost = totals['cost']
+        total_distance = totals['distance']
+        avg_wait_time = totals['wait'] / total_charges
         
         # Calculate CO2 savings compared to petrol
         petrol_emissions = total_distance * 0.154  # kg CO2 per km for petrol
@@ -90,7 +122,8 @@ class UserAnalytics:
         savings = petrol_cost - total_cost
         
         # Time periods
-        days_active = (datetime.now() - datetime.fromisoformat(self.sample_data[0]['timestamp'])).days + 1
+        first_event = datetime(1970, 1, 1) + timedelta(seconds=totals['first_ts'])
+        days_active = (datetime.now() - first_event).days + 1
         
         return {
             'username': username,
@@ -113,111 +146,114 @@ class UserAnalytics:
             }
         }
     
-    def get_usage_patterns(self) -> Dict[str, Any]:
+    def get_usage_patterns(self, username: str = "User") -> Dict[str, Any]:
         """Analyze usage patterns"""
-        if not self.sample_data:
+        self._ensure_user_data(username)
+        return self._usage_panel(self.history.all_buckets(username))
+    
+    def _usage_panel(self, buckets: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Usage patterns from the hour, day, station and weekend buckets"""
+        by_hour = buckets.get('hour')
+        if not by_hour:
             return {}
         
         # Daily pattern
         hourly_charges = [0] * 24
-        for record in self.sample_data:
-            hourly_charges[record['hour']] += 1
+        for row in by_hour:
+            hourly_charges[row['key']] = row['count']
         
         # Weekly pattern
         daily_charges = [0] * 7
         daily_amounts = [0.0] * 7
-        for record in self.sample_data:
-            dow = record['day_of_week']
-            daily_charges[dow] += 1
-            daily_amounts[dow] += record['charge_amount_kg']
-        
-        # Peak hours
-        peak_hour = hourly_charges.index(max(hourly_charges))
+        for row in buckets['day_of_week']:
+            daily_charges[row['key']] = row['count']
+            daily_amounts[row['key']] = row['amount']
         
         # Preferred stations
-        station_counts = {}
-        for record in self.sample_data:
-            station_type = record['station_type']
-            station_counts[station_type] = station_counts.get(station_type, 0) + 1
+        station_counts = {row['key']: row['count'] for row in buckets['station_type']}
+        
+        # Weekday (0) vs weekend (1)
+        split = {row['key']: row for row in buckets['is_weekend']}
+        weekday = split.get(0, {'count': 0, 'amount': 0.0})
+        weekend = split.get(1, {'count': 0, 'amount': 0.0})
         
         return {
             'hourly_distribution': hourly_charges,
             'daily_distribution': daily_charges,
             'daily_amounts': [round(a, 2) for a in daily_amounts],
-            'peak_hour': peak_hour,
+            'peak_hour': hourly_charges.index(max(hourly_charges)),
             'peak_day': daily_charges.index(max(daily_charges)),
             'preferred_stations': dict(sorted(station_counts.items(), key=lambda x: x[1], reverse=True)),
             'weekday_vs_weekend': {
-                'weekday_charges': sum(1 for d in self.sample_data if not d['is_weekend']),
-                'weekend_charges': sum(1 for d in self.sample_data if d['is_weekend']),
-                'weekday_avg_amount': round(np.mean([d['charge_amount_kg'] for d in self.sample_data if not d['is_weekend']]), 2),
-                'weekend_avg_amount': round(np.mean([d['charge_amount_kg'] for d in self.sample_data if d['is_weekend']]), 2)
+                'weekday_charges': weekday['count'],
+                'weekend_charges': weekend['count'],
+                'weekday_avg_amount': round(weekday['amount'] / weekday['count'], 2) if weekday['count'] else 0,
+                'weekend_avg_amount': round(weekend['amount'] / weekend['count'], 2) if weekend['count'] else 0
             }
         }
     
-    def get_efficiency_analysis(self) -> Dict[str, Any]:
+    def get_efficiency_analysis(self, username: str = "User") -> Dict[str, Any]:
         """Analyze fuel efficiency"""
-        if not self.sample_data:
-            return {}
-        
-        efficiencies = [d['efficiency_km_per_kg'] for d in self.sample_data if d['efficiency_km_per_kg'] > 0]
-        
-        if not efficiencies:
+        self._ensure_user_data(username)
+        summary = self.history.summary(username)
+        return self._efficiency_panel(
+            summary, self._trend_days(username, summary), self.history.sketch('efficiency', username)
+        )
+    
+    def _trend_days(self, username: str, summary: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Daily rollups for the 60 days ending on the user's latest event"""
+        if not summary:
+            return []
+        last_day = summary['last_ts'] - summary['last_ts'] % 86400
+        return self.history.rollups(username, 'day', start=last_day - 59 * 86400)
+    
+    def _efficiency_panel(self, stats: Optional[Dict[str, Any]], days: List[Dict[str, Any]],
+                          sketch: QuantileSketch) -> Dict[str, Any]:
+        """Efficiency statistics, percentiles and the 30-day trend from daily rollups"""
+        if not stats or not stats['eff_count']:
             return {}
         
-        # Calculate trends
-        recent_30 = [d['efficiency_km_per_kg'] for d in self.sample_data[-30:] if d['efficiency_km_per_kg'] > 0]
-        previous_30 = [d['efficiency_km_per_kg'] for d in self.sample_data[-60:-30] if d['efficiency_km_per_kg'] > 0]
-        
-        recent_avg = np.mean(recent_30) if recent_30 else 0
-        previous_avg = np.mean(previous_30) if previous_30 else 0
+        # Compare the latest 30 days of activity with the 30 days before them
+        split = stats['last_ts'] - stats['last_ts'] % 86400 - 29 * 86400
+        recent_n = sum(d['eff_count'] for d in days if d['start'] >= split)
+        previous_n = sum(d['eff_count'] for d in days if d['start'] < split)
+        recent_avg = sum(d['eff_sum'] for d in days if d['start'] >= split) / recent_n if recent_n else 0
+        previous_avg = sum(d['eff_sum'] for d in days if d['start'] < split) / previous_n if previous_n else 0
         trend = 'improving' if recent_avg > previous_avg else 'declining' if recent_avg < previous_avg else 'stable'
         
         return {
-            'average_efficiency': round(np.mean(efficiencies), 2),
-            'best_efficiency': round(max(efficiencies), 2),
-            'worst_efficiency': round(min(efficiencies), 2),
-            'std_deviation': round(np.std(efficiencies), 2),
+            'average_efficiency': round(stats['eff_mean'], 2),
+            'best_efficiency': round(stats['eff_max'], 2),
+            'worst_efficiency': round(stats['eff_min'], 2),
+            'std_deviation': round((stats['eff_m2'] / stats['eff_count']) ** 0.5, 2),
+            'efficiency_percentiles': self._percentiles(sketch),
             'recent_30_days_avg': round(recent_avg, 2),
             'previous_30_days_avg': round(previous_avg, 2),
             'trend': trend,
             'trend_percentage': round(((recent_avg - previous_avg) / previous_avg) * 100, 2) if previous_avg > 0 else 0
         }
     
-    def get_cost_analysis(self) -> Dict[str, Any]:
+    def get_cost_analysis(self, username: str = "User") -> Dict[str, Any]:
         """Analyze spending patterns"""
-        if not self.sample_data:
+        self._ensure_user_data(username)
+        return self._cost_panel(self.history.rollups(username, 'month'))
+    
+    def _cost_panel(self, by_month: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Spending breakdown from the monthly rollups"""
+        if not by_month:
             return {}
         
-        # Monthly breakdown
-        monthly_data = {}
-        for record in self.sample_data:
-            date = datetime.fromisoformat(record['timestamp'])
-            month_key = date.strftime('%Y-%m')
-            
-            if month_key not in monthly_data:
-                monthly_data[month_key] = {'cost': 0, 'amount': 0, 'count': 0}
-            
-            monthly_data[month_key]['cost'] += record['cost']
-            monthly_data[month_key]['amount'] += record['charge_amount_kg']
-            monthly_data[month_key]['count'] += 1
-        
-        # Sort by month
-        sorted_months = sorted(monthly_data.keys())
-        
-        monthly_breakdown = []
-        for month in sorted_months:
-            data = monthly_data[month]
-            monthly_breakdown.append({
-                'month': month,
-                'total_cost': round(data['cost'], 2),
-                'total_amount_kg': round(data['amount'], 2),
-                'num_charges': data['count'],
-                'avg_cost_per_charge': round(data['cost'] / data['count'], 2) if data['count'] > 0 else 0
-            })
+        # Monthly breakdown from the materialized rollup, ordered by month
+        monthly_breakdown = [{
+            'month': row['key'],
+            'total_cost': round(row['cost'], 2),
+            'total_amount_kg': round(row['amount'], 2),
+            'num_charges': row['count'],
+            'avg_cost_per_charge': round(row['cost'] / row['count'], 2) if row['count'] > 0 else 0
+        } for row in by_month]
         
         # Total and averages
-        total_cost = sum(d['cost'] for d in self.sample_data)
+        total_cost = sum(row['cost'] for row in by_month)
         avg_monthly = total_cost / len(monthly_breakdown) if monthly_breakdown else 0
         
         return {
@@ -228,51 +264,73 @@ class UserAnalytics:
             'lowest_month': min(monthly_breakdown, key=lambda x: x['total_cost']) if monthly_breakdown else None
         }
     
-    def get_wait_time_analysis(self) -> Dict[str, Any]:
+    def get_wait_time_analysis(self, username: str = "User") -> Dict[str, Any]:
         """Analyze wait time patterns"""
-        if not self.sample_data:
+        self._ensure_user_data(username)
+        return self._wait_panel(
+            self.history.summary(username), self.history.all_buckets(username),
+            self.history.sketch('wait', username, group_by='station_type')
+        )
+    
+    @staticmethod
+    def _percentiles(sketch: QuantileSketch) -> Dict[str, Optional[float]]:
+        """Rounded p50/p90/p99 of a quantile sketch"""
+        return {k: round(v, 2) if v is not None else None for k, v in sketch.quantiles((50, 90, 99)).items()}
+    
+    def _wait_panel(self, totals: Optional[Dict[str, Any]], buckets: Dict[str, List[Dict[str, Any]]],
+                    station_sketches: Dict[str, QuantileSketch]) -> Dict[str, Any]:
+        """Wait-time statistics from the summary row, hour/station buckets and per-station sketches"""
+        if not totals:
             return {}
         
-        wait_times = [d['wait_time_minutes'] for d in self.sample_data]
+        # Percentiles: the overall sketch is the merge of the per-station sketches
+        overall = QuantileSketch(alpha=SKETCH.alpha, min_value=SKETCH.min_value)
+        for sketch in station_sketches.values():
+            overall.merge(sketch)
         
         # By hour
-        hourly_waits = {}
-        for record in self.sample_data:
-            hour = record['hour']
-            if hour not in hourly_waits:
-                hourly_waits[hour] = []
-            hourly_waits[hour].append(record['wait_time_minutes'])
-        
-        hourly_avg = {hour: round(np.mean(times), 2) for hour, times in hourly_waits.items()}
+        hourly_avg = {
+            row['key']: round(row['wait'] / row['count'], 2)
+            for row in buckets['hour']
+        }
         
         # By station type
-        station_waits = {}
-        for record in self.sample_data:
-            stype = record['station_type']
-            if stype not in station_waits:
-                station_waits[stype] = []
-            station_waits[stype].append(record['wait_time_minutes'])
-        
-        station_avg = {stype: round(np.mean(times), 2) for stype, times in station_waits.items()}
+        station_avg = {
+            row['key']: round(row['wait'] / row['count'], 2)
+            for row in buckets['station_type']
+        }
         
+        mean_hourly = np.mean(list(hourly_avg.values()))
         return {
-            'average_wait_time': round(np.mean(wait_times), 2),
-            'min_wait_time': round(min(wait_times), 2),
-            'max_wait_time': round(max(wait_times), 2),
+            'average_wait_time': round(totals['wait'] / totals['count'], 2),
+            'min_wait_time': round(totals['min_wait'], 2),
+            'max_wait_time': round(totals['max_wait'], 2),
             'hourly_average': hourly_avg,
             'by_station_type': station_avg,
-            'peak_wait_hours': [hour for hour, avg in hourly_avg.items() if avg > np.mean(list(hourly_avg.values()))]
+            'peak_wait_hours': [hour for hour, avg in hourly_avg.items() if avg > mean_hourly],
+            'wait_percentiles': self._percentiles(overall),
+            'station_percentiles': {station: self._percentiles(sketch) for station, sketch in station_sketches.items()}
         }
     
-    def get_recommendations(self) -> List[Dict[str, str]]:
+    def get_recommendations(self, username: str = "User") -> List[Dict[str, str]]:
         """Generate personalized recommendations"""
+        self._ensure_user_data(username)
+        summary = self.history.summary(username)
+        buckets = self.history.all_buckets(username)
+        return self._recommendations_panel(
+            self._usage_panel(buckets),
+            self._efficiency_panel(
+                summary, self._trend_days(username, summary), self.history.sketch('efficiency', username)
+            ),
+            self._wait_panel(summary, buckets, self.history.sketch('wait', username, group_by='station_type')),
+            self._overview_panel(username, summary)
+        )
+    
+    def _recommendations_panel(self, patterns: Dict[str, Any], efficiency: Dict[str, Any],
+                               wait_analysis: Dict[str, Any], stats: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Recommendations derived from already computed panels"""
         recommendations = []
         
-        # Analyze patterns
-        patterns = self.get_usage_patterns()
-        efficiency = self.get_efficiency_analysis()
-        wait_analysis = self.get_wait_time_analysis()
-        
         if patterns:
             # Peak hour recommendation
             peak_hour = patterns.get('peak_hour', 0)
@@ -313,7 +371,6 @@ class UserAnalytics:
                 })
         
         # Environmental achievement
-        stats = self.get_overview_stats()
         co2_saved = stats.get('environmental_impact', {}).get('co2_saved_kg', 0)
         if co2_saved > 100:
             recommendations.append({
@@ -348,14 +405,28 @@ class UserAnalytics:
             }
         }
     
-    def get_recent_activity(self, limit: int = 10) -> List[Dict[str, Any]]:
+    def get_recent_activity(self, limit: int = 10, username: str = "User") -> List[Dict[str, Any]]:
         """Get recent charging activity"""
-        if not self.sample_data:
-            return []
-        
-        recent = sorted(self.sample_data, key=lambda x: x['timestamp'], reverse=True)[:limit]
-        
-        return [
+        return self.get_activity_page(username, limit)['activity']
+    
+    def get_activity_page(self, username: str = "User", limit: int = 10, before: Optional[str] = None,
+                          after: Optional[str] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Page of charging activity, newest first
+        
+        before/after are ISO timestamps bounding the events; pass the returned
+        next_cursor back to fetch the following page.
+        """
+        self._ensure_user_data(username)
+        limit = max(1, min(int(limit), self.MAX_PAGE_SIZE))
+        events, next_cursor = self.history.page(
+            username, limit,
+            before=epoch_seconds(before) if before else None,
+            after=epoch_seconds(after) if after else None,
+            cursor=cursor
+        )
+        
+        activity = [
             {
                 'date': r['timestamp'],
                 'amount_kg': r['charge_amount_kg'],
@@ -364,5 +435,67 @@ class UserAnalytics:
                 'wait_time': r['wait_time_minutes'],
                 'efficiency': r['efficiency_km_per_kg']
             }
-            for r in recent
+            for r in events
         ]
+        return {'activity': activity, 'next_cursor': next_cursor}
+    
+    def get_analytics_bundle(self, username: str = "User", activity_limit: int = 10) -> Dict[str, Any]:
+        """
+        Every dashboard panel from one read of the user's aggregates
+        
+        The summary row, all bucket histograms, the daily and monthly rollups and
+        the recent activity are fetched once and shared by every panel,
+        including the recommendations.
+        """
+        self._ensure_user_data(username)
+        summary = self.history.summary(username)
+        buckets = self.history.all_buckets(username)
+        
+        overview = self._overview_panel(username, summary)
+        patterns = self._usage_panel(buckets)
+        efficiency = self._efficiency_panel(
+            summary, self._trend_days(username, summary), self.history.sketch('efficiency', username)
+        )
+        wait_analysis = self._wait_panel(
+            summary, buckets, self.history.sketch('wait', username, group_by='station_type')
+        )
+        
+        return {
+            'overview': overview,
+            'recommendations': self._recommendations_panel(patterns, efficiency, wait_analysis, overview),
+            'usage_patterns': patterns,
+            'efficiency': efficiency,
+            'cost_analysis': self._cost_panel(self.history.rollups(username, 'month')),
+            'wait_time_analysis': wait_analysis,
+            'recent_activity': self.get_recent_activity(activity_limit, username)
+        }
+    
+    def get_period_rollup(self, username: str = "User", period: str = 'month',
+                          periods: int = 12) -> List[Dict[str, Any]]:
+        """Totals for the latest N days, weeks or months with activity"""
+        self._ensure_user_data(username)
+        return [{
+            'period': row['key'],
+            'num_charges': row['count'],
+            'total_amount_kg': round(row['amount'], 2),
+            'total_cost': round(row['cost'], 2),
+            'total_distance_km': round(row['distance'], 2),
+            'avg_wait_time': round(row['wait'] / row['count'], 2) if row['count'] else 0,
+            'avg_efficiency': round(row['avg_efficiency'], 2) if row['avg_efficiency'] is not None else None
+        } for row in self.history.rollups(username, period, last=periods)]
+    
+    def get_percentiles(self, metric: str = 'wait', username: Optional[str] = "User",
+                        hour: Optional[int] = None, station_type: Optional[str] = None) -> Dict[str, Any]:
+        """p50/p90/p99 of wait time or efficiency for a user, or the fleet when username is None"""
+        if username is not None:
+            self._ensure_user_data(username)
+        sketch = self.history.sketch(metric, username, hour=hour, station_type=station_type)
+        return {
+            'metric': metric,
+            'scope': 'fleet' if username is None else 'user',
+            'hour': hour,
+            'station_type': station_type,
+            'count': sketch.count,
+            'relative_accuracy': sketch.alpha,
+            'percentiles': self._percentiles(sketch)
+        }
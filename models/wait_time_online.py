@@ -0,0 +1,160 @@
+"""
+Online Wait Time Learning
+Buffers streamed queue observations and periodically folds them into the
+WaitTimePredictor without a blocking full retrain
+"""
+
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, List, Callable, Optional, Tuple
+
+
+class ObservationBuffer:
+    """Bounded ring buffer of (features, observed wait) pairs"""
+
+    def __init__(self, capacity: int = 5000):
+        self._items = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._received = 0  # total observations ever added
+
+    def add(self, observations: List[Tuple[Dict[str, Any], float]]) -> None:
+        """Append observations, dropping the oldest once full"""
+        with self._lock:
+            self._items.extend(observations)
+            self._received += len(observations)
+
+    def snapshot(self) -> Tuple[List[Dict[str, Any]], List[float], int]:
+        """Copy the buffered window together with the running received count"""
+        with self._lock:
+            items = list(self._items)
+            received = self._received
+        return [features for features, _ in items], [wait for _, wait in items], received
+
+    @property
+    def received(self) -> int:
+        return self._received
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class OnlineWaitTimeUpdater:
+    """Background worker that incrementally updates a WaitTimePredictor"""
+
+    def __init__(self, predictor, buffer: Optional[ObservationBuffer] = None,
+                 update_interval: float = 300.0, min_new_observations: int = 50,
+                 new_trees: int = 10, max_trees: int = 200,
+                 on_update: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            predictor: WaitTimePredictor to update
+            buffer: Ring buffer holding the recent observation window
+            update_interval: Seconds between update checks
+            min_new_observations: New observations required before an update runs
+            new_trees: Trees grown per update
+            max_trees: Forest size cap; older trees are retired beyond it
+            on_update: Called after each successful update (e.g. table refresh)
+        """
+        self.predictor = predictor
+        self.buffer = buffer or ObservationBuffer()
+        self.update_interval = update_interval
+        self.min_new_observations = min_new_observations
+        self.new_trees = new_trees
+        self.max_trees = max_trees
+        self.on_update = on_update
+
+        self.updates = 0
+        self.last_update = None
+        self._trained_through = 0
+        self._update_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @staticmethod
+    def parse_observation(obs: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
+        """Validate one observation and map it onto the predictor feature schema"""
+        if 'observed_wait' not in obs:
+            raise ValueError("observation is missing 'observed_wait'")
+        observed_wait = float(obs['observed_wait'])
+        if observed_wait < 0:
+            raise ValueError("observed_wait must be non-negative")
+
+        observed_at = datetime.fromisoformat(obs['timestamp']) if obs.get('timestamp') else datetime.now()
+        hour_of_day = int(obs.get('hour_of_day', observed_at.hour))
+        day_of_week = int(obs.get('day_of_week', observed_at.weekday()))
+        if not 0 <= hour_of_day <= 23:
+            raise ValueError("hour_of_day must be between 0 and 23")
+        if not 0 <= day_of_week <= 6:
+            raise ValueError("day_of_week must be between 0 and 6")
+        features = {
+            'active_chargers': float(obs.get('active_chargers', 1)),
+            'total_chargers': float(obs.get('total_chargers', 2)),
+            'current_queue_length': float(obs.get('queue_length', obs.get('current_queue_length', 0))),
+            'hour_of_day': hour_of_day,
+            'day_of_week': day_of_week,
+            'is_weekend': 1 if day_of_week >= 5 else 0,
+            'traffic_density': float(obs.get('traffic_density', 0.5)),
+            'historical_avg_wait_time': float(obs.get('historical_avg_wait_time', 10.0))
+        }
+        return features, observed_wait
+
+    def ingest(self, observations: List[Dict[str, Any]]) -> int:
+        """Validate and buffer raw observations; returns the number accepted"""
+        parsed = [self.parse_observation(obs) for obs in observations]
+        self.buffer.add(parsed)
+        return len(parsed)
+
+    def update_now(self) -> bool:
+        """Fold the buffered window into the model if enough new data arrived"""
+        with self._update_lock:
+            features, waits, received = self.buffer.snapshot()
+            if received - self._trained_through < self.min_new_observations:
+                return False
+
+            self.predictor.update_incremental(
+                features, waits, new_trees=self.new_trees, max_trees=self.max_trees
+            )
+            self._trained_through = received
+            self.updates += 1
+            self.last_update = datetime.now()
+
+        if self.on_update:
+            self.on_update()
+        return True
+
+    def start(self) -> None:
+        """Run update_now every update_interval on a daemon thread"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        def run():
+            while not self._stop.wait(self.update_interval):
+                try:
+                    self.update_now()
+                except Exception as e:
+                    print(f"Online wait time update failed: {e}")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name='wait-time-online', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background update thread"""
+        self._stop.set()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Describe buffer and update progress without building a lazily loaded model"""
+        received = self.buffer.received
+        model_loaded = getattr(self.predictor, 'ready', True)
+        return {
+            'worker_pid': os.getpid(),  # each server process learns on its own
+            'buffered': len(self.buffer),
+            'received': received,
+            'pending': received - self._trained_through,
+            'updates': self.updates,
+            'last_update': self.last_update.isoformat() if self.last_update else None,
+            'model_loaded': model_loaded,
+            'model_trees': len(getattr(self.predictor.model, 'estimators_', [])) if model_loaded else None
+        }
@@ -2,6 +2,7 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
 import numpy as np
 import pandas as pd
+import copy
 from datetime import datetime
 
 class WaitTimePredictor:
@@ -13,6 +14,8 @@ class WaitTimePredictor:
         )
         self.scaler = StandardScaler()
         self.is_trained = False
+        self._leaf_value_cache = None  # (model, padded leaf values) for quantiles
+        self._update_round = 0  # seeds the trees of each incremental update
         self.feature_columns = [
             'active_chargers',
             'total_chargers',
@@ -43,13 +46,54 @@ class WaitTimePredictor:
 
     def train(self, training_data, wait_times):
         """Train the model with historical data"""
-        X = self._prepare_features(training_data)
+        self._fit_matrix(self._prepare_features(training_data), wait_times)
+
+    def _fit_matrix(self, X, wait_times):
+        """Fit scaler and forest on a feature matrix in feature_columns order"""
         X_scaled = self.scaler.fit_transform(X)
         self.model.fit(X_scaled, wait_times)
         self.is_trained = True
 
+    def update_incremental(self, training_data, wait_times, new_trees=10, max_trees=200):
+        """Grow the forest with trees fitted on recent observations.
+
+        The updated forest is built on a copy and swapped in at the end, so
+        predictions keep using the previous model while the new trees are fitted.
+        Once the forest exceeds max_trees the oldest trees are retired, letting
+        the model follow recent conditions.
+        """
+        if not self.is_trained:
+            self.train(training_data, wait_times)
+            return
+
+        X_scaled = self.scaler.transform(self._prepare_features(training_data))
+        model = copy.copy(self.model)
+        model.estimators_ = list(self.model.estimators_)
+        # Warm start seeds new trees by their position in the forest, which
+        # repeats once the forest is trimmed back to max_trees; a fresh
+        # random_state per round keeps every round's trees distinct
+        self._update_round += 1
+        model.set_params(warm_start=True, n_estimators=len(model.estimators_) + new_trees,
+                         random_state=42 + self._update_round)
+        model.fit(X_scaled, wait_times)
+
+        if len(model.estimators_) > max_trees:
+            model.estimators_ = model.estimators_[-max_trees:]
+            model.set_params(n_estimators=max_trees)
+        self.model = model
+
     def train_from_csv(self, file_path: str):
         """Train model from a CSV file with flexible column names."""
+        X, wait_times = self.load_training_csv(file_path)
+        self._fit_matrix(X, wait_times)
+        return True
+
+    def load_training_csv(self, file_path: str):
+        """Read a training CSV into (X, wait_times) using the flexible column mapping.
+
+        Missing or non-numeric feature values become 0.0, matching how rows
+        were converted before training.
+        """
         try:
             df = pd.read_csv(file_path)
         except Exception:
@@ -80,21 +124,15 @@ class WaitTimePredictor:
         if target_col is None:
             raise ValueError('Target wait time column not found in training CSV')
 
-        # Build training dict list
-        records = []
-        waits = []
-        for _, row in df.iterrows():
-            record = {}
-            for f, src in mapping.items():
-                val = row[src] if src is not None and src in df.columns else None
-                if pd.isna(val):
-                    val = None
-                record[f] = float(val) if val is not None else 0.0
-            records.append(record)
-            waits.append(float(row[target_col]))
-
-        self.train(records, waits)
-        return True
+        # Build the feature matrix column by column
+        X = np.zeros((len(df), len(self.feature_columns)))
+        for i, feature in enumerate(self.feature_columns):
+            src = mapping[feature]
+            if src is not None:
+                X[:, i] = pd.to_numeric(df[src], errors='coerce').fillna(0.0).to_numpy(dtype=float)
+        wait_times = df[target_col].astype(float).to_numpy()
+
+        return X, wait_times
 
     def predict_wait_time(self, station_data):
         """Predict waiting times for stations"""
@@ -103,14 +141,72 @@ class WaitTimePredictor:
             return self._heuristic_prediction(station_data)
         
         X = self._prepare_features(station_data)
-        X_scaled = self.scaler.transform(X)
-        predictions = self.model.predict(X_scaled)
+        predictions, quantiles = self.predict_quantiles(X, (50, 90))
         
         return [{
             'station_id': station['id'],
             'predicted_wait': max(0, pred),  # Ensure non-negative wait times
+            'p50_wait': max(0, p50),
+            'p90_wait': max(0, p90),
             'confidence': self._calculate_confidence(station)
-        } for station, pred in zip(station_data, predictions)]
+        } for station, pred, (p50, p90) in zip(station_data, predictions, quantiles)]
+
+    def _leaf_values(self, model):
+        """Leaf predictions of every tree padded into one (n_trees, max_nodes) matrix.
+
+        Built once per fitted forest; the online updater swaps in new model
+        objects, which invalidates the cache.
+        """
+        cached = self._leaf_value_cache
+        if cached is not None and cached[0] is model:
+            return cached[1]
+
+        trees = [est.tree_ for est in model.estimators_]
+        values = np.zeros((len(trees), max(t.node_count for t in trees)))
+        for i, tree in enumerate(trees):
+            values[i, :tree.node_count] = tree.value[:, 0, 0]
+
+        self._leaf_value_cache = (model, values)
+        return values
+
+    def _per_tree_predictions(self, X_scaled):
+        """Predictions of every tree for every row, shape (n_rows, n_trees).
+
+        apply() returns the leaf each row lands in for all trees at once; a
+        single fancy-index gather over the padded leaf values then yields the
+        whole per-tree prediction matrix.
+        """
+        model = self.model
+        leaves = model.apply(X_scaled)
+        values = self._leaf_values(model)
+        return values[np.arange(values.shape[0]), leaves]
+
+    def predict_quantiles(self, X, quantiles=(50, 90)):
+        """Mean prediction plus per-tree quantiles for a feature matrix.
+
+        Returns (mean, q) where q has one column per requested percentile.
+        Without a trained forest there is no spread to measure, so the
+        heuristic mean is returned with NaN quantiles.
+        """
+        X = np.asarray(X, dtype=float)
+        if not self.is_trained:
+            return self.predict_features(X), np.full((len(X), len(quantiles)), np.nan)
+
+        per_tree = self._per_tree_predictions(self.scaler.transform(X))
+        mean = per_tree.mean(axis=1)
+        return mean, np.percentile(per_tree, quantiles, axis=1).T
+
+    def predict_features(self, X):
+        """Predict waiting times for a feature matrix whose columns follow feature_columns"""
+        X = np.asarray(X, dtype=float)
+        if not self.is_trained:
+            # Vectorized form of _heuristic_prediction
+            active, queue, historical = X[:, 0], X[:, 2], X[:, 7]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                wait_times = np.where(active == 0, historical, ((queue * 20) / active + historical) / 2)
+            return np.maximum(wait_times, 0)
+
+        return np.maximum(self.model.predict(self.scaler.transform(X)), 0)
 
     def _heuristic_prediction(self, station_data):
         """Simple heuristic for wait time prediction when model isn't trained"""
@@ -0,0 +1,176 @@
+"""
+Wait Time Lookup Table
+Precomputes predicted waits for every station across the 168 hour-of-week slots
+so request handlers can read them with an array index instead of running the model
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Callable, Optional, Tuple
+
+import numpy as np
+
+
+class WaitTimeTable:
+    """Station x day-of-week x hour table of predicted waits, refreshed in the background"""
+
+    # Values stored per slot: model mean and per-tree p50/p90
+    FIELDS = ('predicted_wait', 'p50_wait', 'p90_wait')
+
+    # Expected queue length used for precomputation (mean of the Poisson(1)
+    # draw the request path used to sample per request)
+    EXPECTED_QUEUE_LENGTH = 1.0
+
+    def __init__(self, predictor, refresh_interval: float = 900.0,
+                 dtype=np.float32, chunk_size: int = 2000):
+        """
+        Args:
+            predictor: WaitTimePredictor used to fill the table
+            refresh_interval: Seconds between background rebuilds
+            dtype: Storage dtype for predictions (float32 or float16)
+            chunk_size: Stations per model batch while building
+        """
+        self.predictor = predictor
+        self.refresh_interval = refresh_interval
+        self.dtype = np.dtype(dtype)
+        self.chunk_size = chunk_size
+
+        # (index, waits, confidence, built_at) - replaced as a whole so readers
+        # always see a consistent snapshot without taking a lock
+        self._snapshot = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def _slot_features(self, stations: List[Dict[str, Any]]) -> np.ndarray:
+        """Feature matrix with one row per (station, day, hour), in feature_columns order"""
+        n = len(stations)
+        base = np.array([[
+            s.get('active_chargers', 1),
+            s.get('total_chargers', 2),
+            s.get('current_queue_length', self.EXPECTED_QUEUE_LENGTH),
+            s.get('traffic_density', 0.5),
+            s.get('historical_avg_wait_time', 10.0)
+        ] for s in stations], dtype=float)
+
+        day = np.repeat(np.arange(7), 24)
+        hour = np.tile(np.arange(24), 7)
+        X = np.empty((n, 168, 8))
+        X[:, :, 0] = base[:, [0]]
+        X[:, :, 1] = base[:, [1]]
+        X[:, :, 2] = base[:, [2]]
+        X[:, :, 3] = hour
+        X[:, :, 4] = day
+        X[:, :, 5] = day >= 5
+        X[:, :, 6] = base[:, [3]]
+        X[:, :, 7] = base[:, [4]]
+        return X.reshape(n * 168, 8)
+
+    def build(self, stations: List[Dict[str, Any]]) -> Tuple[Dict[str, int], np.ndarray, np.ndarray]:
+        """Predict all 168 slots for every station (each station needs an 'id')"""
+        index = {}
+        unique = []
+        for s in stations:
+            if s['id'] not in index:
+                index[s['id']] = len(unique)
+                unique.append(s)
+
+        waits = np.empty((len(unique), 7, 24, len(self.FIELDS)), dtype=self.dtype)
+        for start in range(0, len(unique), self.chunk_size):
+            chunk = unique[start:start + self.chunk_size]
+            mean, quantiles = self.predictor.predict_quantiles(self._slot_features(chunk), (50, 90))
+            slots = waits[start:start + len(chunk)]
+            slots[..., 0] = mean.reshape(len(chunk), 7, 24)
+            slots[..., 1:] = np.maximum(quantiles, 0).reshape(len(chunk), 7, 24, 2)
+
+        # Confidence does not depend on the time slot, so it is stored per station
+        if self.predictor.is_trained:
+            confidence = np.array([self.predictor._calculate_confidence({
+                'traffic_density': s.get('traffic_density', 0.5),
+                'current_queue_length': s.get('current_queue_length', self.EXPECTED_QUEUE_LENGTH),
+                'active_chargers': s.get('active_chargers', 1),
+                'total_chargers': s.get('total_chargers', 2)
+            }) for s in unique], dtype=np.float32)
+        else:
+            confidence = np.full(len(unique), 0.6, dtype=np.float32)
+
+        return index, waits, confidence
+
+    def refresh(self, stations: List[Dict[str, Any]]) -> None:
+        """Rebuild the table and swap it in atomically"""
+        index, waits, confidence = self.build(stations)
+        waits.setflags(write=False)
+        confidence.setflags(write=False)
+        self._snapshot = (index, waits, confidence, time.time())
+
+    def lookup(self, station_ids: List[str], day_of_week: int,
+               hour: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Read predicted waits and confidences for one time slot
+
+        Returns (values, confidence) where values has one column per FIELDS
+        entry, or None until the first build completes. Unknown stations and
+        quantiles of an untrained model are NaN.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        index, waits, confidence, _ = snapshot
+
+        rows = np.fromiter((index.get(sid, -1) for sid in station_ids), dtype=np.int64,
+                           count=len(station_ids))
+        known = rows >= 0
+        safe_rows = np.where(known, rows, 0)
+        slot_waits = np.where(known[:, None], waits[safe_rows, day_of_week, hour], np.nan)
+        slot_confidence = np.where(known, confidence[safe_rows], np.nan)
+        return slot_waits, slot_confidence
+
+    def start(self, stations_provider: Callable[[], List[Dict[str, Any]]]) -> None:
+        """Build now and keep rebuilding every refresh_interval on a daemon thread.
+
+        A table that already exists (e.g. built before forking workers) is
+        kept until the first scheduled refresh instead of being rebuilt.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+
+        def run():
+            if self._snapshot is not None:
+                self._wake.wait(self.refresh_interval)
+                self._wake.clear()
+            while not self._stop.is_set():
+                try:
+                    self.refresh(stations_provider())
+                except Exception as e:
+                    print(f"Wait time table refresh failed: {e}")
+                self._wake.wait(self.refresh_interval)
+                self._wake.clear()
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name='wait-time-table', daemon=True)
+        self._thread.start()
+
+    def request_refresh(self) -> None:
+        """Ask the background thread to rebuild now, e.g. after the model was updated"""
+        self._wake.set()
+
+    def stop(self) -> None:
+        """Stop the background refresh thread"""
+        self._stop.set()
+        self._wake.set()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Describe the current snapshot"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {'ready': False}
+        index, waits, _, built_at = snapshot
+        return {
+            'ready': True,
+            'stations': len(index),
+            'dtype': str(waits.dtype),
+            'bytes': int(waits.nbytes),
+            'built_at': datetime.fromtimestamp(built_at).isoformat()
+        }
+
@@ -0,0 +1,258 @@
+"""
+Benchmark wait-time model variants on a training CSV.
+
+Trains each candidate on the train_from_csv column mapping and reports MAE,
+single-row and 1k-row inference latency, pickled size and load time as JSON.
+Pass --compare with an earlier report to flag regressions (exit code 1).
+
+Usage: python scripts/benchmark_wait_models.py <training_csv> [--output report.json]
+"""
+
+import argparse
+import json
+import os
+import pickle
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.queue_simulator import erlang_c_wait_time  # noqa: E402
+from models.wait_time_predictor import WaitTimePredictor  # noqa: E402
+
+
+# Optional per-row queueing inputs (Erlang-C catalog schema)
+ARRIVAL_COLUMNS = ['arrivals_per_hr', 'demo_overall_arrivals_per_hr', 'arrival_rate']
+SERVICE_COLUMNS = ['service_time_min', 'demo_avg_service_time_min', 'avg_service_time']
+
+# Metrics where a larger value in the new report is a regression
+COMPARED_METRICS = ['mae', 'single_row_ms_p50', 'batch_1k_ms_p50', 'size_bytes', 'load_ms']
+
+
+class ErlangCBaseline:
+    """Analytic queueing baseline with a fit/predict interface.
+
+    With per-row arrival rate and service time (extra columns 8 and 9) it
+    returns the Erlang-C mean wait. Otherwise it uses the M/M/c wait given the
+    observed queue, (queue + 1) * service_time / servers, with the service
+    time fitted by least squares on the training split.
+    """
+
+    def __init__(self):
+        self.service_time_min = 5.0
+
+    def fit(self, X, y):
+        x = (X[:, 2] + 1) / np.maximum(X[:, 0], 1)
+        denom = float(np.dot(x, x))
+        if denom > 0:
+            self.service_time_min = max(float(np.dot(x, y)) / denom, 1e-3)
+        return self
+
+    def predict(self, X):
+        servers = np.maximum(X[:, 0], 1)
+        if X.shape[1] > 8:
+            waits = np.array([
+                erlang_c_wait_time(arrivals, service, int(c))
+                for arrivals, service, c in zip(X[:, 8], X[:, 9], servers)
+            ])
+            # Saturated stations have no steady state; cap at the observed queue estimate
+            fallback = (X[:, 2] + 1) * X[:, 9] / servers
+            return np.where(np.isfinite(waits), waits, fallback)
+        return (X[:, 2] + 1) * self.service_time_min / servers
+
+
+def build_variants():
+    """Model factories keyed by variant name"""
+    def forest(depth):
+        return lambda: make_pipeline(
+            StandardScaler(), RandomForestRegressor(n_estimators=100, max_depth=depth, random_state=42)
+        )
+
+    return {
+        'rf_depth5': forest(5),
+        'rf_depth10': forest(10),  # current production configuration
+        'rf_depth20': forest(20),
+        'rf_unbounded': forest(None),
+        'hist_gradient_boosting': lambda: make_pipeline(
+            StandardScaler(), HistGradientBoostingRegressor(random_state=42)
+        ),
+        'linear': lambda: make_pipeline(StandardScaler(), LinearRegression()),
+        'erlang_c': ErlangCBaseline
+    }
+
+
+def queueing_columns(file_path: str):
+    """Per-row (arrival rate, service time) if the CSV carries them, else None"""
+    try:
+        df = pd.read_csv(file_path)
+    except Exception:
+        df = pd.read_excel(file_path)
+    cols = {str(c).strip().lower(): c for c in df.columns}
+    arrival = next((cols[c] for c in ARRIVAL_COLUMNS if c in cols), None)
+    service = next((cols[c] for c in SERVICE_COLUMNS if c in cols), None)
+    if arrival is None or service is None:
+        return None
+    return np.column_stack([
+        pd.to_numeric(df[arrival], errors='coerce').fillna(0.0),
+        pd.to_numeric(df[service], errors='coerce').fillna(0.0)
+    ])
+
+
+def time_calls(fn, repeats: int):
+    """Median and p95 wall time of fn() in milliseconds"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples)), float(np.percentile(samples, 95))
+
+
+def benchmark_variant(model, X_train, y_train, X_test, y_test, repeats: int):
+    """Train one variant and collect accuracy, latency and size metrics"""
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    train_s = time.perf_counter() - start
+
+    mae = float(np.mean(np.abs(model.predict(X_test) - y_test)))
+
+    single = X_test[:1]
+    batch = np.resize(X_test, (1000, X_test.shape[1]))
+    model.predict(single)  # warm-up
+    single_p50, single_p95 = time_calls(lambda: model.predict(single), repeats)
+    batch_p50, batch_p95 = time_calls(lambda: model.predict(batch), max(3, repeats // 10))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.pkl')
+        with open(path, 'wb') as f:
+            pickle.dump(model, f)
+        size_bytes = os.path.getsize(path)
+
+        def load():
+            with open(path, 'rb') as f:
+                pickle.load(f)
+        load_ms, _ = time_calls(load, 5)
+
+    return {
+        'mae': round(mae, 4),
+        'train_s': round(train_s, 4),
+        'single_row_ms_p50': round(single_p50, 4),
+        'single_row_ms_p95': round(single_p95, 4),
+        'batch_1k_ms_p50': round(batch_p50, 4),
+        'batch_1k_ms_p95': round(batch_p95, 4),
+        'size_bytes': size_bytes,
+        'load_ms': round(load_ms, 4)
+    }
+
+
+def run_benchmark(csv_path: str, variants=None, test_size: float = 0.2, repeats: int = 50):
+    """Benchmark the selected variants and return the report dictionary"""
+    X, y = WaitTimePredictor().load_training_csv(csv_path)
+    extra = queueing_columns(csv_path)
+    if extra is not None:
+        X = np.hstack([X, extra])
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+    factories = build_variants()
+    selected = variants or list(factories)
+
+    results = {}
+    for name in selected:
+        if name not in factories:
+            raise ValueError(f"Unknown variant: {name}")
+        # Only the analytic baseline sees the queueing columns
+        cols = slice(None) if name == 'erlang_c' else slice(0, 8)
+        print(f"Benchmarking {name}...")
+        results[name] = benchmark_variant(
+            factories[name](), X_train[:, cols], y_train, X_test[:, cols], y_test, repeats
+        )
+
+    return {
+        'generated_at': datetime.now().isoformat(),
+        'csv': os.path.abspath(csv_path),
+        'rows': int(len(y)),
+        'train_rows': int(len(y_train)),
+        'test_rows': int(len(y_test)),
+        'queueing_columns': extra is not None,
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'sklearn': sklearn.__version__,
+            'machine': platform.machine()
+        },
+        'variants': results
+    }
+
+
+def compare_reports(previous, current, tolerance: float):
+    """List metrics that got worse by more than the relative tolerance"""
+    regressions = []
+    for name, metrics in current['variants'].items():
+        old = previous.get('variants', {}).get(name)
+        if not old:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = old.get(metric), metrics.get(metric)
+            if before is None or after is None:
+                continue
+            if after > before * (1 + tolerance) and after - before > 1e-9:
+                regressions.append(f"{name}.{metric}: {before} -> {after}")
+    return regressions
+
+
+def print_table(report):
+    header = f"{'variant':<24}{'MAE':>10}{'1-row ms':>12}{'1k ms':>12}{'size KB':>12}{'load ms':>10}"
+    print(header)
+    print('-' * len(header))
+    for name, m in report['variants'].items():
+        print(f"{name:<24}{m['mae']:>10.3f}{m['single_row_ms_p50']:>12.3f}"
+              f"{m['batch_1k_ms_p50']:>12.3f}{m['size_bytes'] / 1024:>12.1f}{m['load_ms']:>10.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark wait-time model variants')
+    parser.add_argument('csv', help='Training CSV in the train_from_csv schema')
+    parser.add_argument('--output', default='wait_model_benchmark.json', help='Report path (JSON)')
+    parser.add_argument('--variants', nargs='+', help='Subset of variants to run')
+    parser.add_argument('--repeats', type=int, default=50, help='Single-row timing repeats')
+    parser.add_argument('--compare', help='Earlier report to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='Allowed relative slowdown')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.csv):
+        print(f"Input file not found: {args.csv}")
+        return 1
+
+    report = run_benchmark(args.csv, args.variants, repeats=args.repeats)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print_table(report)
+    print(f"Report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        regressions = compare_reports(previous, report, args.tolerance)
+        if regressions:
+            print("Regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("No regressions against", args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,67 +1,173 @@
-import sys
-import os
+"""
+Drop CSV rows whose coordinates are not on land.
+
+Land polygons come from a local Natural Earth GeoJSON file. It is downloaded
+once into instance/ (or --land points at your own copy) and reused offline
+afterwards. The land union is prepared once and each chunk of rows is tested
+with one vectorized shapely.intersects_xy call. The CSV is streamed in
+fixed-size chunks so memory stays flat for any file size, and --workers
+spreads the geometry tests over processes for very large inputs.
+
+Usage: python scripts/filter_land_points.py <input_csv> <output_csv>
+       [--land ne_110m_land.geojson] [--chunk-size 500000] [--workers 4] [--offline]
+"""
+
+import argparse
 import json
-import requests
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
-from shapely.geometry import Point, shape
+import requests
+import shapely
+from shapely.geometry import shape
 from shapely.ops import unary_union
 
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 NE_LAND_GEOJSON_URL = (
     "https://raw.githubusercontent.com/nvkelso/natural-earth-vector/master/geojson/ne_110m_land.geojson"
 )
+DEFAULT_LAND_PATH = os.path.join(REPO_ROOT, 'instance', 'ne_110m_land.geojson')
 
+LAT_COLUMNS = ["lat", "latitude", "@lat"]
+LON_COLUMNS = ["lng", "lon", "long", "longitude", "@lon"]
 
-def load_land_union() -> object:
-    """Download Natural Earth land polygons as GeoJSON and return a unary union geometry."""
+# Land geometry of a worker process, loaded once by the pool initializer
+_worker_land = None
+
+
+def ensure_land_file(path: str, offline: bool = False, refresh: bool = False) -> str:
+    """Return a local land GeoJSON path, downloading Natural Earth once if it is missing"""
+    if os.path.exists(path) and not refresh:
+        return path
+    if offline:
+        raise FileNotFoundError(f"Land file not found: {path} (run once without --offline to download it)")
+    print(f"Downloading Natural Earth land polygons to {path}")
     resp = requests.get(NE_LAND_GEOJSON_URL, timeout=60)
     resp.raise_for_status()
-    gj = resp.json()
-    geoms = []
-    for feat in gj.get("features", []):
-        geom = feat.get("geometry")
-        if geom:
-            geoms.append(shape(geom))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(resp.content)
+    os.replace(tmp, path)
+    return path
+
+
+def load_land_union(path: str) -> object:
+    """Read land polygons from a GeoJSON file and return their prepared union"""
+    with open(path) as f:
+        gj = json.load(f)
+    geoms = [shape(feat["geometry"]) for feat in gj.get("features", []) if feat.get("geometry")]
     if not geoms:
-        raise RuntimeError("No land polygons loaded from Natural Earth GeoJSON")
-    return unary_union(geoms)
+        raise RuntimeError(f"No land polygons in {path}")
+    land = unary_union(geoms)
+    shapely.prepare(land)
+    return land
+
+
+def land_mask(land, lats, lons) -> np.ndarray:
+    """True for coordinates on land or its boundary; unparseable coordinates are False"""
+    lat = pd.to_numeric(pd.Series(lats), errors='coerce').to_numpy(dtype=np.float64)
+    lon = pd.to_numeric(pd.Series(lons), errors='coerce').to_numpy(dtype=np.float64)
+    # intersects covers both contains and touches; NaN coordinates never intersect
+    return shapely.intersects_xy(land, lon, lat)
+
 
+def _init_worker(land_path: str) -> None:
+    global _worker_land
+    _worker_land = load_land_union(land_path)
 
-def filter_csv_to_land(input_csv: str, output_csv: str) -> None:
-    df = pd.read_csv(input_csv)
 
-    # Find lat/lon columns robustly
-    lower_cols = {str(c).strip().lower(): c for c in df.columns}
-    lat_col = next((lower_cols[c] for c in ["lat", "latitude", "@lat"] if c in lower_cols), None)
-    lon_col = next((lower_cols[c] for c in ["lng", "lon", "long", "longitude", "@lon"] if c in lower_cols), None)
+def _worker_mask(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    return land_mask(_worker_land, lats, lons)
+
+
+def find_columns(input_csv: str):
+    """(lat column, lon column) from the CSV header"""
+    header = pd.read_csv(input_csv, nrows=0)
+    lower_cols = {str(c).strip().lower(): c for c in header.columns}
+    lat_col = next((lower_cols[c] for c in LAT_COLUMNS if c in lower_cols), None)
+    lon_col = next((lower_cols[c] for c in LON_COLUMNS if c in lower_cols), None)
     if not lat_col or not lon_col:
         raise ValueError("Latitude/Longitude columns not found in CSV")
+    return lat_col, lon_col
 
-    land_union = load_land_union()
 
-    def is_on_land(lat_val, lon_val) -> bool:
-        try:
-            lat_f = float(lat_val)
-            lon_f = float(lon_val)
-        except Exception:
-            return False
-        pt = Point(lon_f, lat_f)
-        return land_union.contains(pt) or land_union.touches(pt) or land_union.intersects(pt)
+def filter_csv_to_land(input_csv: str, output_csv: str, land_path: str = DEFAULT_LAND_PATH,
+                       chunk_size: int = 500_000, workers: int = 1, offline: bool = False):
+    """Stream input_csv to output_csv keeping only rows on land; returns (rows read, rows kept)"""
+    lat_col, lon_col = find_columns(input_csv)
+    land_path = ensure_land_file(land_path, offline=offline)
+    # Coordinates are read as text so malformed values are dropped instead of failing the chunk
+    chunks = pd.read_csv(input_csv, chunksize=chunk_size, dtype={lat_col: str, lon_col: str})
 
-    mask = [is_on_land(lat, lon) for lat, lon in zip(df[lat_col], df[lon_col])]
-    cleaned = df[mask].copy()
-    cleaned.to_csv(output_csv, index=False)
+    read = kept = 0
+    first = True
 
+    def write(chunk, mask):
+        nonlocal read, kept, first
+        read += len(chunk)
+        kept += int(mask.sum())
+        chunk[mask].to_csv(output_csv, mode='w' if first else 'a', header=first, index=False)
+        first = False
 
-if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python scripts/filter_land_points.py <input_csv> <output_csv>")
-        sys.exit(1)
-    inp = sys.argv[1]
-    out = sys.argv[2]
-    if not os.path.exists(inp):
-        print(f"Input file not found: {inp}")
-        sys.exit(1)
-    filter_csv_to_land(inp, out)
+    if workers <= 1:
+        land = load_land_union(land_path)
+        for chunk in chunks:
+            write(chunk, land_mask(land, chunk[lat_col].to_numpy(), chunk[lon_col].to_numpy()))
+    else:
+        # Only coordinate arrays and masks cross process boundaries; at most
+        # two chunks per worker are in flight so memory stays bounded
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(land_path,)) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append((chunk, pool.submit(_worker_mask, chunk[lat_col].to_numpy(), chunk[lon_col].to_numpy())))
+                if len(pending) >= 2 * workers:
+                    done_chunk, future = pending.popleft()
+                    write(done_chunk, future.result())
+            while pending:
+                done_chunk, future = pending.popleft()
+                write(done_chunk, future.result())
 
+    if first:
+        # Empty input: still write the header
+        pd.read_csv(input_csv, nrows=0).to_csv(output_csv, index=False)
+    return read, kept
 
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Keep only CSV rows whose coordinates are on land')
+    parser.add_argument('input_csv', help='CSV with latitude/longitude columns')
+    parser.add_argument('output_csv', help='Where the rows on land are written')
+    parser.add_argument('--land', default=DEFAULT_LAND_PATH, help='Land polygons GeoJSON (downloaded here if missing)')
+    parser.add_argument('--chunk-size', type=int, default=500_000, help='Rows per chunk')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processes for the land test (pays off when geometry, not CSV parsing, dominates)')
+    parser.add_argument('--offline', action='store_true', help='Never download; fail if the land file is missing')
+    parser.add_argument('--refresh', action='store_true', help='Download the land file again')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input_csv):
+        print(f"Input file not found: {args.input_csv}")
+        return 1
+    if args.refresh:
+        ensure_land_file(args.land, refresh=True)
+
+    start = time.perf_counter()
+    try:
+        read, kept = filter_csv_to_land(args.input_csv, args.output_csv, args.land,
+                                        args.chunk_size, args.workers, args.offline)
+    except (ValueError, FileNotFoundError, RuntimeError) as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"Kept {kept} of {read} rows in {time.perf_counter() - start:.1f} s; written to {args.output_csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
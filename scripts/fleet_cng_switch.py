@@ -0,0 +1,80 @@
+"""
+Evaluate a CNG conversion for a whole fleet.
+
+Reads a CSV with vehicle_type, fuel, daily_km and (optionally) mileage
+columns, runs the vectorized fleet calculation and writes the JSON summary.
+Per-vehicle columns and monthly cumulative savings are opt-in because they
+grow with fleet size.
+
+Usage: python scripts/fleet_cng_switch.py <fleet_csv> [--output fleet.json] [--vehicles] [--monthly]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.cng_switch_calculator import CNGSwitchCalculator  # noqa: E402
+
+
+REQUIRED_COLUMNS = ['vehicle_type', 'fuel', 'daily_km']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fleet CNG switch savings')
+    parser.add_argument('csv', help='Fleet CSV with vehicle_type, fuel, daily_km[, mileage]')
+    parser.add_argument('--output', help='Write the JSON result here instead of stdout')
+    parser.add_argument('--vehicles', action='store_true', help='Include per-vehicle columns')
+    parser.add_argument('--monthly', action='store_true', help='Include per-vehicle monthly cumulative savings')
+    parser.add_argument('--months', type=int, default=60, help='Months in the monthly series')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.csv):
+        print(f"Input file not found: {args.csv}")
+        return 1
+
+    df = pd.read_csv(args.csv)
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        print(f"Missing columns: {', '.join(missing)}")
+        return 1
+
+    mileage = None
+    if 'mileage' in df.columns:
+        mileage = pd.to_numeric(df['mileage'], errors='coerce').to_numpy()
+
+    start = time.perf_counter()
+    result = CNGSwitchCalculator().calculate_fleet(
+        vehicle_types=df['vehicle_type'].astype(str).str.strip().str.lower().to_numpy(),
+        current_fuels=df['fuel'].astype(str).str.strip().str.lower().to_numpy(),
+        daily_km=pd.to_numeric(df['daily_km'], errors='coerce').fillna(0.0).to_numpy(),
+        current_mileage=mileage,
+        include_vehicles=args.vehicles,
+        include_monthly=args.monthly,
+        months=args.months,
+        enforce_limits=False  # request-size caps are for the web endpoint
+    )
+    elapsed = time.perf_counter() - start
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+        totals = result['totals']
+        print(f"{result['vehicles']} vehicles in {elapsed * 1000:.1f} ms: "
+              f"annual savings {totals['annual_savings']:,.0f}, "
+              f"conversion cost {totals['conversion_cost']:,.0f}")
+        print(f"Result written to {args.output}")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
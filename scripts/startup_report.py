@@ -0,0 +1,137 @@
+"""
+Report app cold-start cost.
+
+Imports app.py in a fresh interpreter under `-X importtime`, then lists the
+slowest imports, flags heavy libraries that were pulled in eagerly, and (with
+--resources) times building each lazily initialized resource on first use.
+
+Usage: python scripts/startup_report.py [--top 20] [--resources] [--output startup.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries that should only load when a resource needing them is first used
+HEAVY_MODULES = ['pandas', 'sklearn', 'scipy', 'shapely']
+
+RESOURCE_PROBE = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter() - start
+from models.lazy_resource import LazyResource
+timings = {}
+for resource in LazyResource.all_resources():
+    t = time.perf_counter()
+    try:
+        resource.get()
+        timings[resource.name] = round((time.perf_counter() - t) * 1000, 2)
+    except Exception as e:
+        timings[resource.name] = 'failed: %s' % e
+print(json.dumps({'import_ms': round(imported * 1000, 2), 'first_use_ms': timings}))
+"""
+
+
+def probe_env(tmp_dir: str):
+    """Environment for the probe interpreter: default startup settings and a throwaway database"""
+    env = dict(os.environ)
+    env['FUELING_DB_PATH'] = os.path.join(tmp_dir, 'startup_probe.db')
+    env.pop('START_BACKGROUND_WORKERS', None)
+    env.pop('WARM_UP_ON_START', None)
+    return env
+
+
+def parse_importtime(stderr: str):
+    """(module, self_us, cumulative_us) rows from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            rows.append((name.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return rows
+
+
+def measure_imports(env):
+    """Wall time of `import app` and the per-module import profile"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else 'import failed')
+    return wall_ms, parse_importtime(result.stderr)
+
+
+def measure_resources(env):
+    """Time to build each LazyResource on first use in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, '-c', RESOURCE_PROBE],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else 'probe failed')
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure app cold-start cost')
+    parser.add_argument('--top', type=int, default=20, help='Slowest imports to list')
+    parser.add_argument('--resources', action='store_true', help='Also time first use of each lazy resource')
+    parser.add_argument('--output', help='Write the report as JSON')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = probe_env(tmp)
+        wall_ms, rows = measure_imports(env)
+        resources = measure_resources(env) if args.resources else None
+
+    app_row = next((r for r in rows if r[0] == 'app'), None)
+    loaded = {name.split('.')[0] for name, _, _ in rows}
+    slowest = sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]
+
+    report = {
+        'python': sys.version.split()[0],
+        'process_wall_ms': round(wall_ms, 2),
+        'app_import_ms': round(app_row[2] / 1000, 2) if app_row else None,
+        'modules_imported': len(rows),
+        'eager_heavy_modules': [m for m in HEAVY_MODULES if m in loaded],
+        'slowest_imports': [
+            {'module': name, 'self_ms': round(self_us / 1000, 2), 'cumulative_ms': round(cum_us / 1000, 2)}
+            for name, self_us, cum_us in slowest
+        ],
+        'resources': resources
+    }
+
+    print(f"Interpreter + import app: {report['process_wall_ms']:.0f} ms "
+          f"(import app {report['app_import_ms']} ms, {report['modules_imported']} modules)")
+    print(f"Heavy modules imported eagerly: {', '.join(report['eager_heavy_modules']) or 'none'}")
+    print(f"{'module':<48}{'self ms':>10}{'cum ms':>10}")
+    for row in report['slowest_imports']:
+        print(f"{row['module'][:47]:<48}{row['self_ms']:>10.1f}{row['cumulative_ms']:>10.1f}")
+    if resources:
+        print("First use of lazy resources:")
+        for name, ms in resources['first_use_ms'].items():
+            print(f"  {name:<28}{ms} ms" if not isinstance(ms, str) else f"  {name:<28}{ms}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""
+Preforked multi-worker server.
+
+`python app.py` runs Flask's single-process debug server. For production,
+run this instead:
+
+    python serve.py --workers 4 --port 8000
+
+The parent process imports the app and builds every expensive object once:
+the wait time random forest, the location optimizer, the restricted area
+index, the parsed station catalog and the hour-of-week wait time table. It
+then moves all existing objects out of the garbage collector's reach with
+gc.freeze() and forks the workers. The workers inherit those objects
+copy-on-write. Their memory pages stay shared with the parent until a worker
+writes to them, so each extra worker costs only its private pages, not
+another copy of the models.
+
+gc.freeze() matters because a collection in a worker would otherwise touch
+the header of every tracked object and force those pages to be copied.
+Reference counting still dirties object headers that a worker touches. Big
+NumPy buffers such as the forest's node arrays are stored apart from their
+headers and stay shared.
+
+Background threads (wait table refresher, online updater, event ingest
+writer) and SQLite connections are created per worker after the fork, never
+inherited. All workers accept from one listening socket, so the kernel
+balances connections between them. Throughput scales with cores because
+each worker has its own interpreter and GIL.
+
+Online wait time learning is per worker. Observations posted to
+/api/wait-times/observations update only the worker that received them, so
+the workers' forests drift apart until a restart, and
+/api/wait-times/online-status answers for one worker (its 'worker_pid').
+Ingested fueling events are not affected: every worker commits them to the
+same SQLite history. Run with --workers 1 when predictions must reflect all
+observations.
+
+Check per-worker memory with:
+
+    python serve.py --workers 4 --check-memory
+
+This starts the workers, sends a mix of requests and prints RSS, PSS
+(proportional set size: shared pages split between the processes sharing
+them) and USS (private memory) for each worker, read from
+/proc/<pid>/smaps_rollup. With preloading, USS per worker stays a small
+fraction of RSS and total PSS stays close to a single process.
+--no-preload shows the naive cost for comparison. Send SIGUSR1 to the
+parent to print the same table for a running server.
+
+Linux/macOS only (needs fork).
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+# Imported by the parent before forking: no worker threads or warm-up threads
+# may exist at fork time
+os.environ.pop('START_BACKGROUND_WORKERS', None)
+os.environ.pop('WARM_UP_ON_START', None)
+
+
+def preload(app_module) -> None:
+    """Build models and parse the catalog in the parent so workers share them"""
+    start = time.perf_counter()
+    app_module._read_stations_file()
+    app_module.warm_up_all(background=False)
+    # Workers keep this table until its first scheduled refresh
+    app_module.wait_time_table.refresh(app_module._wait_table_stations())
+    print(f"Preloaded models and station catalog in {time.perf_counter() - start:.1f} s")
+
+
+def listen_socket(host: str, port: int, backlog: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app_module, sock: socket.socket, host: str, port: int) -> None:
+    """Worker body: per-process state, background threads, then serve until SIGTERM"""
+    from werkzeug.serving import make_server
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt  # werkzeug's serve_forever exits cleanly on this
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGUSR1, signal.SIG_IGN)  # memory reports are the parent's job
+
+    app_module.fueling_history.reset_after_fork()
+    app_module.start_background_workers()
+    server = make_server(host, port, app_module.app, threaded=True, fd=sock.fileno())
+    try:
+        server.serve_forever()
+    finally:
+        app_module.event_ingest.stop(timeout=10)  # flush events accepted by this worker
+
+
+def memory_usage(pid: int) -> dict:
+    """RSS, PSS and USS (private) in MiB from /proc/<pid>/smaps_rollup"""
+    fields = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        return {}
+    private = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    return {
+        'rss_mib': round(fields.get('Rss', 0) / 1024, 1),
+        'pss_mib': round(fields.get('Pss', 0) / 1024, 1),
+        'uss_mib': round(private / 1024, 1),
+        'shared_mib': round((fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)) / 1024, 1)
+    }
+
+
+def print_memory_report(parent_pid: int, worker_pids) -> dict:
+    rows = {'parent': memory_usage(parent_pid)}
+    rows.update({f'worker {pid}': memory_usage(pid) for pid in worker_pids})
+    if not rows['parent']:
+        print("Memory report needs /proc/<pid>/smaps_rollup (Linux)")
+        return rows
+    print(f"{'process':<16}{'RSS MiB':>10}{'PSS MiB':>10}{'USS MiB':>10}{'shared MiB':>12}")
+    for name, usage in rows.items():
+        if usage:
+            print(f"{name:<16}{usage['rss_mib']:>10.1f}{usage['pss_mib']:>10.1f}"
+                  f"{usage['uss_mib']:>10.1f}{usage['shared_mib']:>12.1f}")
+    total_pss = sum(u.get('pss_mib', 0) for u in rows.values())
+    print(f"{'total PSS':<16}{total_pss:>20.1f}  (naive estimate: {len(rows)} x parent RSS = "
+          f"{len(rows) * rows['parent']['rss_mib']:.1f})")
+    return rows
+
+
+def exercise(app_module, url: str, count: int) -> None:
+    """Send a request mix so workers touch the shared models and catalog"""
+    import requests
+
+    stations = app_module._read_stations_file().get('stations') or [{'position': {'lat': 28.6139, 'lng': 77.2090}}]
+    session = requests.Session()
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            session.get(url + '/api/startup-status', timeout=2)
+            break
+        except requests.RequestException:
+            time.sleep(0.2)
+    for i in range(count):
+        pos = stations[i % len(stations)]['position']
+        paths = [f"/api/stations/{pos['lat']}/{pos['lng']}", f"/api/optimize-locations/{pos['lat']}/{pos['lng']}",
+                 '/api/analytics/bundle']
+        # A new connection per request so the kernel spreads them over workers
+        requests.get(url + paths[i % len(paths)], timeout=60)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Preforked multi-worker server for the app')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to bind')
+    parser.add_argument('--port', type=int, default=8000, help='Port to bind (0 picks a free one)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+    parser.add_argument('--backlog', type=int, default=1024, help='Listen backlog')
+    parser.add_argument('--no-preload', action='store_true',
+                        help='Let each worker build its own models (to compare memory)')
+    parser.add_argument('--check-memory', action='store_true',
+                        help='Start, send --check-requests requests, print per-worker memory and exit')
+    parser.add_argument('--check-requests', type=int, default=60, help='Requests sent by --check-memory')
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, 'fork'):
+        print("serve.py needs os.fork(); use `python app.py` on this platform")
+        return 1
+
+    import app as app_module
+
+    if not args.no_preload:
+        preload(app_module)
+    sock = listen_socket(args.host, args.port, args.backlog)
+    host, port = sock.getsockname()[:2]
+
+    # Everything built so far becomes immortal to the collector, so no worker
+    # collection writes to (and un-shares) those pages
+    gc.collect()
+    gc.freeze()
+
+    workers = {}
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(app_module, sock, host, port)
+            except Exception as e:
+                print(f"Worker {os.getpid()} failed: {e}")
+                code = 1
+            finally:
+                os._exit(code)
+        workers[pid] = time.monotonic()
+
+    for _ in range(max(1, args.workers)):
+        spawn()
+    print(f"Serving on http://{host}:{port} with {len(workers)} workers (parent {os.getpid()})")
+
+    stopping = False
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGUSR1, lambda signum, frame: print_memory_report(os.getpid(), list(workers)))
+
+    if args.check_memory:
+        exercise(app_module, f'http://{host}:{port}', args.check_requests)
+        time.sleep(0.5)
+        print_memory_report(os.getpid(), list(workers))
+        shutdown(signal.SIGTERM, None)
+
+    # Supervise: reap exited workers and replace crashed ones (unless shutting down)
+    while workers:
+        try:
+            pid, status = os.wait()
+        except InterruptedError:
+            continue
+        except ChildProcessError:
+            break
+        started = workers.pop(pid, None)
+        if started is None or stopping:
+            continue
+        print(f"Worker {pid} exited with status {status}; restarting")
+        if time.monotonic() - started < 1.0:
+            time.sleep(1.0)  # do not spin on a worker that dies at startup
+        spawn()
+
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,26 +8,27 @@ document.addEventListener('DOMContentLoaded', function() {
 
 async function loadAnalytics() {
     try {
-        // Load all analytics data
-        await Promise.all([
-            loadOverviewStats(),
-            loadRecommendations(),
-            loadUsagePatterns(),
-            loadEfficiencyAnalysis(),
-            loadCostAnalysis(),
-            loadWaitTimeAnalysis(),
-            loadRecentActivity()
-        ]);
+        // All panels come from one request; each renderer gets its own slice
+        const response = await fetch('/api/analytics/bundle?limit=10');
+        const bundle = await response.json();
+        if (bundle.error) {
+            throw new Error(bundle.error);
+        }
+
+        loadOverviewStats(bundle.overview);
+        loadRecommendations({ recommendations: bundle.recommendations });
+        loadUsagePatterns(bundle.usage_patterns);
+        loadEfficiencyAnalysis(bundle.efficiency);
+        loadCostAnalysis(bundle.cost_analysis);
+        loadWaitTimeAnalysis(bundle.wait_time_analysis);
+        loadRecentActivity({ activity: bundle.recent_activity });
     } catch (error) {
         console.error('Error loading analytics:', error);
     }
 }
 
-async function loadOverviewStats() {
+function loadOverviewStats(data) {
     try {
-        const response = await fetch('/api/analytics/overview');
-        const data = await response.json();
-
         // Update stat cards
         document.getElementById('totalCharges').textContent = data.total_charges || 0;
         document.getElementById('periodDays').textContent = `Last ${data.period_days} days`;
@@ -46,11 +47,8 @@ async function loadOverviewStats() {
     }
 }
 
-async function loadRecommendations() {
+function loadRecommendations(data) {
     try {
-        const response = await fetch('/api/analytics/recommendations');
-        const data = await response.json();
-        
         const grid = document.getElementById('recommendationsGrid');
         
         if (!data.recommendations || data.recommendations.length === 0) {
@@ -79,11 +77,8 @@ async function loadRecommendations() {
     }
 }
 
-async function loadUsagePatterns() {
+function loadUsagePatterns(data) {
     try {
-        const response = await fetch('/api/analytics/usage-patterns');
-        const data = await response.json();
-
         // Daily pattern
         displayDailyPattern(data.hourly_distribution);
         
@@ -95,11 +90,8 @@ async function loadUsagePatterns() {
     }
 }
 
-async function loadEfficiencyAnalysis() {
+function loadEfficiencyAnalysis(data) {
     try {
-        const response = await fetch('/api/analytics/efficiency');
-        const data = await response.json();
-
         document.getElementById('avgEfficiency').textContent = `${data.average_efficiency || 0} km/kg`;
         document.getElementById('bestEfficiency').textContent = `${data.best_efficiency || 0} km/kg`;
         
@@ -127,11 +119,8 @@ async function loadEfficiencyAnalysis() {
     }
 }
 
-async function loadCostAnalysis() {
+function loadCostAnalysis(data) {
     try {
-        const response = await fetch('/api/analytics/cost-analysis');
-        const data = await response.json();
-
         displayMonthlySpending(data.monthly_breakdown);
 
     } catch (error) {
@@ -139,11 +128,8 @@ async function loadCostAnalysis() {
     }
 }
 
-async function loadWaitTimeAnalysis() {
+function loadWaitTimeAnalysis(data) {
     try {
-        const response = await fetch('/api/analytics/wait-time-analysis');
-        const data = await response.json();
-
         document.getElementById('avgWaitTime').textContent = `${formatNumber(data.average_wait_time)} min`;
         
         // Find best time to charge (lowest wait)
@@ -168,11 +154,8 @@ async function loadWaitTimeAnalysis() {
     }
 }
 
-async function loadRecentActivity() {
+function loadRecentActivity(data) {
     try {
-        const response = await fetch('/api/analytics/recent-activity?limit=10');
-        const data = await response.json();
-        
         const tbody = document.getElementById('recentActivityTable');
         
         if (!data.activity || data.activity.length === 0) {
@@ -0,0 +1,59 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def wait_training_set(n=300, seed=0):
+    """Feature rows in the WaitTimePredictor schema with queue-driven waits"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for _ in range(n):
+        day = int(rng.integers(0, 7))
+        rows.append({
+            'active_chargers': int(rng.integers(1, 4)),
+            'total_chargers': 4,
+            'current_queue_length': int(rng.integers(0, 8)),
+            'hour_of_day': int(rng.integers(0, 24)),
+            'day_of_week': day,
+            'is_weekend': int(day >= 5),
+            'traffic_density': float(rng.random()),
+            'historical_avg_wait_time': float(rng.uniform(5, 20))
+        })
+    waits = [r['current_queue_length'] * 4 / r['active_chargers'] + rng.normal(0, 1) for r in rows]
+    return rows, waits
+
+
+@pytest.fixture
+def training_set():
+    return wait_training_set
+
+
+@pytest.fixture(scope='session')
+def trained_predictor():
+    from models.wait_time_predictor import WaitTimePredictor
+    predictor = WaitTimePredictor()
+    predictor.model.set_params(n_estimators=20)
+    predictor.train(*wait_training_set())
+    return predictor
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """The Flask app module, imported with a throwaway database and profile directory"""
+    work = tmp_path_factory.mktemp('app')
+    os.environ['FUELING_DB_PATH'] = str(work / 'history.db')
+    os.environ['PROFILE_DIR'] = str(work / 'profiles')
+    os.environ['PROFILE_TOKEN'] = 'test-token'
+    os.environ['OVERPASS_CACHE_DIR'] = str(work / 'overpass')
+    import app
+    app.app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from scripts.benchmark_wait_models import ErlangCBaseline, compare_reports, run_benchmark
+
+
+def test_erlang_c_baseline_fits_service_time():
+    rng = np.random.default_rng(0)
+    X = np.zeros((200, 8))
+    X[:, 0] = rng.integers(1, 4, 200)
+    X[:, 2] = rng.integers(0, 6, 200)
+    y = (X[:, 2] + 1) * 6.0 / X[:, 0]
+    model = ErlangCBaseline().fit(X, y)
+    assert abs(model.service_time_min - 6.0) < 1e-9
+    np.testing.assert_allclose(model.predict(X), y)
+
+
+def test_compare_reports_flags_only_regressions_beyond_tolerance():
+    previous = {'variants': {'linear': {'mae': 1.0, 'load_ms': 2.0}}}
+    current = {'variants': {'linear': {'mae': 1.05, 'load_ms': 3.0}, 'new': {'mae': 9.0}}}
+    assert compare_reports(previous, current, tolerance=0.10) == ['linear.load_ms: 2.0 -> 3.0']
+
+
+def test_run_benchmark_reports_each_variant(tmp_path, training_set):
+    rows, waits = training_set(120)
+    csv_path = tmp_path / 'train.csv'
+    pd.DataFrame([{**row, 'wait_time': wait} for row, wait in zip(rows, waits)]).to_csv(csv_path, index=False)
+
+    report = run_benchmark(str(csv_path), ['linear', 'erlang_c'], repeats=2)
+    assert set(report['variants']) == {'linear', 'erlang_c'}
+    assert report['train_rows'] + report['test_rows'] == 120
+    assert all(m['mae'] >= 0 and m['size_bytes'] > 0 for m in report['variants'].values())
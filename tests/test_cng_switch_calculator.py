@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from models.cng_switch_calculator import CNGSwitchCalculator
+
+calculator = CNGSwitchCalculator()
+
+
+def sample_fleet(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    types = rng.choice(['hatchback', 'sedan', 'suv', 'commercial', 'scooter'], n)
+    fuels = rng.choice(['petrol', 'diesel'], n)
+    daily_km = np.round(rng.uniform(5, 250, n), 1)
+    mileage = [None if rng.random() < 0.3 else float(m) for m in rng.uniform(8, 22, n)]
+    return types.tolist(), fuels.tolist(), daily_km.tolist(), mileage
+
+
+def test_fleet_arrays_match_scalar_calculation():
+    types, fuels, daily_km, mileage = sample_fleet()
+    arrays = calculator.fleet_arrays(types, fuels, daily_km, mileage)
+    for i in range(len(types)):
+        scalar = calculator.calculate_savings(types[i], fuels[i], daily_km[i], mileage[i])
+        assert arrays['annual_savings'][i] == pytest.approx(scalar['savings']['total_annual'], abs=0.01)
+        assert arrays['five_year_savings'][i] == pytest.approx(scalar['savings']['five_year'], abs=0.01)
+        assert arrays['conversion_cost'][i] == scalar['roi']['conversion_cost']
+        assert arrays['emissions_reduction_kg'][i] == pytest.approx(
+            scalar['environmental']['annual_reduction_kg'], abs=0.01)
+        expected_payback = scalar['roi']['payback_months'] or np.inf
+        assert arrays['payback_months'][i] == pytest.approx(expected_payback, abs=0.01)
+
+
+def test_fleet_totals_and_monthly_series():
+    types, fuels, daily_km, mileage = sample_fleet(50, seed=1)
+    result = calculator.calculate_fleet(types, fuels, daily_km, mileage, include_monthly=True, months=24)
+    scalar = [calculator.calculate_savings(*args) for args in zip(types, fuels, daily_km, mileage)]
+    assert result['vehicles'] == 50
+    assert result['totals']['annual_savings'] == pytest.approx(sum(s['savings']['total_annual'] for s in scalar),
+                                                               abs=0.5)
+    assert sum(result['payback_histogram'].values()) == 50
+    monthly = np.array(result['monthly_cumulative_savings'])
+    assert monthly.shape == (50, 24)
+    expected = np.array([s['savings']['total_annual'] * 24 / 12 - s['roi']['conversion_cost'] for s in scalar])
+    np.testing.assert_allclose(monthly[:, -1], expected, atol=0.05)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'months': 0},
+    {'months': CNGSwitchCalculator.MAX_FLEET_MONTHS + 1},
+    {'include_monthly': True, 'months': 240, 'n': CNGSwitchCalculator.MAX_FLEET_MONTHLY_CELLS // 240 + 1},
+    {'n': CNGSwitchCalculator.MAX_FLEET_VEHICLES + 1}
+])
+def test_fleet_limits(kwargs):
+    n = kwargs.pop('n', 3)
+    with pytest.raises(ValueError):
+        calculator.calculate_fleet(['sedan'] * n, ['petrol'] * n, [40.0] * n, **kwargs)
+
+
+def test_fleet_rejects_mismatched_columns(client):
+    assert client.post('/api/cng-calculator/fleet', json={
+        'vehicle_type': ['sedan', 'suv'], 'fuel': ['petrol'], 'daily_km': [40, 50]}).status_code == 400
+    assert client.post('/api/cng-calculator/fleet', json={
+        'vehicle_type': ['sedan'], 'fuel': ['petrol'], 'daily_km': [40], 'months': -1}).status_code == 400
+    assert client.post('/api/cng-calculator/fleet', json={
+        'vehicle_type': ['sedan'], 'fuel': ['petrol'], 'daily_km': [40]}).status_code == 200
+
+
+def test_sensitivity_limits_and_horizon_clamping():
+    with pytest.raises(ValueError):
+        calculator.simulate_sensitivity('sedan', 'petrol', 40, samples=0)
+    with pytest.raises(ValueError):
+        calculator.simulate_sensitivity('sedan', 'petrol', 40, samples=CNGSwitchCalculator.MAX_SENSITIVITY_SAMPLES,
+                                        months=CNGSwitchCalculator.MAX_SENSITIVITY_MONTHS)
+    with pytest.raises(ValueError):
+        calculator.simulate_sensitivity('sedan', 'petrol', 40, samples=100,
+                                        breakeven_months=range(CNGSwitchCalculator.MAX_BREAKEVEN_HORIZONS + 1))
+    result = calculator.simulate_sensitivity('sedan', 'petrol', 40, samples=200, months=24,
+                                             breakeven_months=[-5, 12, 10 ** 9], seed=1)
+    assert list(result['breakeven_probability']) == ['1', '12', str(CNGSwitchCalculator.MAX_SENSITIVITY_MONTHS)]
+
+
+def test_sensitivity_endpoint_bounds(client):
+    body = {'vehicleType': 'sedan', 'currentFuel': 'petrol', 'dailyKm': 40, 'seed': 1}
+    assert client.post('/api/cng-calculator/sensitivity', json={**body, 'months': 0}).status_code == 400
+    assert client.post('/api/cng-calculator/sensitivity', json={
+        **body, 'samples': 100, 'breakevenMonths': list(range(1, 100))}).status_code == 400
+    response = client.post('/api/cng-calculator/sensitivity', json={**body, 'samples': 10 ** 9, 'months': 10 ** 6})
+    assert response.status_code == 200
+    result = response.get_json()
+    # Oversized requests are scaled down to the engine's limits
+    assert result['months'] == CNGSwitchCalculator.MAX_SENSITIVITY_MONTHS
+    assert result['samples'] * result['months'] <= CNGSwitchCalculator.MAX_SENSITIVITY_CELLS
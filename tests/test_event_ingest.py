@@ -0,0 +1,75 @@
+import json
+import time
+
+import pytest
+
+from models.event_ingest import EventIngestQueue, IngestQueueFull
+from models.fueling_history import FuelingHistory
+
+
+def event(**overrides):
+    return {'timestamp': '2024-03-01T08:15:00', 'charge_amount_kg': 6.0, 'cost': 450.0, **overrides}
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_submit_starts_the_writer_and_events_get_written():
+    history = FuelingHistory()
+    ingest = EventIngestQueue(history, flush_interval=0.05)
+    assert not ingest.get_status()['writer_running']
+    try:
+        assert ingest.submit([event(), event(user='kai')], default_user='jo') == 2
+        assert ingest.get_status()['writer_running']
+        wait_for(lambda: ingest.get_status()['written'] == 2)
+        assert history.summary('jo')['count'] == 1 and history.summary('kai')['count'] == 1
+    finally:
+        ingest.stop(timeout=5)
+
+
+def test_full_queue_raises_backpressure():
+    ingest = EventIngestQueue(FuelingHistory(), max_batches=2)
+    ingest.start = lambda: None  # keep the writer off so the queue fills up
+    ingest.submit([event()])
+    ingest.submit([event()])
+    with pytest.raises(IngestQueueFull):
+        ingest.submit([event()])
+    status = ingest.get_status()
+    assert (status['accepted'], status['rejected_batches'], status['queued_batches']) == (2, 1, 2)
+
+    assert ingest.drain(block=False) == 2
+    assert ingest.get_status()['written'] == 2
+
+
+@pytest.mark.parametrize('bad', [
+    {'timestamp': 'yesterday'}, {'cost': None}, {'charge_amount_kg': '6'}, {'wait_time_minutes': -1},
+    {'station_type': 'Airport'}, {'timestamp': 1709280900}
+])
+def test_invalid_events_are_rejected_before_queueing(bad):
+    ingest = EventIngestQueue(FuelingHistory())
+    with pytest.raises(ValueError):
+        ingest.submit([event(**bad)])
+    assert ingest.get_status()['queued_batches'] == 0
+
+
+def test_decode_accepts_ndjson_and_arrays():
+    lines = '\n'.join(json.dumps(event(cost=c)) for c in (1, 2)) + '\n'
+    assert len(EventIngestQueue.decode(lines.encode(), 'application/x-ndjson')) == 2
+    assert len(EventIngestQueue.decode(json.dumps({'events': [event()]}).encode(), 'application/json')) == 1
+
+
+def test_endpoint_accepts_with_202_and_pushes_back_with_429(app_module, client, monkeypatch):
+    response = client.post('/api/analytics/events', json=[event()])
+    assert response.status_code == 202 and response.get_json()['accepted'] == 1
+
+    def full(events, default_user='User'):
+        raise IngestQueueFull("ingest queue is full, retry later")
+
+    monkeypatch.setattr(app_module.event_ingest, 'submit', full)
+    response = client.post('/api/analytics/events', json=[event()])
+    assert response.status_code == 429 and response.headers['Retry-After'] == '1'
+    assert client.post('/api/analytics/events', data='not json').status_code == 400
@@ -0,0 +1,85 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.filter_land_points import filter_csv_to_land, land_mask, load_land_union, main
+
+# Two islands; the first has a lagoon (hole) in the middle
+LAND = {'type': 'FeatureCollection', 'features': [
+    {'type': 'Feature', 'properties': {}, 'geometry': {'type': 'Polygon', 'coordinates': [
+        [[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]],
+        [[4, 4], [6, 4], [6, 6], [4, 6], [4, 4]]
+    ]}},
+    {'type': 'Feature', 'properties': {}, 'geometry': {'type': 'Polygon', 'coordinates': [
+        [[20, 20], [30, 20], [30, 30], [20, 30], [20, 20]]
+    ]}},
+    {'type': 'Feature', 'properties': {}, 'geometry': None}
+]}
+
+
+@pytest.fixture
+def land_path(tmp_path):
+    path = tmp_path / 'land.geojson'
+    path.write_text(json.dumps(LAND))
+    return str(path)
+
+
+def points_csv(path, n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'name': [f'p{i}' for i in range(n)],
+        'Latitude': np.round(rng.uniform(-5, 35, n), 4).astype(str),
+        'lon': np.round(rng.uniform(-5, 35, n), 4).astype(str)
+    })
+    df.loc[3, 'Latitude'] = 'n/a'
+    df.loc[4, 'lon'] = ''
+    df.to_csv(path, index=False)
+    return df
+
+
+def expected_on_land(lat, lon):
+    island = (0 <= lon <= 10 and 0 <= lat <= 10) and not (4 < lon < 6 and 4 < lat < 6)
+    return island or (20 <= lon <= 30 and 20 <= lat <= 30)
+
+
+def test_land_mask(land_path):
+    land = load_land_union(land_path)
+    lats = ['5', '1', '0', '25', '15', 'abc', None, '5']
+    lons = ['5', '1', '3', '25', '15', '1', '1', '4']
+    # lagoon, island, boundary, second island, sea, bad, missing, lagoon edge
+    assert land_mask(land, lats, lons).tolist() == [False, True, True, True, False, False, False, True]
+
+
+@pytest.mark.parametrize('chunk_size,workers', [(1000, 1), (7, 1), (7, 2)])
+def test_filter_matches_per_point_check(land_path, tmp_path, chunk_size, workers):
+    source = points_csv(tmp_path / 'in.csv')
+    output = tmp_path / 'out.csv'
+    read, kept = filter_csv_to_land(str(tmp_path / 'in.csv'), str(output), land_path,
+                                    chunk_size=chunk_size, workers=workers, offline=True)
+
+    expected = [name for name, lat, lon in zip(source['name'], source['Latitude'], source['lon'])
+                if lat not in ('n/a', '') and lon not in ('n/a', '') and expected_on_land(float(lat), float(lon))]
+    result = pd.read_csv(output)
+    assert (read, kept) == (len(source), len(expected))
+    assert result['name'].tolist() == expected
+    assert list(result.columns) == ['name', 'Latitude', 'lon']
+
+
+def test_header_only_input_keeps_header(land_path, tmp_path):
+    (tmp_path / 'in.csv').write_text('lat,lng,name\n')
+    assert filter_csv_to_land(str(tmp_path / 'in.csv'), str(tmp_path / 'out.csv'), land_path, offline=True) == (0, 0)
+    assert (tmp_path / 'out.csv').read_text().strip() == 'lat,lng,name'
+
+
+def test_main_errors(land_path, tmp_path, capsys):
+    points_csv(tmp_path / 'in.csv', n=10)
+    (tmp_path / 'bad.csv').write_text('x,y\n1,2\n')
+    missing_land = str(tmp_path / 'missing.geojson')
+
+    assert main([str(tmp_path / 'nope.csv'), str(tmp_path / 'out.csv')]) == 1
+    assert main([str(tmp_path / 'in.csv'), str(tmp_path / 'out.csv'), '--land', missing_land, '--offline']) == 1
+    assert 'without --offline' in capsys.readouterr().out
+    assert main([str(tmp_path / 'bad.csv'), str(tmp_path / 'out.csv'), '--land', land_path, '--offline']) == 1
+    assert main([str(tmp_path / 'in.csv'), str(tmp_path / 'out.csv'), '--land', land_path, '--offline']) == 0
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.cng_switch_calculator import CNGSwitchCalculator
+from models.fuel_price_history import FuelPriceHistory
+
+calculator = CNGSwitchCalculator()
+
+
+def price_history(n_months=40, seed=0):
+    rng = np.random.default_rng(seed)
+    months = np.arange(np.datetime64('2020-01'), np.datetime64('2020-01') + n_months)
+    steps = rng.normal(0.004, 0.03, (n_months, 3))
+    prices = np.array([100.0, 90.0, 75.0]) * np.exp(np.cumsum(steps, axis=0))
+    return FuelPriceHistory(months, prices)
+
+
+def test_from_frame_averages_months_and_fills_gaps():
+    df = pd.DataFrame({
+        'Date': ['2021-01-03', '2021-01-20', '2021-03-10', 'not a date'],
+        'Petrol_Price': [100, 102, 110, 1],
+        'diesel': [90, 92, 95, 1],
+        'CNG': [70, 72, 80, 1]
+    })
+    history = FuelPriceHistory.from_frame(df)
+    assert [str(m) for m in history.months] == ['2021-01', '2021-02', '2021-03']
+    assert history.price('petrol').tolist() == [101.0, 101.0, 110.0]
+    assert history.month_index('2021-03-15') == 2
+    with pytest.raises(ValueError):
+        history.month_index('2020-12')
+    with pytest.raises(ValueError):
+        FuelPriceHistory.from_frame(df.drop(columns=['CNG']))
+
+
+@pytest.mark.parametrize('fuel,daily_km', [('petrol', 40.0), ('diesel', 150.0), ('petrol', 3.0)])
+def test_all_dates_prefix_sums_match_per_date_backtests(fuel, daily_km):
+    history = price_history()
+    horizons = (1, 12, 36, 60)
+    result = calculator.backtest_all_dates(history, 'sedan', fuel, daily_km, horizons=horizons)
+    by_month = result['by_conversion_month']
+    assert result['summary']['conversion_months'] == len(history)
+
+    for start, month in enumerate(history.months):
+        # Naive loop: replay each conversion month on its own
+        single = calculator.backtest(history, 'sedan', fuel, daily_km, conversion_date=str(month))
+        cumulative = [row['cumulative_saving'] for row in single['monthly_breakdown']]
+        assert by_month['payback_months'][start] == single['payback_months']
+        assert by_month['months_observed'][start] == single['months_observed']
+        for h in horizons:
+            expected = cumulative[h - 1] if h <= len(cumulative) else None
+            assert by_month['savings_after_months'][str(h)][start] == pytest.approx(expected, abs=0.02)
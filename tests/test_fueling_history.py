@@ -0,0 +1,133 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import fueling_records
+from models.fueling_history import FuelingHistory, epoch_seconds
+
+
+def test_events_survive_reopening(tmp_path):
+    path = str(tmp_path / 'history.db')
+    FuelingHistory(path).insert_events('alice', fueling_records(50, seed=1))
+    assert FuelingHistory(path).summary('alice')['count'] == 50
+
+
+def test_calendar_fields_are_derived_from_the_timestamp():
+    row = FuelingHistory.event_rows('u', [{'timestamp': '2024-06-08T18:30:00+05:30',
+                                           'charge_amount_kg': 5, 'cost': 375}])[0]
+    user, ts, hour, day_of_week, is_weekend = row[:5]
+    assert ts == epoch_seconds('2024-06-08T18:30:00')
+    assert (hour, day_of_week, is_weekend) == (18, 5, 1)  # local wall clock, Saturday
+
+
+def test_insert_if_empty_seeds_only_once(tmp_path):
+    path = str(tmp_path / 'history.db')
+    first, second = FuelingHistory(path), FuelingHistory(path)
+    assert first.insert_events_if_empty('bob', fueling_records(10, seed=1)) == 10
+    assert second.insert_events_if_empty('bob', fueling_records(10, seed=2)) == 0
+    with sqlite3.connect(path) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM fueling_events').fetchone()[0] == 10
+
+
+def test_batched_summary_matches_one_pass_statistics():
+    records = fueling_records(600, seed=3)
+    history = FuelingHistory()
+    for start in range(0, 600, 137):  # uneven batches exercise the Welford merge
+        history.insert_events('carol', records[start:start + 137])
+
+    summary = history.summary('carol')
+    efficiency = np.array([r['efficiency_km_per_kg'] for r in records])
+    wait = np.array([r['wait_time_minutes'] for r in records])
+    assert summary['count'] == 600
+    assert summary['cost'] == pytest.approx(sum(r['cost'] for r in records))
+    assert (summary['min_wait'], summary['max_wait']) == (wait.min(), wait.max())
+    assert summary['eff_count'] == 600
+    assert summary['eff_mean'] == pytest.approx(efficiency.mean())
+    assert summary['eff_m2'] / summary['eff_count'] == pytest.approx(efficiency.var())
+
+
+def test_incremental_aggregates_match_a_rebuild():
+    history = FuelingHistory()
+    for seed in range(3):
+        history.insert_events('dave', fueling_records(200, seed=seed))
+        history.insert_events('erin', fueling_records(50, seed=seed + 10))
+    incremental = {user: (history.summary(user), history.all_buckets(user)) for user in ('dave', 'erin')}
+
+    history.rebuild_aggregates()
+    for user, (summary, buckets) in incremental.items():
+        rebuilt = history.summary(user)
+        assert rebuilt.keys() == summary.keys()
+        for key, value in summary.items():
+            assert rebuilt[key] == pytest.approx(value), key
+        rebuilt_buckets = history.all_buckets(user)
+        for dimension, rows in buckets.items():
+            assert len(rebuilt_buckets[dimension]) == len(rows)
+            for rebuilt_row, row in zip(rebuilt_buckets[dimension], rows):
+                assert rebuilt_row == pytest.approx(row), dimension
+
+
+@pytest.mark.parametrize('period', ['day', 'week', 'month'])
+def test_rollups_match_grouped_events(period):
+    records = fueling_records(800, days=120, seed=4)
+    history = FuelingHistory()
+    history.insert_events('frank', records[:300])
+    history.insert_events('frank', records[300:])
+
+    frame = pd.DataFrame(records)
+    stamps = pd.to_datetime(frame['timestamp'])
+    if period == 'week':
+        starts = stamps.dt.normalize() - pd.to_timedelta(stamps.dt.weekday, unit='D')  # weeks start on Monday
+    else:
+        starts = stamps.dt.to_period(period[0].upper()).dt.start_time
+    expected = frame.groupby(starts).agg(count=('cost', 'size'), cost=('cost', 'sum'),
+                                         eff=('efficiency_km_per_kg', 'mean'))
+
+    rows = history.rollups('frank', period)
+    assert [r['start'] for r in rows] == [epoch_seconds(t.isoformat()) for t in expected.index]
+    assert [r['count'] for r in rows] == expected['count'].tolist()
+    assert [r['cost'] for r in rows] == pytest.approx(expected['cost'].tolist())
+    assert [r['avg_efficiency'] for r in rows] == pytest.approx(expected['eff'].tolist())
+
+    assert history.rollups('frank', period, last=2) == rows[-2:]
+    middle = rows[len(rows) // 2]['start']
+    assert history.rollups('frank', period, start=middle) == [r for r in rows if r['start'] >= middle]
+
+
+def test_month_rollup_labels():
+    history = FuelingHistory()
+    history.insert_events('gina', [
+        {'timestamp': '2024-01-31T23:59:00', 'charge_amount_kg': 5, 'cost': 300},
+        {'timestamp': '2024-02-01T00:01:00', 'charge_amount_kg': 5, 'cost': 300}
+    ])
+    assert [r['key'] for r in history.rollups('gina', 'month')] == ['2024-01', '2024-02']
+    assert [r['key'] for r in history.rollups('gina', 'day')] == ['2024-01-31', '2024-02-01']
+
+
+def test_keyset_pages_walk_every_event_once_newest_first():
+    history = FuelingHistory()
+    records = fueling_records(57, seed=7)
+    records += [dict(records[10]) for _ in range(5)]  # identical timestamps are ordered by id
+    history.insert_events('lena', records)
+
+    seen, cursor = [], None
+    while True:
+        rows, cursor = history.page('lena', limit=10, cursor=cursor)
+        seen.extend(rows)
+        if cursor is None:
+            break
+    keys = [(r['ts'], r['id']) for r in seen]
+    assert len(seen) == len(records) and len(set(keys)) == len(keys)
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_page_time_range_and_invalid_cursor():
+    history = FuelingHistory()
+    history.insert_events('mia', fueling_records(40, seed=8))
+    rows, _ = history.page('mia', limit=100)
+    after, before = rows[30]['ts'], rows[5]['ts']
+    ranged, _ = history.page('mia', limit=100, after=after, before=before)
+    assert ranged == [r for r in rows if after <= r['ts'] < before]
+    with pytest.raises(ValueError):
+        history.page('mia', cursor='not-a-cursor')
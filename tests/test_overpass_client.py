@@ -0,0 +1,150 @@
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+from models.overpass_client import OverpassClient, OverpassError
+
+
+class StubOverpass:
+    """Local stand-in for the Overpass interpreter.
+
+    Each tile query gets one node at the tile's centre plus a way (id 1)
+    shared by every tile; queued statuses are answered before any 200.
+    """
+
+    def __init__(self):
+        self.bboxes = []
+        self.statuses = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length'])).decode()
+                query = parse_qs(body)['data'][0]
+                south, west, north, east = map(float, re.search(r'\(([-\d.,]+)\)', query).group(1).split(','))
+                with stub._lock:
+                    stub.bboxes.append((south, west, north, east))
+                    status = stub.statuses.pop(0) if stub.statuses else 200
+                if status != 200:
+                    self.send_response(status)
+                    self.send_header('Retry-After', '0')
+                    self.end_headers()
+                    return
+                payload = json.dumps({'elements': [
+                    {'type': 'node', 'id': hash((south, west)) & 0xFFFFFF,
+                     'lat': (south + north) / 2, 'lon': (west + east) / 2, 'tags': {'amenity': 'fuel'}},
+                    {'type': 'way', 'id': 1, 'nodes': []}
+                ]}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/api/interpreter'
+        self._thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubOverpass()
+    yield server
+    server.close()
+
+
+def test_tiles_cover_the_radius():
+    client = OverpassClient(tile_deg=0.05)
+    assert client.tiles_for_radius(28.61, 77.21, 100) == [(572, 1544)]
+    tiles = client.tiles_for_radius(28.61, 77.21, 3000)
+    rows = {r for r, _ in tiles}
+    cols = {c for _, c in tiles}
+    assert len(tiles) == len(rows) * len(cols)
+    assert min(rows) * 0.05 <= 28.61 - 3000 / 111_320 and (max(rows) + 1) * 0.05 >= 28.61 + 3000 / 111_320
+
+
+def test_tiles_are_fetched_deduplicated_and_cached(stub, tmp_path):
+    client = OverpassClient(stub.url, cache_dir=str(tmp_path), backoff=0, max_workers=2)
+    tiles = [(572, 1544), (572, 1545), (573, 1544)]
+    elements = client.fetch_tiles(tiles)
+    # One node per tile, and the shared way only once
+    assert sorted(e['type'] for e in elements) == ['node', 'node', 'node', 'way']
+    assert len(stub.bboxes) == 3 and client.cache_misses == 3
+
+    again = client.fetch_tiles(tiles)
+    assert len(stub.bboxes) == 3
+    assert client.cache_hits == 3
+    assert sorted(map(json.dumps, again)) == sorted(map(json.dumps, elements))
+
+    # A fresh client (or process) reads the same on-disk cache
+    other = OverpassClient(stub.url, cache_dir=str(tmp_path))
+    other.fetch_tiles(tiles[:1])
+    assert len(stub.bboxes) == 3 and other.requests_sent == 0
+
+
+def test_expired_cache_is_refetched(stub, tmp_path):
+    client = OverpassClient(stub.url, cache_dir=str(tmp_path), cache_ttl=-1, backoff=0)
+    client.fetch_tiles([(0, 0)])
+    client.fetch_tiles([(0, 0)])
+    assert len(stub.bboxes) == 2
+
+
+def test_throttling_and_server_errors_are_retried(stub):
+    client = OverpassClient(stub.url, retries=3, backoff=0)
+    stub.statuses = [429, 503, 502]
+    assert len(client.fetch_tiles([(0, 0)])) == 2
+    assert client.requests_sent == 4 and client.retried == 3 and client.failures == 0
+
+    stub.statuses = [503, 503]
+    client.retries = 1
+    with pytest.raises(OverpassError):
+        client.fetch_tiles([(0, 0)])
+    assert client.failures == 1
+
+
+def test_client_errors_are_not_retried(stub):
+    client = OverpassClient(stub.url, retries=3, backoff=0)
+    stub.statuses = [400]
+    with pytest.raises(OverpassError):
+        client.fetch_tiles([(0, 0)])
+    assert client.requests_sent == 1
+
+
+def test_fetch_around_keeps_elements_within_radius(stub):
+    client = OverpassClient(stub.url, backoff=0)
+    elements = client.fetch_around(28.625, 77.225, 1000)
+    # Only the node at the centre of the point's own tile is within 1 km
+    assert [(e['lat'], e['lon']) for e in elements if e['type'] == 'node'] == [(28.625, 77.225)]
+    assert any(e['type'] == 'way' for e in elements)
+
+
+def test_gas_stations_route(client, app_module, stub, monkeypatch):
+    monkeypatch.setattr(app_module.overpass_client, 'url', stub.url)
+    monkeypatch.setattr(app_module.overpass_client, 'backoff', 0)
+    monkeypatch.setattr(app_module.overpass_client, 'cache_dir', None)
+
+    assert client.get('/api/gas-stations/28.5/77.3?radius=0').status_code == 400
+    assert client.get('/api/gas-stations/28.5/77.3?radius=1e9').status_code == 400
+
+    response = client.get('/api/gas-stations/28.525/77.325?radius=500')
+    assert response.status_code == 200
+    stations = response.get_json()['stations']
+    assert len(stations) == 1
+    assert (stations[0]['lat'], stations[0]['lng']) == pytest.approx((28.525, 77.325))
+    assert stations[0]['name'] == 'Unnamed Station'
+
+    stub.statuses = [503] * (app_module.overpass_client.retries + 1)
+    assert client.get('/api/gas-stations/28.525/77.325?radius=500').status_code == 502
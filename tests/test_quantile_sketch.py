@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import fueling_records
+from models.fueling_history import FuelingHistory
+from models.quantile_sketch import QuantileSketch
+
+QS = (1, 10, 50, 90, 99, 100)
+
+
+def lower_rank_quantiles(values, qs=QS):
+    ordered = np.sort(values)
+    return [ordered[int(np.floor(q / 100 * (len(ordered) - 1)))] for q in qs]
+
+
+@pytest.mark.parametrize('alpha', [0.01, 0.05])
+def test_quantiles_within_relative_error(alpha):
+    values = np.random.default_rng(0).lognormal(2.0, 1.2, 20000)
+    estimates = QuantileSketch(alpha=alpha).add(values).quantiles(QS)
+    for q, exact in zip(QS, lower_rank_quantiles(values)):
+        assert abs(estimates[f'p{q:g}'] - exact) <= alpha * exact + 1e-12, q
+
+
+def test_merged_sketches_equal_one_sketch_over_all_values():
+    rng = np.random.default_rng(1)
+    parts = [rng.gamma(2.0, 4.0, n) for n in (10, 500, 3000)]
+    merged = QuantileSketch()
+    for part in parts:
+        merged.merge(QuantileSketch().add(part))
+    whole = QuantileSketch().add(np.concatenate(parts))
+    assert merged.counts == whole.counts
+    assert merged.quantiles(QS) == whole.quantiles(QS)
+
+
+def test_zero_bucket_and_empty_sketch():
+    sketch = QuantileSketch(min_value=1e-3)
+    assert sketch.quantiles((50,)) == {'p50': None}
+    sketch.add([0.0, 0.0, 0.0, 5.0])
+    assert sketch.quantiles((50, 100)) == {'p50': 0.0, 'p100': pytest.approx(5.0, rel=0.01)}
+
+
+def test_merge_rejects_different_accuracy():
+    with pytest.raises(ValueError):
+        QuantileSketch(alpha=0.01).merge(QuantileSketch(alpha=0.02))
+
+
+def test_stored_sketches_merge_across_users_and_hours():
+    history = FuelingHistory()
+    a, b = fueling_records(400, seed=5), fueling_records(300, seed=6)
+    history.insert_events('hana', a)
+    history.insert_events('ivan', b)
+
+    waits = np.array([r['wait_time_minutes'] for r in a + b])
+    fleet = history.sketch('wait')
+    assert fleet.count == len(waits)
+    for q, exact in zip(QS, lower_rank_quantiles(waits)):
+        assert fleet.quantiles(QS)[f'p{q:g}'] == pytest.approx(exact, rel=0.011, abs=1e-3)
+
+    by_hour = history.sketch('wait', user='hana', group_by='hour')
+    assert sum(s.count for s in by_hour.values()) == len(a)
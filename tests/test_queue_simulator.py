@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from models.queue_simulator import MAX_EXPECTED_ARRIVALS, StationQueueSimulator, erlang_c_wait_time
+
+
+def test_mmc_mean_wait_matches_erlang_c():
+    simulator = StationQueueSimulator(seed=7)
+    result = simulator.simulate(servers=2, service_time_min=6.0, arrival_curve=[15.0] * 24,
+                                replications=200, days=1)
+    expected = erlang_c_wait_time(15.0, 6.0, 2)
+    assert result['erlang_c_wait_min'] == round(expected, 2)
+    assert result['mean_wait'] == pytest.approx(expected, rel=0.15)
+
+
+def test_runs_are_reproducible_with_a_seed():
+    simulator = StationQueueSimulator()
+    kwargs = dict(servers=1, service_time_min=4.0, arrival_curve=[8.0] * 24, replications=20, seed=3)
+    assert simulator.simulate(**kwargs) == simulator.simulate(**kwargs)
+
+
+def test_rejects_runs_over_the_arrival_budget():
+    simulator = StationQueueSimulator()
+    rate = MAX_EXPECTED_ARRIVALS / 24 + 1
+    with pytest.raises(ValueError, match='arrivals'):
+        simulator.simulate(servers=1, service_time_min=1.0, arrival_curve=[rate] * 24, replications=1)
+
+
+@pytest.mark.parametrize('replications, days', [(0, 1), (-5, 1), (10, 0)])
+def test_rejects_non_positive_replications_and_days(replications, days):
+    with pytest.raises(ValueError):
+        StationQueueSimulator().simulate(servers=1, service_time_min=5.0, arrival_curve=np.ones(24),
+                                         replications=replications, days=days)
+
+
+def test_process_pool_is_reused():
+    simulator = StationQueueSimulator(workers=2)
+    try:
+        kwargs = dict(servers=1, service_time_min=4.0, arrival_curve=[6.0] * 24, replications=10, seed=1)
+        first = simulator.simulate(**kwargs)
+        pool = simulator._pool
+        assert simulator.simulate(**kwargs) == first
+        assert pool is None or simulator._pool is pool
+    finally:
+        simulator.close()
@@ -0,0 +1,48 @@
+import re
+
+from models.request_metrics import RequestMetrics
+
+
+def test_stages_are_aggregated_into_server_timing():
+    metrics = RequestMetrics(latency_buckets=(0.1, 1.0))
+    metrics.begin_request()
+    try:
+        metrics.observe_stage('prediction', 0.002)
+        metrics.observe_stage('prediction', 0.003)
+        metrics.observe_stage('scoring', 0.5)
+        assert metrics.server_timing(0.75) == \
+            'prediction;dur=5.00;desc="x2", scoring;dur=500.00, total;dur=750.00'
+    finally:
+        metrics.end_request()
+    # Outside a request, stages are still recorded but join no header
+    metrics.observe_stage('prediction', 2.0)
+    assert metrics.server_timing() == ''
+
+    rendered = metrics.render()
+    assert 'app_stage_duration_seconds_bucket{stage="prediction",le="0.1"} 2' in rendered
+    assert 'app_stage_duration_seconds_bucket{stage="prediction",le="+Inf"} 3' in rendered
+    assert 'app_stage_duration_seconds_count{stage="scoring"} 1' in rendered
+    assert 'http_requests_in_flight 0' in rendered
+
+
+def test_request_counters_and_label_escaping():
+    metrics = RequestMetrics(latency_buckets=(0.1,), size_buckets=(10,))
+    metrics.observe_request('/a"b', 'GET', 200, 0.05, 5, 50)
+    metrics.observe_request('/a"b', 'GET', 200, 0.5, 0, None)
+    rendered = metrics.render()
+    assert 'http_requests_total{endpoint="/a\\"b",method="GET",status="200"} 2' in rendered
+    assert 'http_request_duration_seconds_bucket{endpoint="/a\\"b",method="GET",le="0.1"} 1' in rendered
+    assert 'http_request_duration_seconds_sum{endpoint="/a\\"b",method="GET"} 0.55' in rendered
+    # A missing response size is not observed
+    assert 'http_response_size_bytes_count{endpoint="/a\\"b"} 1' in rendered
+
+
+def test_responses_carry_server_timing_and_reach_metrics(client):
+    response = client.get('/api/analytics/bundle')
+    assert response.status_code == 200
+    assert re.fullmatch(r'analytics;dur=\d+\.\d\d, total;dur=\d+\.\d\d', response.headers['Server-Timing'])
+
+    rendered = client.get('/metrics').get_data(as_text=True)
+    assert re.search(r'http_requests_total\{endpoint="/api/analytics/bundle",method="GET",status="200"\} \d+',
+                     rendered)
+    assert 'app_stage_duration_seconds_count{stage="analytics"}' in rendered
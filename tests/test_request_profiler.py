@@ -0,0 +1,54 @@
+import pytest
+
+from models.request_profiler import RequestProfiler
+
+TOKEN = {'X-Profile-Token': 'test-token'}
+
+
+def test_disabled_profiler_never_profiles(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), token=None, sample_rate=1.0)
+    assert not profiler.enabled
+    assert not profiler.authorize('anything')
+    # Sampled requests would write profiles no one can read
+    assert profiler.start(None, False) is None
+    assert profiler.start('1', True) is None
+
+
+def test_token_gate_and_sampling(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), token='secret', sample_rate=0.0)
+    assert profiler.authorize('secret')
+    assert not profiler.authorize('wrong') and not profiler.authorize(None)
+    assert profiler.start('1', False) is None
+
+    session = profiler.start('cprofile', True)
+    assert (session.mode, session.trigger) == ('cprofile', 'requested')
+    profile_id = profiler.finish(session, {'path': '/x'})
+
+    sampled = RequestProfiler(str(tmp_path), token='secret', sample_rate=1.0).start(None, False)
+    assert (sampled.mode, sampled.trigger) == ('sample', 'sampled')
+    profiler.discard(sampled)
+
+    assert profiler.get_profile(profile_id)['path'] == '/x'
+    assert profiler.get_profile('../' + profile_id) is None
+    assert [p['id'] for p in profiler.list_profiles(0)] == [profile_id]
+
+
+def test_profile_routes_require_the_token(client):
+    response = client.get('/api/cng-calculator/vehicle-types?profile=1')
+    assert 'X-Profile-Id' not in response.headers
+    assert client.get('/api/profiles').status_code == 403
+    assert client.get('/api/profiles', headers={'X-Profile-Token': 'wrong'}).status_code == 403
+
+    response = client.get('/api/cng-calculator/vehicle-types?profile=1', headers=TOKEN)
+    profile_id = response.headers['X-Profile-Id']
+    assert client.get(f'/api/profiles/{profile_id}').status_code == 403
+    profile = client.get(f'/api/profiles/{profile_id}', headers=TOKEN).get_json()
+    assert profile['trigger'] == 'requested' and profile['status'] == response.status_code
+
+    listed = client.get('/api/profiles?limit=1', headers=TOKEN).get_json()['profiles']
+    assert [p['id'] for p in listed] == [profile_id]
+
+
+@pytest.mark.parametrize('limit', ['abc', '1.5', ''])
+def test_profile_list_rejects_bad_limit(client, limit):
+    assert client.get(f'/api/profiles?limit={limit}', headers=TOKEN).status_code == 400
@@ -0,0 +1,30 @@
+import numpy as np
+
+from models.restricted_areas import RestrictedAreaIndex
+
+
+LAKE = {
+    'name': 'Lake',
+    'polygon': [
+        {'lat': 28.60, 'lng': 77.20},
+        {'lat': 28.60, 'lng': 77.22},
+        {'lat': 28.62, 'lng': 77.22},
+        {'lat': 28.62, 'lng': 77.20}
+    ]
+}
+
+
+def test_point_strictly_inside_area_is_restricted():
+    index = RestrictedAreaIndex([LAKE], buffer_deg=0.001)
+    # Far from every edge: only an interior (containment) test rejects it
+    assert index.restricted_mask([28.61], [77.21]).tolist() == [True]
+    assert index.blocking_areas(28.61, 77.21) == ['Lake']
+
+
+def test_buffer_and_clear_points():
+    index = RestrictedAreaIndex([LAKE], buffer_deg=0.001)
+    lats = np.array([28.6205, 28.6300, 28.61])
+    lngs = np.array([77.21, 77.21, 77.2250])
+    # Inside the 0.001 degree buffer, well outside, and outside beyond the buffer
+    assert index.valid_mask(lats, lngs).tolist() == [False, True, True]
+    assert index.blocking_areas(28.63, 77.21) == []
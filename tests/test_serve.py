@@ -0,0 +1,77 @@
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+import requests
+
+import serve
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.skipif(not os.path.exists(f'/proc/{os.getpid()}/smaps_rollup'), reason='needs Linux smaps_rollup')
+def test_memory_usage_of_this_process():
+    usage = serve.memory_usage(os.getpid())
+    assert set(usage) == {'rss_mib', 'pss_mib', 'uss_mib', 'shared_mib'}
+    assert usage['rss_mib'] > 0
+    assert usage['uss_mib'] <= usage['rss_mib'] and usage['pss_mib'] <= usage['rss_mib']
+
+
+def test_memory_usage_of_missing_process():
+    assert serve.memory_usage(2 ** 22 + 12345) == {}
+
+
+def test_listen_socket_is_inheritable():
+    sock = serve.listen_socket('127.0.0.1', 0, 16)
+    try:
+        assert sock.get_inheritable()
+        assert sock.getsockname()[1] > 0
+        client = socket.create_connection(sock.getsockname()[:2], timeout=2)
+        client.close()
+    finally:
+        sock.close()
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_workers_serve_and_stop_on_sigterm(tmp_path):
+    env = {**os.environ,
+           'FUELING_DB_PATH': str(tmp_path / 'history.db'),
+           'PROFILE_DIR': str(tmp_path / 'profiles'),
+           'OVERPASS_CACHE_DIR': str(tmp_path / 'overpass'),
+           'PYTHONUNBUFFERED': '1'}
+    proc = subprocess.Popen([sys.executable, 'serve.py', '--workers', '2', '--port', '0', '--no-preload'],
+                            cwd=REPO_ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        match = None
+        deadline = time.monotonic() + 60
+        while match is None and time.monotonic() < deadline:
+            line = proc.stdout.readline()
+            if not line:
+                break
+            match = re.search(r'Serving on (http://\S+) with 2 workers \(parent (\d+)\)', line)
+        assert match, 'server did not start'
+        url, parent = match.group(1), int(match.group(2))
+
+        pids = set()
+        for _ in range(10):
+            # A new connection per request, as a client fleet would open
+            status = requests.get(url + '/api/wait-times/online-status', timeout=30,
+                                  headers={'Connection': 'close'}).json()
+            pids.add(status['worker_pid'])
+        assert pids and parent not in pids
+
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=30) == 0
+        for pid in pids:
+            with pytest.raises(ProcessLookupError):
+                os.kill(pid, 0)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
@@ -0,0 +1,48 @@
+import pytest
+
+from models.lazy_resource import LazyResource
+from models.wait_time_online import OnlineWaitTimeUpdater
+from models.wait_time_predictor import WaitTimePredictor
+
+
+@pytest.mark.parametrize('field, value', [('hour_of_day', 24), ('hour_of_day', -1),
+                                          ('day_of_week', 7), ('day_of_week', -3)])
+def test_rejects_out_of_range_calendar_fields(field, value):
+    with pytest.raises(ValueError, match=field):
+        OnlineWaitTimeUpdater.parse_observation({'observed_wait': 5, field: value})
+
+
+def test_parse_derives_calendar_fields_from_timestamp():
+    features, wait = OnlineWaitTimeUpdater.parse_observation(
+        {'observed_wait': 7.5, 'timestamp': '2024-06-08T18:30:00', 'queue_length': 3})
+    assert (features['hour_of_day'], features['day_of_week'], features['is_weekend']) == (18, 5, 1)
+    assert features['current_queue_length'] == 3 and wait == 7.5
+
+
+def test_updates_grow_forest_with_distinct_seeds(training_set):
+    predictor = WaitTimePredictor()
+    predictor.model.set_params(n_estimators=5)
+    predictor.train(*training_set(100))
+    updater = OnlineWaitTimeUpdater(predictor, min_new_observations=10, new_trees=3, max_trees=6)
+
+    seeds = []
+    for round_ in range(4):
+        rows, waits = training_set(20, seed=round_ + 1)
+        updater.ingest([{**row, 'observed_wait': max(wait, 0)} for row, wait in zip(rows, waits)])
+        assert updater.update_now()
+        seeds += [tree.random_state for tree in predictor.model.estimators_[-3:]]
+    assert len(predictor.model.estimators_) == 6
+    assert len(set(seeds)) == len(seeds)
+    assert not updater.update_now()  # nothing new since the last update
+
+
+def test_status_does_not_build_a_lazy_model():
+    def fail():
+        raise AssertionError("status must not build the model")
+
+    resource = LazyResource('test_predictor', fail)
+    try:
+        status = OnlineWaitTimeUpdater(resource).get_status()
+    finally:
+        LazyResource._registry.remove(resource)
+    assert status['model_loaded'] is False and status['model_trees'] is None
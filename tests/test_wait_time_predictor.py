@@ -0,0 +1,30 @@
+import numpy as np
+
+from models.wait_time_predictor import WaitTimePredictor
+
+
+def test_per_tree_quantiles_match_estimator_loop(trained_predictor, training_set):
+    predictor = trained_predictor
+    rows, _ = training_set(50, seed=1)
+    X = predictor._prepare_features(rows)
+    mean, quantiles = predictor.predict_quantiles(X, (10, 50, 90))
+
+    X_scaled = predictor.scaler.transform(X)
+    per_tree = np.stack([tree.predict(X_scaled) for tree in predictor.model.estimators_], axis=1)
+    np.testing.assert_allclose(mean, predictor.model.predict(X_scaled))
+    np.testing.assert_allclose(quantiles, np.percentile(per_tree, (10, 50, 90), axis=1).T)
+
+
+def test_predict_wait_time_reports_ordered_quantiles(trained_predictor, training_set):
+    rows, _ = training_set(20, seed=2)
+    stations = [{**row, 'id': i} for i, row in enumerate(rows)]
+    for result in trained_predictor.predict_wait_time(stations):
+        assert 0 <= result['p50_wait'] <= result['p90_wait']
+
+
+def test_untrained_predictor_has_nan_quantiles(training_set):
+    predictor = WaitTimePredictor()
+    rows, _ = training_set(5)
+    mean, quantiles = predictor.predict_quantiles(predictor._prepare_features(rows))
+    assert np.isnan(quantiles).all()
+    assert (mean >= 0).all()
@@ -0,0 +1,34 @@
+import numpy as np
+
+from models.wait_time_table import WaitTimeTable
+
+
+def test_lookup_matches_direct_prediction(trained_predictor):
+    predictor = trained_predictor
+    table = WaitTimeTable(predictor, dtype=np.float64, chunk_size=2)
+    table.refresh([{'id': f's{i}', 'active_chargers': i + 1, 'total_chargers': 4} for i in range(3)])
+
+    values, confidence = table.lookup(['s2', 'missing', 's0'], day_of_week=5, hour=18)
+    features = [{
+        'active_chargers': 3, 'total_chargers': 4, 'current_queue_length': table.EXPECTED_QUEUE_LENGTH,
+        'hour_of_day': 18, 'day_of_week': 5, 'is_weekend': 1, 'traffic_density': 0.5,
+        'historical_avg_wait_time': 10.0
+    }]
+    mean, quantiles = predictor.predict_quantiles(predictor._prepare_features(features), (50, 90))
+    np.testing.assert_allclose(values[0], [mean[0], *quantiles[0]])
+    assert np.isnan(values[1]).all() and np.isnan(confidence[1])
+
+
+def test_lookup_before_first_build_returns_none(trained_predictor):
+    table = WaitTimeTable(trained_predictor)
+    assert table.lookup(['s0'], 0, 0) is None
+    assert table.get_status() == {'ready': False}
+
+
+def test_snapshot_is_read_only(trained_predictor):
+    table = WaitTimeTable(trained_predictor)
+    table.refresh([{'id': 'a'}, {'id': 'a'}, {'id': 'b'}])
+    assert table.get_status()['stations'] == 2
+    values, _ = table.lookup(['a'], 0, 0)
+    assert not table._snapshot[1].flags.writeable
+    assert values.shape == (1, len(WaitTimeTable.FIELDS))